@@ -1,37 +1,262 @@
 """
-portfolio.py
+base_portfolio.py
+
+This module contains the base class for all portfolios. A portfolio holds many
+positions in parallel NumPy arrays so that it can be revalued in one vectorized step.
 """
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from .instrument_universe import InstrumentUniverse, DEFAULT_UNIVERSE
+
+
+INITIAL_CAPACITY = 16
 
 
 class BasePortfolio(ABC):
-    def __init__(self, position, rebalance, instrument, quantity, currency_type, price, value, timestamp, trade_id, transaction_id):
-        self._position = position
-        self._rebalance = rebalance
-        self._instrument = instrument
-        self._quantity = quantity
-        self.average_cost = 0.0
+    """
+    attributes:
+        Portfolio ID
+        User ID (owner)
+        Currency Type
+        Positions (instrument codes, asset classes, quantities, average costs and price
+            multipliers), one per instrument and asset class
+        Target weights used when rebalancing
+        Daily and monthly returns, updated on every revaluation
+    """
+    # asset class of positions added without one
+    DEFAULT_ASSET_CLASS = "EQUITY"
+
+    def __init__(self, portfolio_id:str, user_id:str=None, currency_type:str="USD", timestamp:datetime=None,
+                 universe:InstrumentUniverse=None)-> None:
+        self._portfolio_id = portfolio_id
+        self._user_id = user_id
         self._currency_type = currency_type
-        self._price = price
         self._timestamp = timestamp if timestamp else datetime.now()
-        self._trade_id = trade_id
-        self._transaction_id = transaction_id
-        self._monthy_returns = 0
-        self._daily_returns = 0
-    
-    @abstractmethod
-    def add_position(self, position):
-        pass
+        self._universe = universe if universe is not None else DEFAULT_UNIVERSE
 
-    @abstractmethod
-    def remove_position(self, position):
-        pass
-    
-    @abstractmethod
-    def add_rebalance(self, rebalance):
-        pass
+        self._size = 0
+        self._codes = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._quantities = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._average_costs = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._multipliers = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._asset_classes = []
+        # (asset class, instrument code) -> slot
+        self._slots = {}
+        self._rebalance = {}
+
+        self._value = 0.0
+        self._valued_at = None
+        self._previous_day_close = None
+        self._previous_month_close = None
+        self._daily_returns = 0.0
+        self._monthly_returns = 0.0
 
     @abstractmethod
-    def remove_rebalance(self, rebalance):
+    def price_multiplier(self, asset_class:str=None)-> float:
+        """
+        Factor turning quantity x price into market value for a position, e.g. 0.01 for
+        bonds quoted as a percentage of face value.
+        """
         pass
+
+    @property
+    def portfolio_id(self)-> str:
+        return self._portfolio_id
+
+    @property
+    def user_id(self)-> str:
+        return self._user_id
+
+    @property
+    def currency_type(self)-> str:
+        return self._currency_type
+
+    @property
+    def universe(self)-> InstrumentUniverse:
+        return self._universe
+
+    @property
+    def value(self)-> float:
+        return self._value
+
+    @property
+    def daily_returns(self)-> float:
+        return self._daily_returns
+
+    @property
+    def monthly_returns(self)-> float:
+        return self._monthly_returns
+
+    @property
+    def codes(self)-> np.ndarray:
+        return self._codes[:self._size]
+
+    @property
+    def quantities(self)-> np.ndarray:
+        return self._quantities[:self._size]
+
+    @property
+    def average_costs(self)-> np.ndarray:
+        return self._average_costs[:self._size]
+
+    @property
+    def multipliers(self)-> np.ndarray:
+        return self._multipliers[:self._size]
+
+    @property
+    def asset_classes(self)-> List[str]:
+        return list(self._asset_classes)
+
+    @property
+    def instruments(self)-> List[str]:
+        return [self._universe.instrument(code) for code in self.codes.tolist()]
+
+    def _slot(self, instrument:str, asset_class:str=None)-> int:
+        # the same instrument code can be held as an equity and as the underlying of
+        # an option, so slots are keyed by asset class too
+        asset_class = asset_class or self.DEFAULT_ASSET_CLASS
+        code = self._universe.code(instrument)
+        slot = self._slots.get((asset_class, code))
+        if slot is None:
+            multiplier = self.price_multiplier(asset_class)
+            slot = self._size
+            if slot == len(self._codes):
+                for name in ("_codes", "_quantities", "_average_costs", "_multipliers"):
+                    array = getattr(self, name)
+                    setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+            self._codes[slot] = code
+            self._multipliers[slot] = multiplier
+            self._asset_classes.append(asset_class)
+            self._slots[(asset_class, code)] = slot
+            self._size += 1
+        return slot
+
+    def _find(self, instrument:str, asset_class:str=None)-> int:
+        return self._slots.get((asset_class or self.DEFAULT_ASSET_CLASS, self._universe.lookup(instrument)))
+
+    def add_position(self, instrument:str, quantity:float, price:float, asset_class:str=None)-> None:
+        """
+        Buy `quantity` of `instrument` at `price`, updating its average cost. Positions
+        in different asset classes (e.g. AAPL shares and AAPL options) are kept apart.
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        slot = self._slot(instrument, asset_class)
+        held = self._quantities[slot]
+        self._average_costs[slot] = (held * self._average_costs[slot] + quantity * price) / (held + quantity)
+        self._quantities[slot] = held + quantity
+
+    def remove_position(self, instrument:str, quantity:float=None, asset_class:str=None)-> None:
+        """
+        Sell `quantity` of `instrument`, or the whole position when quantity is None.
+        """
+        slot = self._find(instrument, asset_class)
+        if slot is None:
+            raise ValueError(f"No position in {instrument}")
+        held = self._quantities[slot]
+        if quantity is None or quantity >= held:
+            self._quantities[slot] = 0.0
+            self._average_costs[slot] = 0.0
+        else:
+            self._quantities[slot] = held - quantity
+
+    def add_positions(self, positions:Iterable[Dict])-> int:
+        """
+        Load positions such as PositionLedger.positions_for_user() output, i.e. dicts
+        with "symbol", "net_quantity" and "average_cost" (and optionally "trade_type").
+
+        Portfolios only hold long positions: short and flat ones (net_quantity <= 0)
+        are skipped, and their number is returned.
+        """
+        skipped = 0
+        for position in positions:
+            if position["net_quantity"] > 0:
+                self.add_position(position["symbol"], position["net_quantity"], position["average_cost"],
+                                  position.get("trade_type"))
+            else:
+                skipped += 1
+        return skipped
+
+    def position(self, instrument:str, asset_class:str=None)-> Dict[str, float]:
+        slot = self._find(instrument, asset_class)
+        if slot is None:
+            return {"quantity": 0.0, "average_cost": 0.0}
+        return {"quantity": float(self._quantities[slot]), "average_cost": float(self._average_costs[slot])}
+
+    def add_rebalance(self, rebalance:Dict[str, float])-> None:
+        """
+        Set target weights (instrument -> fraction of portfolio value).
+        """
+        if any(weight < 0 for weight in rebalance.values()):
+            raise ValueError("Target weights must be non-negative")
+        if sum(rebalance.values()) > 1 + 1e-9:
+            raise ValueError("Target weights must not add up to more than 1")
+        self._rebalance.update(rebalance)
+
+    def remove_rebalance(self, rebalance:Iterable[str]=None)-> None:
+        """
+        Drop the target weights of the given instruments, or all of them.
+        """
+        if rebalance is None:
+            self._rebalance = {}
+        else:
+            for instrument in rebalance:
+                self._rebalance.pop(instrument, None)
+
+    @property
+    def target_weights(self)-> Dict[str, float]:
+        return dict(self._rebalance)
+
+    def market_values(self, prices:Dict | np.ndarray | object)-> np.ndarray:
+        """
+        Market value of every position, with prices as taken by
+        InstrumentUniverse.position_prices. Positions without a price are carried at
+        average cost.
+        """
+        prices = self._universe.position_prices(prices, self.codes, self._asset_classes)
+        prices = np.where(np.isnan(prices), self.average_costs, prices)
+        return self.quantities * prices * self.multipliers
+
+    def revalue(self, prices:Dict | np.ndarray | object, timestamp:datetime=None)-> float:
+        """
+        Revalue every position in one step and update the daily and monthly returns.
+        `prices` is a dict of instrument -> price, a vector from
+        InstrumentUniverse.price_vector or a price cache with get_many (see
+        Trading/price_cache.py), for the equity and bond positions; pass a dict of asset
+        class -> such prices to price derivative positions too (see
+        InstrumentUniverse.position_prices).
+        """
+        self.record_value(float(self.market_values(prices).sum()), timestamp)
+        return self._value
+
+    def record_value(self, value:float, timestamp:datetime=None)-> None:
+        """
+        Store a new portfolio value and roll the day / month reference values when the
+        valuation crosses into a new day or month.
+        """
+        timestamp = timestamp or datetime.now()
+        if self._valued_at is not None:
+            if timestamp.date() != self._valued_at.date():
+                self._previous_day_close = self._value
+            if (timestamp.year, timestamp.month) != (self._valued_at.year, self._valued_at.month):
+                self._previous_month_close = self._value
+
+        self._value = value
+        self._valued_at = timestamp
+        self._daily_returns = self._returns_since(self._previous_day_close)
+        self._monthly_returns = self._returns_since(self._previous_month_close)
+
+    def _returns_since(self, reference:float)-> float:
+        if not reference:
+            return 0.0
+        return self._value / reference - 1.0
+
+    def __len__(self)-> int:
+        return self._size
+
+    def __str__(self)-> str:
+        return f"{type(self).__name__}: {self.portfolio_id}, User: {self.user_id}, Positions: {len(self)}, Value: {self.value} {self.currency_type}"
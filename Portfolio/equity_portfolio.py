@@ -0,0 +1,13 @@
+"""
+equity_portfolio.py
+
+This module contains the EquityPortfolio class, a portfolio of equity positions.
+"""
+from .base_portfolio import BasePortfolio
+
+
+class EquityPortfolio(BasePortfolio):
+    def price_multiplier(self, asset_class:str=None)-> float:
+        if asset_class not in (None, "EQUITY"):
+            raise ValueError(f"EquityPortfolio can't hold {asset_class} positions")
+        return 1.0
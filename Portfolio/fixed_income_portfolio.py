@@ -0,0 +1,16 @@
+"""
+fixed_income_portfolio.py
+
+This module contains the FixedIncomePortfolio class, a portfolio of bond positions.
+Quantities are face values and prices are quoted as a percentage of face value.
+"""
+from .base_portfolio import BasePortfolio
+
+
+class FixedIncomePortfolio(BasePortfolio):
+    DEFAULT_ASSET_CLASS = "BOND"
+
+    def price_multiplier(self, asset_class:str=None)-> float:
+        if asset_class not in (None, "BOND"):
+            raise ValueError(f"FixedIncomePortfolio can't hold {asset_class} positions")
+        return 0.01
@@ -0,0 +1,107 @@
+"""
+instrument_universe.py
+
+This module contains the InstrumentUniverse class, which gives every instrument a
+dense integer code so that portfolios can be valued against a single price vector.
+"""
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+ASSET_CLASSES = ["EQUITY", "BOND", "DERIVATIVE"]
+# asset classes whose positions are priced at their instrument's own price; a derivative
+# position's instrument is its underlying, so derivatives need prices of their own
+PRICED_BY_INSTRUMENT = ("EQUITY", "BOND")
+
+
+def _take(vector:np.ndarray, codes:np.ndarray)-> np.ndarray:
+    # a vector built before more instruments were registered has no price for them
+    prices = np.full(len(codes), np.nan, dtype=np.float64)
+    inside = codes < len(vector)
+    prices[inside] = vector[codes[inside]]
+    return prices
+
+
+class InstrumentUniverse:
+    def __init__(self)-> None:
+        self._codes = {}
+        self._instruments = []
+        # optional instrument -> asset class, used for instruments no portfolio holds yet
+        self._asset_classes = {}
+
+    def code(self, instrument:str)-> int:
+        code = self._codes.get(instrument)
+        if code is None:
+            code = len(self._instruments)
+            self._codes[instrument] = code
+            self._instruments.append(instrument)
+        return code
+
+    def lookup(self, instrument:str)-> int:
+        return self._codes.get(instrument, -1)
+
+    def instrument(self, code:int)-> str:
+        return self._instruments[code]
+
+    def set_asset_class(self, instrument:str, asset_class:str)-> None:
+        self.code(instrument)
+        self._asset_classes[instrument] = asset_class
+
+    def asset_class(self, instrument:str)-> str:
+        return self._asset_classes.get(instrument)
+
+    @property
+    def instruments(self)-> List[str]:
+        return self._instruments
+
+    def price_vector(self, prices:Dict[str, float])-> np.ndarray:
+        """
+        Prices aligned to the instrument codes, NaN where no price is given.
+        """
+        vector = np.full(len(self._instruments), np.nan, dtype=np.float64)
+        for instrument, price in prices.items():
+            code = self._codes.get(instrument)
+            if code is not None:
+                vector[code] = price
+        return vector
+
+    @staticmethod
+    def per_asset_class(prices:object)-> bool:
+        """
+        Whether `prices` is a dict of asset class -> prices rather than one set of prices.
+        """
+        return isinstance(prices, dict) and bool(prices) and all(key in ASSET_CLASSES for key in prices)
+
+    def position_prices(self, prices:Dict | np.ndarray | object, codes:np.ndarray,
+                        asset_classes:Sequence[str])-> np.ndarray:
+        """
+        Price of each position given by instrument code and asset class, NaN where none.
+
+        `prices` is one set of prices for EQUITY and BOND positions (a dict instrument ->
+        price, a vector from price_vector or a price cache with get_many), or a dict of
+        asset class -> such prices, e.g. {"EQUITY": ..., "DERIVATIVE": option premiums}.
+        Derivative positions are never priced at their underlying's price.
+        """
+        if not self.per_asset_class(prices):
+            prices = {asset_class: prices for asset_class in PRICED_BY_INSTRUMENT}
+        codes = np.asarray(codes, dtype=np.int64)
+        classes = np.asarray(asset_classes, dtype=object)
+        result = np.full(len(codes), np.nan, dtype=np.float64)
+        for asset_class, class_prices in prices.items():
+            positions = np.flatnonzero(classes == asset_class)
+            if not len(positions):
+                continue
+            if hasattr(class_prices, "get_many"):
+                class_prices = class_prices.get_many([self._instruments[code] for code in set(codes[positions].tolist())])
+            if isinstance(class_prices, dict):
+                class_prices = self.price_vector(class_prices)
+            result[positions] = _take(np.asarray(class_prices, dtype=np.float64), codes[positions])
+        return result
+
+    def __len__(self)-> int:
+        return len(self._instruments)
+
+
+# shared by every portfolio unless one is passed explicitly
+DEFAULT_UNIVERSE = InstrumentUniverse()
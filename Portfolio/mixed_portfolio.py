@@ -0,0 +1,22 @@
+"""
+mixed_portfolio.py
+
+This module contains the MixedPortfolio class, which holds equity, bond and derivative
+positions side by side. The asset class of each position sets its price multiplier.
+"""
+from .base_portfolio import BasePortfolio
+
+
+class MixedPortfolio(BasePortfolio):
+    MULTIPLIERS = {
+        "EQUITY": 1.0,
+        "BOND": 0.01,        # price as a percentage of face value
+        "DERIVATIVE": 1.0,   # premium per contract
+    }
+
+    def price_multiplier(self, asset_class:str=None)-> float:
+        if asset_class is None:
+            return self.MULTIPLIERS["EQUITY"]
+        if asset_class not in self.MULTIPLIERS:
+            raise ValueError(f"Invalid asset class: {asset_class}. Try 'EQUITY', 'BOND' or 'DERIVATIVE'.")
+        return self.MULTIPLIERS[asset_class]
@@ -0,0 +1,191 @@
+"""
+rebalance.py
+
+This module contains the RebalanceEngine class, which turns the target weights set with
+BasePortfolio.add_rebalance into the trades needed to reach them, for many portfolios at
+once, using (portfolios x instruments) matrices.
+"""
+import itertools
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from .base_portfolio import BasePortfolio
+from .instrument_universe import ASSET_CLASSES, DEFAULT_UNIVERSE, InstrumentUniverse
+
+
+# trade dict fields used for the instrument and size of each trade type
+TRADE_FIELDS = {
+    "EQUITY": ("symbol", "quantity"),
+    "BOND": ("isin", "face_value"),
+    "DERIVATIVE": ("underlying_symbol", "quantity"),
+}
+# contract terms a derivative trade needs from instrument_details
+DERIVATIVE_TERMS = ("option_type", "strike_price", "expiration_date")
+ASSET_CLASS_CODES = {asset_class: code for code, asset_class in enumerate(ASSET_CLASSES)}
+
+# appended to rebalance trade ids, keeps them unique within the same second
+_SEQUENCE = itertools.count(1)
+
+
+class RebalancePlan(NamedTuple):
+    codes: np.ndarray          # (K,) instrument codes of the matrix columns
+    asset_classes: np.ndarray  # (K,) asset class of each column (ASSET_CLASSES index)
+    prices: np.ndarray         # (K,) prices used
+    holdings: np.ndarray       # (P, K) current quantities
+    targets: np.ndarray        # (P, K) target quantities
+    trades: np.ndarray         # (P, K) signed quantities to trade
+    values: np.ndarray         # (P,) portfolio values the weights were applied to
+
+
+class RebalanceEngine:
+    """
+    attributes:
+        Lot size (trade quantities are rounded towards zero to a multiple of it)
+        Minimum trade value (smaller trades are dropped to avoid churning on drift)
+    """
+    def __init__(self, lot_size:float=1.0, min_trade_value:float=0.0, universe:InstrumentUniverse=None)-> None:
+        if lot_size <= 0:
+            raise ValueError("Lot size must be positive")
+        self._lot_size = lot_size
+        self._min_trade_value = min_trade_value
+        self._universe = universe if universe is not None else DEFAULT_UNIVERSE
+
+    def _target_asset_class(self, portfolio:BasePortfolio, instrument:str, asset_classes:Dict[str, str])-> str:
+        # explicit asset class, then the one the portfolio holds it in, then the universe
+        if instrument in asset_classes:
+            return asset_classes[instrument]
+        code = self._universe.lookup(instrument)
+        for held_code, held_class in zip(portfolio.codes.tolist(), portfolio.asset_classes):
+            if held_code == code:
+                return held_class
+        return self._universe.asset_class(instrument) or portfolio.DEFAULT_ASSET_CLASS
+
+    def plan(self, portfolios:List[BasePortfolio], prices:Dict | np.ndarray,
+             asset_classes:Dict[str, str]=None)-> RebalancePlan:
+        """
+        Solve every portfolio's target weights against `prices` in one set of matrix
+        operations. Instruments held but missing from the targets get a weight of zero;
+        portfolios without any target weights are left untouched.
+
+        Matrix columns are (asset class, instrument) pairs. The asset class of a target
+        is taken from `asset_classes` (instrument -> asset class), else from the
+        portfolio's position in it, else from the universe, else the portfolio's
+        DEFAULT_ASSET_CLASS; its price multiplier comes from the portfolio.
+
+        `prices` takes the forms InstrumentUniverse.position_prices accepts: derivative
+        columns need a "DERIVATIVE" entry of option prices. Only instruments held or
+        targeted by a portfolio with target weights need a price.
+        """
+        universe = self._universe
+        if any(portfolio.universe is not universe for portfolio in portfolios):
+            raise ValueError("All portfolios must share the same instrument universe")
+        asset_classes = asset_classes or {}
+
+        targets = [portfolio.target_weights for portfolio in portfolios]
+        for weights in targets:
+            for instrument in weights:
+                universe.code(instrument)
+
+        # column key of a position: instrument code x number of asset classes + asset class
+        width = len(ASSET_CLASSES)
+        held_keys = []
+        target_keys = []
+        target_multipliers = []
+        for portfolio, weights in zip(portfolios, targets):
+            held_classes = np.array([ASSET_CLASS_CODES[asset_class] for asset_class in portfolio.asset_classes],
+                                    dtype=np.int64)
+            held_keys.append(portfolio.codes.astype(np.int64) * width + held_classes)
+            target_classes = [self._target_asset_class(portfolio, instrument, asset_classes) for instrument in weights]
+            target_keys.append(np.array([universe.lookup(instrument) * width + ASSET_CLASS_CODES[asset_class]
+                                         for instrument, asset_class in zip(weights, target_classes)], dtype=np.int64))
+            target_multipliers.append([portfolio.price_multiplier(asset_class) for asset_class in target_classes])
+        keys = np.unique(np.concatenate(held_keys + target_keys + [np.zeros(0, dtype=np.int64)]))
+        codes = keys // width
+
+        count = len(portfolios)
+        holdings = np.zeros((count, len(keys)))
+        multipliers = np.zeros((count, len(keys)))
+        weights = np.zeros((count, len(keys)))
+        for index, portfolio in enumerate(portfolios):
+            targeted = np.searchsorted(keys, target_keys[index])
+            multipliers[index, targeted] = target_multipliers[index]
+            columns = np.searchsorted(keys, held_keys[index])
+            holdings[index, columns] = portfolio.quantities
+            multipliers[index, columns] = portfolio.multipliers
+            weights[index, targeted] = list(targets[index].values())
+
+        column_classes = keys % width
+        column_prices = universe.position_prices(prices, codes,
+                                                 [ASSET_CLASSES[asset_class] for asset_class in column_classes.tolist()])
+        # only the columns a rebalanced portfolio holds or targets need a price
+        has_targets = np.array([bool(target) for target in targets], dtype=bool)
+        needed = ((holdings[has_targets] != 0) | (weights[has_targets] != 0)).any(axis=0)
+        unpriced = np.isnan(column_prices) & needed
+        if unpriced.any():
+            missing = sorted({f"{ASSET_CLASSES[asset_class]} {universe.instrument(code)}" for code, asset_class
+                              in zip(codes[unpriced].tolist(), column_classes[unpriced].tolist())})
+            raise ValueError(f"Missing prices for {missing}")
+
+        unit_values = column_prices[None, :] * multipliers
+        # portfolios left untouched are NaN-valued if they hold an unpriced instrument
+        values = np.where(holdings != 0, holdings * unit_values, 0.0).sum(axis=1)
+        target_quantities = np.divide(weights * values[:, None], unit_values,
+                                      out=np.zeros_like(weights), where=unit_values > 0)
+
+        trades = np.trunc((target_quantities - holdings) / self._lot_size) * self._lot_size
+        trades[np.abs(trades * unit_values) < self._min_trade_value] = 0.0
+        trades[~has_targets] = 0.0
+
+        return RebalancePlan(codes, column_classes, column_prices, holdings, target_quantities, trades, values)
+
+    def trades(self, portfolios:List[BasePortfolio], prices:Dict | np.ndarray,
+               instrument_details:Dict[str, Dict]=None, timestamp:datetime=None)-> List[Dict]:
+        """
+        Trade dicts that TradeProcessor.process_trades can consume directly.
+
+        The trade type of each trade is the asset class of its plan column (see plan()),
+        with "trade_type" in `instrument_details` (instrument -> extra trade fields such
+        as "coupon_rate" or "maturity_date", which bond trades need) taking precedence.
+        Derivative trades use the column's option price as their premium and must have
+        their DERIVATIVE_TERMS in `instrument_details`.
+        """
+        instrument_details = instrument_details or {}
+        asset_classes = {instrument: details["trade_type"] for instrument, details in instrument_details.items()
+                         if "trade_type" in details}
+        plan = self.plan(portfolios, prices, asset_classes)
+        timestamp = timestamp or datetime.now()
+        stamp = timestamp.strftime("%Y%m%d%H%M%S")
+
+        trade_dicts = []
+        for index, column in zip(*np.nonzero(plan.trades)):
+            portfolio = portfolios[index]
+            instrument = self._universe.instrument(int(plan.codes[column]))
+            trade_type = ASSET_CLASSES[int(plan.asset_classes[column])]
+            details = instrument_details.get(instrument, {})
+            # details for the option on an instrument are not for a position held in the instrument itself
+            if details.get("trade_type", trade_type) != trade_type:
+                details = {}
+            instrument_field, size_field = TRADE_FIELDS[trade_type]
+            quantity = float(plan.trades[index, column])
+
+            trade = {
+                "trade_id": f"RB-{portfolio.portfolio_id}-{instrument}-{stamp}-{next(_SEQUENCE)}",
+                "user_id": portfolio.user_id,
+                "trade_type": trade_type,
+                "direction": "BUY" if quantity > 0 else "SELL",
+                "price": float(plan.prices[column]),
+                "timestamp": timestamp,
+            }
+            if trade_type == "DERIVATIVE":
+                # the plan priced the column with the option's own price, not the underlying's
+                missing = [name for name in DERIVATIVE_TERMS if name not in details]
+                if missing:
+                    raise ValueError(f"Missing {', '.join(missing)} for DERIVATIVE {instrument}")
+                trade["premium"] = trade["price"]
+            trade.update(details)
+            trade[instrument_field] = instrument
+            trade[size_field] = abs(quantity)
+            trade_dicts.append(trade)
+        return trade_dicts
@@ -0,0 +1,48 @@
+"""
+valuation.py
+
+This module contains batch valuation of many portfolios at once. The positions of all
+portfolios are concatenated and valued against one price vector with a single bincount.
+"""
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from .base_portfolio import BasePortfolio
+from .instrument_universe import DEFAULT_UNIVERSE, InstrumentUniverse
+
+
+def revalue_portfolios(portfolios:List[BasePortfolio], prices:Dict | np.ndarray | object,
+                       timestamp:datetime=None, universe:InstrumentUniverse=None)-> np.ndarray:
+    """
+    Revalue every portfolio against the same prices and return their values.
+
+    All portfolios must share `universe` (the default one unless given). `prices` is
+    taken as by InstrumentUniverse.position_prices: one set of prices for equity and
+    bond positions, or a dict of asset class -> prices. A price cache with get_many
+    (see Trading/price_cache.py) is queried once for the instruments held.
+    """
+    universe = universe if universe is not None else DEFAULT_UNIVERSE
+    if any(portfolio.universe is not universe for portfolio in portfolios):
+        raise ValueError("All portfolios must share the same instrument universe")
+    if not portfolios:
+        return np.zeros(0, dtype=np.float64)
+
+    sizes = np.fromiter((len(portfolio) for portfolio in portfolios), dtype=np.int64, count=len(portfolios))
+    codes = np.concatenate([portfolio.codes for portfolio in portfolios])
+    quantities = np.concatenate([portfolio.quantities for portfolio in portfolios])
+    average_costs = np.concatenate([portfolio.average_costs for portfolio in portfolios])
+    multipliers = np.concatenate([portfolio.multipliers for portfolio in portfolios])
+    asset_classes = [asset_class for portfolio in portfolios for asset_class in portfolio.asset_classes]
+
+    # positions without a price are carried at average cost, as in BasePortfolio.market_values
+    position_prices = universe.position_prices(prices, codes, asset_classes)
+    position_prices = np.where(np.isnan(position_prices), average_costs, position_prices)
+    owner = np.repeat(np.arange(len(portfolios)), sizes)
+    values = np.bincount(owner, weights=quantities * position_prices * multipliers, minlength=len(portfolios))
+
+    timestamp = timestamp or datetime.now()
+    for portfolio, value in zip(portfolios, values.tolist()):
+        portfolio.record_value(value, timestamp)
+    return values
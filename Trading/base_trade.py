@@ -4,8 +4,8 @@ base_trade.py
 This module contains the base class for all trades.
 """
 from abc import ABC, abstractmethod
-from uuid import uuid4
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict
 from enum import Enum
 
@@ -18,19 +18,41 @@ class TradeStatus(Enum):
     CANCELLED = "CANCELLED"
 
 
+@lru_cache(maxsize=4096)
+def _parse_date(value:str)-> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def parse_date(value:str | datetime)-> datetime:
+    """
+    Parse a YYYY-MM-DD date. Results are cached since the same maturity and
+    expiration dates repeat across many trades. A missing date (None or "") is None.
+    """
+    if isinstance(value, datetime):
+        return value
+    if value is None or value == "":
+        return None
+    return _parse_date(value)
+
+
 class BaseTrade(ABC):
+    # slotted to avoid a per-instance __dict__; subclasses add the slots for their FIELDS
+    __slots__ = ("_trade_type", "_timestamp", "_status", "trade_id", "user_id")
+
     STATUS = {
-        TradeStatus.NEW: [TradeStatus.VALIDATED],
+        TradeStatus.NEW: [TradeStatus.VALIDATED, TradeStatus.CANCELLED],
         TradeStatus.VALIDATED: [TradeStatus.EXECUTED, TradeStatus.CANCELLED],
         TradeStatus.EXECUTED: [TradeStatus.SETTLED, TradeStatus.CANCELLED],
-        TradeStatus.SETTLED: []
+        TradeStatus.SETTLED: [],
+        TradeStatus.CANCELLED: []
     }
 
-    def __init__(self, trade_type:str, timestamp:datetime, status=TradeStatus.NEW, trade_id:str=None)-> None:
+    def __init__(self, trade_type:str, timestamp:datetime, status=TradeStatus.NEW, trade_id:str=None, user_id:str=None)-> None:
         self._trade_type = trade_type
         self._timestamp = timestamp
         self._status = status
         self.trade_id = trade_id
+        self.user_id = user_id
 
     @property
     def trade_type(self)-> str:
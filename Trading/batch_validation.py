@@ -0,0 +1,161 @@
+"""
+batch_validation.py
+
+This module contains the batch version of the validate_trade rules of EquityTrade,
+BondTrade and DerivativeTrade. Every rule is evaluated as a mask over a batch of
+TradeBook rows and the outcome is collected in a ValidationReport.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+
+import numpy as np
+
+from .base_trade import TradeStatus
+from .trade_book import TradeBook, TRADE_TYPE_CODES, STATUS_CODES
+
+
+class ValidationRule(NamedTuple):
+    name: str
+    trade_type: str
+    message: str
+    # (book, rows, now) -> boolean mask of the rows that break the rule
+    check: Callable[[TradeBook, np.ndarray, np.datetime64], np.ndarray]
+
+
+def _column(name:str)-> Callable[[TradeBook, np.ndarray], np.ndarray]:
+    return lambda book, rows: book.column(name)[rows]
+
+
+_quantity = _column("quantity")
+_price = _column("price")
+_face_value = _column("face_value")
+_coupon_rate = _column("coupon_rate")
+_strike = _column("strike")
+_premium = _column("premium")
+_expiry = _column("expiry")
+
+
+def _missing_expiry(book:TradeBook, rows:np.ndarray, now:np.datetime64)-> np.ndarray:
+    return np.isnat(_expiry(book, rows))
+
+
+def _past_expiry(book:TradeBook, rows:np.ndarray, now:np.datetime64)-> np.ndarray:
+    # NaT compares False, a missing date is left to _missing_expiry
+    return _expiry(book, rows).astype("datetime64[us]") <= now
+
+
+def _expired(book:TradeBook, rows:np.ndarray, now:np.datetime64)-> np.ndarray:
+    # the scalar rules compare full datetimes, a date that is today has already passed
+    expiry = _expiry(book, rows)
+    return np.isnat(expiry) | (expiry.astype("datetime64[us]") <= now)
+
+
+RULES = [
+    # EquityTrade.validate_trade
+    ValidationRule("equity_quantity", "EQUITY", "Quantity must be positive",
+                   lambda book, rows, now: _quantity(book, rows) < 0),
+    ValidationRule("equity_price", "EQUITY", "Price must be positive",
+                   lambda book, rows, now: _price(book, rows) < 0),
+    # BondTrade.validate_trade
+    ValidationRule("bond_face_value", "BOND", "Face value must be positive",
+                   lambda book, rows, now: _face_value(book, rows) <= 0),
+    ValidationRule("bond_coupon_rate", "BOND", "Coupon rate must be between 0 and 15",
+                   lambda book, rows, now: (_coupon_rate(book, rows) <= 0) | (_coupon_rate(book, rows) >= 15)),
+    ValidationRule("bond_maturity_date", "BOND", "Maturity date must be in the future", _expired),
+    # DerivativeTrade.validate_trade
+    ValidationRule("derivative_strike_price", "DERIVATIVE", "Strike price must be positive",
+                   lambda book, rows, now: _strike(book, rows) <= 0),
+    ValidationRule("derivative_expiration_date_missing", "DERIVATIVE", "Expiration date is missing", _missing_expiry),
+    ValidationRule("derivative_expiration_date", "DERIVATIVE", "Expiration date must be in the future", _past_expiry),
+    ValidationRule("derivative_premium", "DERIVATIVE", "Premium must be non-negative",
+                   lambda book, rows, now: _premium(book, rows) < 0),
+]
+
+
+class ValidationReport:
+    """
+    Outcome of validating a batch of rows.
+
+    `failed` is a (rows x rules) boolean matrix, so the errors of any trade can be
+    read back without keeping one list of messages per trade.
+    """
+    def __init__(self, book:TradeBook, rows:np.ndarray, rules:List[ValidationRule], failed:np.ndarray)-> None:
+        self._book = book
+        self.rows = rows
+        self.rules = rules
+        self.failed = failed
+
+    @property
+    def valid(self)-> np.ndarray:
+        return ~self.failed.any(axis=1)
+
+    def __len__(self)-> int:
+        return len(self.rows)
+
+    def rejections_by_rule(self)-> Dict[str, int]:
+        counts = self.failed.sum(axis=0)
+        return {rule.name: int(count) for rule, count in zip(self.rules, counts)}
+
+    def errors(self, index:int)-> List[str]:
+        return [self.rules[rule].message for rule in np.flatnonzero(self.failed[index])]
+
+    def invalid_trades(self)-> Dict[str, List[str]]:
+        trade_ids = self._book.trade_ids
+        return {
+            trade_ids[self.rows[index]]: self.errors(index)
+            for index in np.flatnonzero(~self.valid)
+        }
+
+    def as_dicts(self)-> List[Dict[str, str | List[str]]]:
+        """
+        Per-trade results in the shape returned by TradeProcessor.validate_trade.
+        """
+        trade_ids = self._book.trade_ids
+        status = self._book.column("status")
+        results = []
+        for index, row in enumerate(self.rows):
+            errors = self.errors(index)
+            trade_id = trade_ids[row]
+            if errors:
+                message = f"Trade {trade_id} is invalid. Please check the trade details and try again."
+            else:
+                message = f"Trade {trade_id} is validated."
+            results.append({
+                "trade_id": trade_id,
+                "status": list(TradeStatus)[status[row]].value,
+                "message": message,
+                "errors": errors,
+            })
+        return results
+
+
+def validate_batch(book:TradeBook, rows:np.ndarray=None, now:datetime=None, apply:bool=True,
+                   rules:List[ValidationRule]=None)-> ValidationReport:
+    """
+    Validate `rows` of the book (default: every NEW trade) against `rules`.
+
+    "now" is read once for the whole batch. With `apply`, rows still in NEW are moved
+    to VALIDATED or CANCELLED in bulk.
+    """
+    rules = RULES if rules is None else rules
+    if rows is None:
+        rows = np.flatnonzero(book.mask(status=TradeStatus.NEW))
+    rows = np.asarray(rows, dtype=np.int64)
+    now = np.datetime64(now or datetime.now(), "us")
+
+    trade_type = book.column("trade_type")[rows]
+    failed = np.zeros((len(rows), len(rules)), dtype=bool)
+    for index, rule in enumerate(rules):
+        of_type = np.flatnonzero(trade_type == TRADE_TYPE_CODES[rule.trade_type])
+        if len(of_type):
+            failed[of_type, index] = rule.check(book, rows[of_type], now)
+
+    report = ValidationReport(book, rows, rules, failed)
+
+    if apply:
+        is_new = book.column("status")[rows] == STATUS_CODES[TradeStatus.NEW]
+        valid = report.valid
+        book.set_status_many(rows[is_new & valid], TradeStatus.VALIDATED)
+        book.set_status_many(rows[is_new & ~valid], TradeStatus.CANCELLED)
+
+    return report
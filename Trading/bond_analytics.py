@@ -0,0 +1,191 @@
+"""
+bond_analytics.py
+
+This module contains the BondAnalytics class, which computes accrued interest, yield to
+maturity, duration, convexity and DV01 for arrays of bonds. Coupon schedules are built
+once per (coupon rate, maturity) pair and cached, so repeated repricing under rate
+shocks only redoes the discounting.
+"""
+import calendar
+from datetime import date, datetime
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+
+NEWTON_ITERATIONS = 50
+NEWTON_TOLERANCE = 1e-12
+
+
+def add_months(value:date, months:int)-> date:
+    """
+    Shift a date by whole months, clipping the day to the end of the target month.
+    """
+    month_index = value.year * 12 + value.month - 1 + months
+    year, month = divmod(month_index, 12)
+    day = min(value.day, calendar.monthrange(year, month + 1)[1])
+    return date(year, month + 1, day)
+
+
+class CashflowSchedule(NamedTuple):
+    """
+    Remaining cash flows of a set of bonds, per 100 of face value.
+
+    times and amounts have one row per distinct (coupon, maturity) pair and are
+    zero-padded to the longest schedule; `pair` maps every bond to its row.
+    """
+    times: np.ndarray       # years from settlement to each cash flow
+    amounts: np.ndarray     # coupon (plus redemption on the last one)
+    accrued: np.ndarray     # accrued interest per pair
+    coupon_rates: np.ndarray  # annual coupon rate per pair
+    pair: np.ndarray        # bond -> row of times / amounts / accrued
+
+
+class BondAnalytics:
+    """
+    attributes:
+        Frequency (coupon payments per year)
+        Schedules (per settlement date: (coupon rate, maturity day) -> coupon period data)
+
+    Coupon rates and prices follow BondTrade, i.e. both are percentages (5.0 is a 5%
+    coupon, 99.5 is 99.5% of face value). Prices are clean and yields are annual rates
+    compounded at the coupon frequency.
+    """
+    def __init__(self, frequency:int=2)-> None:
+        if frequency not in (1, 2, 4, 12):
+            raise ValueError("Frequency must be 1, 2, 4 or 12 payments per year")
+        self._frequency = frequency
+        self._settlement = None
+        self._schedules = {}
+
+    @property
+    def frequency(self)-> int:
+        return self._frequency
+
+    def _period(self, coupon_rate:float, maturity_day:int, settlement:date)-> Tuple[int, float, float]:
+        """
+        Remaining coupon count, fraction of the current period still to run and
+        coupon per period for one (coupon, maturity) pair, cached per settlement date.
+        """
+        if settlement != self._settlement:
+            self._schedules = {}
+            self._settlement = settlement
+        key = (coupon_rate, maturity_day)
+        period = self._schedules.get(key)
+        if period is not None:
+            return period
+
+        maturity = np.datetime64(maturity_day, "D").item()
+        coupon = coupon_rate / self._frequency
+        if maturity <= settlement:
+            period = (0, 0.0, coupon)
+        else:
+            step = 12 // self._frequency
+            months = (maturity.year - settlement.year) * 12 + maturity.month - settlement.month
+            # count = number of coupon dates after settlement, next = the first of them
+            count = max(months // step, 0) + 1
+            while add_months(maturity, -(count - 1) * step) <= settlement:
+                count -= 1
+            while add_months(maturity, -count * step) > settlement:
+                count += 1
+            next_coupon = add_months(maturity, -(count - 1) * step)
+            previous_coupon = add_months(maturity, -count * step)
+            remaining = (next_coupon - settlement).days / (next_coupon - previous_coupon).days
+            period = (count, remaining, coupon)
+        self._schedules[key] = period
+        return period
+
+    def schedule(self, coupon_rates:np.ndarray, maturities:np.ndarray, settlement:datetime=None)-> CashflowSchedule:
+        """
+        Cash-flow schedule of every bond. `maturities` are datetime64 values such as
+        TradeBook.column("expiry").
+        """
+        settlement = settlement or datetime.now()
+        if isinstance(settlement, datetime):
+            settlement = settlement.date()
+        coupon_rates = np.asarray(coupon_rates, dtype=np.float64)
+        days = np.asarray(maturities).astype("datetime64[D]").astype(np.int64)
+        pairs, pair = np.unique(np.stack([coupon_rates, days.astype(np.float64)], axis=1), axis=0, return_inverse=True)
+
+        periods = [
+            self._period(coupon_rate, int(day), settlement)
+            for coupon_rate, day in pairs.tolist()
+        ]
+        width = max((count for count, _, _ in periods), default=0)
+        steps = np.arange(width, dtype=np.float64)
+        counts = np.array([count for count, _, _ in periods], dtype=np.int64)
+        remaining = np.array([fraction for _, fraction, _ in periods], dtype=np.float64)
+        coupons = np.array([coupon for _, _, coupon in periods], dtype=np.float64)
+
+        live = steps < counts[:, None]
+        times = np.where(live, (remaining[:, None] + steps) / self._frequency, 0.0)
+        amounts = np.where(live, coupons[:, None], 0.0)
+        redemption = np.flatnonzero(counts)
+        amounts[redemption, counts[redemption] - 1] += 100.0
+        accrued = np.where(counts > 0, coupons * (1.0 - remaining), 0.0)
+        return CashflowSchedule(times, amounts, accrued, pairs[:, 0], pair.reshape(-1))
+
+    def _discounted(self, schedule:CashflowSchedule, yields:np.ndarray)-> Tuple[np.ndarray, np.ndarray]:
+        times = schedule.times[schedule.pair]
+        growth = 1.0 + np.asarray(yields, dtype=np.float64)[:, None] / self._frequency
+        present_values = schedule.amounts[schedule.pair] * growth ** (-self._frequency * times)
+        return times, present_values
+
+    def dirty_prices(self, schedule:CashflowSchedule, yields:np.ndarray)-> np.ndarray:
+        """
+        Dirty price per 100 of face value of every bond at the given yields.
+        """
+        _, present_values = self._discounted(schedule, yields)
+        return present_values.sum(axis=1)
+
+    def clean_prices(self, schedule:CashflowSchedule, yields:np.ndarray)-> np.ndarray:
+        return self.dirty_prices(schedule, yields) - schedule.accrued[schedule.pair]
+
+    def yields(self, schedule:CashflowSchedule, clean_prices:np.ndarray)-> np.ndarray:
+        """
+        Yield to maturity of every bond by Newton's method, run on all bonds at once.
+        Matured bonds and non-positive prices give NaN.
+        """
+        target = np.asarray(clean_prices, dtype=np.float64) + schedule.accrued[schedule.pair]
+        solvable = (schedule.times[schedule.pair].max(axis=1, initial=0.0) > 0) & (target > 0)
+        yields = np.where(solvable, schedule.coupon_rates[schedule.pair] / 100.0, 0.0)
+        floor = -self._frequency + 1e-9
+
+        for _ in range(NEWTON_ITERATIONS):
+            times, present_values = self._discounted(schedule, yields)
+            growth = 1.0 + yields / self._frequency
+            slope = -(times * present_values).sum(axis=1) / growth
+            error = present_values.sum(axis=1) - target
+            step = np.divide(error, slope, out=np.zeros_like(error), where=solvable & (slope != 0))
+            yields = np.maximum(yields - step, floor)
+            if np.max(np.abs(step), initial=0.0) < NEWTON_TOLERANCE:
+                break
+        return np.where(solvable, yields, np.nan)
+
+    def analytics(self, coupon_rates:np.ndarray, maturities:np.ndarray, prices:np.ndarray,
+                  face_values:np.ndarray, settlement:datetime=None)-> Dict[str, np.ndarray]:
+        """
+        Accrued interest, yield, Macaulay and modified duration, convexity and DV01 for
+        arrays of bonds. Accrued interest and DV01 are in currency for the bond's face
+        value; durations and convexity are in years.
+        """
+        schedule = self.schedule(coupon_rates, maturities, settlement)
+        yields = self.yields(schedule, prices)
+        times, present_values = self._discounted(schedule, np.nan_to_num(yields))
+        dirty = present_values.sum(axis=1)
+        growth = 1.0 + yields / self._frequency
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            macaulay = (times * present_values).sum(axis=1) / dirty
+            modified = macaulay / growth
+            convexity = (times * (times + 1.0 / self._frequency) * present_values).sum(axis=1) / (dirty * growth ** 2)
+        face_values = np.asarray(face_values, dtype=np.float64)
+
+        return {
+            "accrued_interest": schedule.accrued[schedule.pair] * face_values / 100.0,
+            "yield": yields,
+            "macaulay_duration": macaulay,
+            "modified_duration": modified,
+            "convexity": convexity,
+            "dv01": modified * dirty * face_values / 100.0 * 1e-4,
+        }
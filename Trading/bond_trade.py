@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Dict, List
-from base_trade import BaseTrade
+from .base_trade import BaseTrade, parse_date
+from .bond_analytics import BondAnalytics
 
 
 class BondTrade(BaseTrade):
@@ -14,13 +15,26 @@ class BondTrade(BaseTrade):
         Issuer (e.g., "US Treasury", "Apple Inc")
         Direction (buy/sell)
     """
+    # column name -> (attribute, type) used by TradeFactory.create_trades
+    FIELDS = {
+        "isin": ("_isin", str),
+        "face_value": ("_face_value", int),
+        "price": ("_price", float),
+        "coupon_rate": ("_coupon_rate", float),
+        "maturity_date": ("_maturity_date", datetime),
+        "issuer": ("_issuer", str),
+        "direction": ("_direction", str),
+    }
+
+    __slots__ = tuple(attribute for attribute, _ in FIELDS.values())
+
     def __init__(self, trade_type:str, timestamp:datetime, status="NEW", trade_id:str=None, **kwargs)-> None:
-        super().__init__(trade_type, timestamp, status, trade_id)
+        super().__init__(trade_type, timestamp, status, trade_id, kwargs.get("user_id"))
         self._isin = kwargs.get("isin")
         self._face_value = int(kwargs.get("face_value"))
         self._price = float(kwargs.get("price"))
         self._coupon_rate = float(kwargs.get("coupon_rate"))
-        self._maturity_date = datetime.strptime(kwargs.get("maturity_date"), "%Y-%m-%d")
+        self._maturity_date = parse_date(kwargs.get("maturity_date"))
         self._issuer = kwargs.get("issuer")
         self._direction = kwargs.get("direction")
 
@@ -40,8 +54,8 @@ class BondTrade(BaseTrade):
     
     @face_value.setter
     def face_value(self, value:float)-> None:
-        if not isinstance(value, float) or value <= 0:
-            raise ValueError("Face value must be a positive float")
+        if not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError("Face value must be a positive number")
         self._face_value = value
     
     @property
@@ -69,12 +83,20 @@ class BondTrade(BaseTrade):
         return self._maturity_date
 
     @maturity_date.setter
+    def maturity_date(self, value:datetime)-> None:
+        if not isinstance(value, datetime):
+            raise ValueError("Maturity date must be a datetime")
+        self._maturity_date = value
 
     @property
     def issuer(self)-> str:
         return self._issuer
     
     @issuer.setter
+    def issuer(self, value:str)-> None:
+        if not isinstance(value, str):
+            raise ValueError("Issuer must be a string")
+        self._issuer = value
     
     @property
     def direction(self)-> str:
@@ -84,16 +106,18 @@ class BondTrade(BaseTrade):
     def direction(self, value:str)-> None:
         if not isinstance(value, str):
             raise ValueError("Direction must be a string")    
+        self._direction = value
     
     def validate_trade(self)-> Dict[str, bool| List[str]]:
         """
         Verify face value is positive, coupon rate is between 0-15%, maturity date is in the future
         """
         validation_errors = []
-        if not isinstance(self.face_value, float) or self.face_value <= 0:
+        # face values are stored as int (see FIELDS), so any real number is accepted
+        if not isinstance(self.face_value, (int, float)) or self.face_value <= 0:
             validation_errors.append("Face value must be positive")
         
-        if not isinstance(self.coupon_rate, float) or self.coupon_rate <= 0 or self.coupon_rate >= 15:
+        if not isinstance(self.coupon_rate, (int, float)) or self.coupon_rate <= 0 or self.coupon_rate >= 15:
             validation_errors.append("Coupon rate must be between 0 and 15")
 
         if not isinstance(self.maturity_date, datetime) or self.maturity_date <= datetime.now():
@@ -110,4 +134,16 @@ class BondTrade(BaseTrade):
         years_to_maturity = maturity_year - current_year
         return self.face_value * self.price * years_to_maturity
 
-
+    def analytics(self, price:float=None, settlement:datetime=None, frequency:int=2)-> Dict[str, float]:
+        """
+        Accrued interest, yield, durations, convexity and DV01 of the bond at `price`
+        (clean, % of face value), or at the traded price when no price is given.
+        """
+        result = BondAnalytics(frequency).analytics(
+            [self.coupon_rate],
+            [self.maturity_date],
+            [self.price if price is None else price],
+            [self.face_value],
+            settlement,
+        )
+        return {name: float(values[0]) for name, values in result.items()}
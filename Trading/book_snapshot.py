@@ -0,0 +1,214 @@
+"""
+book_snapshot.py
+
+This module contains the binary snapshot format of a TradeBook and the state derived
+from it (risk aggregates, trade index, position ledger), with a loader that memory
+maps the file so a restart only reads the pages that are actually used.
+
+Layout: an 8 byte magic, the header length as a little-endian uint64, a JSON header
+and then every array as raw bytes, each starting on a 64 byte boundary. The header
+holds the interned strings, scalar metadata and, per array, its dtype, shape and
+offset from the start of the data section.
+"""
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, NamedTuple
+
+import numpy as np
+
+from .trade_book import TradeBook, Interner, COLUMNS
+
+
+MAGIC = b"TRADEBK1"
+VERSION = 1
+ALIGNMENT = 64
+
+
+class TradeIdColumn(Sequence):
+    """
+    Trade ids stored as one UTF-8 blob plus int64 offsets. Single ids are decoded on
+    access; ids added after loading are kept in a plain list.
+    """
+    def __init__(self, blob:np.ndarray, offsets:np.ndarray)-> None:
+        self._blob = blob
+        self._offsets = offsets
+        self._count = len(offsets) - 1
+        self._appended = []
+
+    def _decode(self, row:int)-> str:
+        return self._blob[self._offsets[row]:self._offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __getitem__(self, row:int | slice)-> str | List[str]:
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if row < self._count:
+            return self._decode(row)
+        return self._appended[row - self._count]
+
+    def __iter__(self)-> Iterator[str]:
+        text = self._blob.tobytes().decode("utf-8")
+        offsets = self._offsets.tolist()
+        if len(text) != len(self._blob):
+            # multi-byte characters: byte offsets are not character offsets
+            yield from (self._decode(row) for row in range(self._count))
+        else:
+            yield from (text[start:stop] for start, stop in zip(offsets[:-1], offsets[1:]))
+        yield from self._appended
+
+    def append(self, trade_id:str)-> None:
+        self._appended.append(trade_id)
+
+    def extend(self, trade_ids:List[str])-> None:
+        self._appended.extend(trade_ids)
+
+    def __len__(self)-> int:
+        return self._count + len(self._appended)
+
+
+class LazyTradeIdIndex(dict):
+    """
+    trade_id -> row mapping that is only built the first time it is used, so that
+    loading a snapshot does not have to decode every trade id.
+    """
+    def __init__(self, trade_ids:TradeIdColumn)-> None:
+        super().__init__()
+        self._trade_ids = trade_ids
+        self._built = False
+
+    def _build(self)-> None:
+        if not self._built:
+            self._built = True
+            super().update((trade_id, row) for row, trade_id in enumerate(self._trade_ids))
+
+    def __getitem__(self, trade_id:str)-> int:
+        self._build()
+        return super().__getitem__(trade_id)
+
+    def __setitem__(self, trade_id:str, row:int)-> None:
+        self._build()
+        super().__setitem__(trade_id, row)
+
+    def __contains__(self, trade_id:object)-> bool:
+        self._build()
+        return super().__contains__(trade_id)
+
+    def get(self, trade_id:str, default=None)-> int:
+        self._build()
+        return super().get(trade_id, default)
+
+    def __iter__(self)-> Iterator[str]:
+        self._build()
+        return super().__iter__()
+
+    def __len__(self)-> int:
+        self._build()
+        return super().__len__()
+
+
+class Snapshot(NamedTuple):
+    book: TradeBook
+    # listener name -> state accepted by its constructor
+    states: Dict[str, Dict[str, np.ndarray]]
+    # JSON values stored alongside, e.g. the event log sequence the snapshot covers
+    metadata: Dict[str, object]
+
+
+def _encode_trade_ids(trade_ids:Sequence)-> Dict[str, np.ndarray]:
+    encoded = [trade_id.encode("utf-8") for trade_id in trade_ids]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return {"blob": np.frombuffer(b"".join(encoded), dtype=np.uint8), "offsets": offsets}
+
+
+def save_snapshot(path:str, book:TradeBook, states:Dict[str, Dict[str, np.ndarray]]=None,
+                  metadata:Dict[str, object]=None)-> int:
+    """
+    Write `book`, the listener `states` (name -> state() output) and JSON `metadata`
+    to `path` and return the number of bytes written. The file is written next to
+    `path` and moved into place, so a crash never leaves a half-written snapshot.
+    """
+    arrays = {f"columns/{name}": column for name, column in book.columns().items()}
+    arrays.update({f"trade_ids/{name}": array for name, array in _encode_trade_ids(book.trade_ids).items()})
+    for listener, state in (states or {}).items():
+        arrays.update({f"{listener}/{name}": np.asarray(array) for name, array in state.items()})
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps({
+        "version": VERSION,
+        "size": len(book),
+        "interners": {"users": book.users.values, "symbols": book.symbols.values, "venues": book.venues.values},
+        "listeners": sorted(states or {}),
+        "metadata": metadata or {},
+        "arrays": entries,
+    }).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack("<Q", len(header)))
+        fh.write(header)
+        for name, array in arrays.items():
+            fh.seek(data_start + entries[name]["offset"])
+            fh.write(array.tobytes())
+        fh.truncate(data_start + offset)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(temporary, path)
+    return data_start + offset
+
+
+def load_snapshot(path:str)-> Snapshot:
+    """
+    Memory map a snapshot written by save_snapshot. Arrays are copy-on-write views of
+    the file: pages are read on first access and changes never reach the file.
+    """
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a trade book snapshot")
+        header_length, = struct.unpack("<Q", fh.read(8))
+        header = json.loads(fh.read(header_length))
+        if header["version"] != VERSION:
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+        buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    def array(name:str)-> np.ndarray:
+        entry = header["arrays"][name]
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+        if count == 0:
+            return np.empty(entry["shape"], dtype=dtype)
+        values = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + entry["offset"])
+        return values.reshape(entry["shape"])
+
+    trade_ids = TradeIdColumn(array("trade_ids/blob"), array("trade_ids/offsets"))
+    interners = header["interners"]
+    book = TradeBook.from_columns(
+        {name: array(f"columns/{name}") for name in COLUMNS},
+        trade_ids,
+        LazyTradeIdIndex(trade_ids),
+        Interner(interners["users"]),
+        Interner(interners["symbols"]),
+        Interner(interners["venues"]),
+    )
+
+    states = {}
+    for listener in header["listeners"]:
+        prefix = f"{listener}/"
+        states[listener] = {
+            name[len(prefix):]: array(name) for name in header["arrays"] if name.startswith(prefix)
+        }
+    return Snapshot(book, states, header["metadata"])
@@ -6,7 +6,8 @@ This module contains the DerivativeTrade class, which is responsible for creatin
 from datetime import datetime
 from typing import Dict, List
 
-from base_trade import BaseTrade
+from .base_trade import BaseTrade, parse_date
+from .option_pricing import black_scholes, year_fractions
 
 
 class DerivativeTrade(BaseTrade):
@@ -20,14 +21,28 @@ class DerivativeTrade(BaseTrade):
         Premium (price paid per contract)
         Direction (buy/sell)
     """
+    # column name -> (attribute, type) used by TradeFactory.create_trades
+    FIELDS = {
+        "underlying_symbol": ("_underlying_symbol", str),
+        "option_type": ("_option_type", str),
+        "strike_price": ("_strike_price", float),
+        "expiration_date": ("_expiration_date", datetime),
+        "quantity": ("_quantity", int),
+        "premium": ("_premium", float),
+        "direction": ("_direction", str),
+    }
+
+    __slots__ = tuple(attribute for attribute, _ in FIELDS.values())
+
     def __init__(self, trade_type:str, timestamp:datetime, status="NEW", trade_id:str=None, **kwargs)-> None:
-        super().__init__(trade_type, timestamp, status, trade_id)
+        super().__init__(trade_type, timestamp, status, trade_id, kwargs.get("user_id"))
         self._underlying_symbol = kwargs.get("underlying_symbol")
         self._option_type = kwargs.get("option_type")
         self._strike_price = float(kwargs.get("strike_price", 0))
-        self._expiration_date = datetime.strptime(kwargs.get("expiration_date"), "%Y-%m-%d")
+        self._expiration_date = parse_date(kwargs.get("expiration_date"))
         self._quantity = int(kwargs.get("quantity", 0))
         self._premium = float(kwargs.get("premium", 0))
+        self._direction = kwargs.get("direction")
     
     @property
     def underlying_symbol(self)-> str:
@@ -89,6 +104,16 @@ class DerivativeTrade(BaseTrade):
             raise ValueError("premium must be a float")
         self._premium = value    
 
+    @property
+    def direction(self)-> str:
+        return self._direction
+
+    @direction.setter
+    def direction(self, value:str)-> None:
+        if not isinstance(value, str):
+            raise ValueError("direction must be a string")
+        self._direction = value
+
     def validate_trade(self)-> Dict[str, bool| List[str]]:
         """
         Verify strike price is positive, expiration date is in the future, premium is non-negative
@@ -96,7 +121,9 @@ class DerivativeTrade(BaseTrade):
         validation_errors = []
         if self.strike_price <= 0:
             validation_errors.append("Strike price must be positive")
-        if self.expiration_date <= datetime.now() or self.expiration_date is None:
+        if self.expiration_date is None:
+            validation_errors.append("Expiration date is missing")
+        elif self.expiration_date <= datetime.now():
             validation_errors.append("Expiration date must be in the future")
         if self.premium < 0:
             validation_errors.append("Premium must be non-negative")
@@ -106,9 +133,29 @@ class DerivativeTrade(BaseTrade):
         else:
             return True
             
-    def calculate_risk(self)-> float:
+    def greeks(self, spot:float=None, volatility:float=0.2, rate:float=0.0, now:datetime=None)-> Dict[str, float]:
+        """
+        Black-Scholes price, delta, gamma, vega and theta of one contract. The strike is
+        used as the underlying price when no spot is given.
         """
-        Calculate the risk of the trade
+        result = black_scholes(
+            self.strike_price if spot is None else spot,
+            self.strike_price,
+            year_fractions([self.expiration_date], now),
+            volatility,
+            rate,
+            str(self.option_type).lower() == "call",
+        )
+        return {name: float(values[0]) for name, values in result.items()}
+
+    def calculate_risk(self, spot:float=None, volatility:float=None, rate:float=0.0)-> float:
         """
+        Calculate the risk of the trade. With a volatility this is the Black-Scholes
+        delta notional, delta x underlying price x quantity.
+        """
+        if volatility is not None:
+            spot = self.strike_price if spot is None else spot
+            return self.greeks(spot, volatility, rate)["delta"] * spot * self.quantity
+
         # Calculate simple delta exposure (0.5 × strike price × quantity for calls, -0.5 × strike price × quantity for puts)
-        return 0.5 * self.strike_price * self.quantity if self.option_type == "call" else -0.5 * self.strike_price * self.quantity
+        return 0.5 * self.strike_price * self.quantity if str(self.option_type).lower() == "call" else -0.5 * self.strike_price * self.quantity
@@ -4,12 +4,23 @@ equity_trade.py
 """
 from datetime import datetime
 from typing import Dict, List   
-from base_trade import BaseTrade
+from .base_trade import BaseTrade
 
 
 class EquityTrade(BaseTrade):
+    # column name -> (attribute, type) used by TradeFactory.create_trades
+    FIELDS = {
+        "symbol": ("_symbol", str),
+        "quantity": ("_quantity", float),
+        "price": ("_price", float),
+        "direction": ("_direction", str),
+        "market": ("_market", str),
+    }
+
+    __slots__ = tuple(attribute for attribute, _ in FIELDS.values())
+
     def __init__(self, trade_type:str, timestamp:datetime, status="NEW", trade_id:str=None, **kwargs)-> None:
-        super().__init__(trade_type, timestamp, status, trade_id)
+        super().__init__(trade_type, timestamp, status, trade_id, kwargs.get("user_id"))
         self._symbol = kwargs.get("symbol")
         self._quantity = float(kwargs.get("quantity"))
         self._price = float(kwargs.get("price"))
@@ -0,0 +1,287 @@
+"""
+event_log.py
+
+This module contains the EventLog class, an append-only binary write-ahead log of
+trade book events (trades added and status changes) with group commit, and the
+replay function that rebuilds a TradeBook from it.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+from .trade_book import TradeBook, COLUMNS, STATUSES
+
+
+ADD = 1
+STATUS = 2
+STATUS_MANY = 3
+
+# frame: payload length, crc32 of (kind, sequence, payload), kind, sequence
+FRAME = struct.Struct("<IIBQ")
+FRAME_CHECKED = struct.Struct("<BQ")
+# status change: row, new status code
+STATUS_PAYLOAD = struct.Struct("<qb")
+# bulk status change: new status code, followed by the rows as int64
+STATUS_MANY_HEADER = struct.Struct("<b")
+# added trade: the numeric columns in NUMERIC_COLUMNS order
+NUMERIC_COLUMNS = ["trade_type", "status", "direction", "option_type", "quantity", "price", "strike",
+                   "premium", "face_value", "coupon_rate", "expiry", "timestamp"]
+ADD_PAYLOAD = struct.Struct("<bbbb" + "d" * 6 + "qq")
+# added trade: then the trade id and the interned strings, each length prefixed
+STRING_COLUMNS = ["user", "symbol", "venue"]
+STRING_LENGTH = struct.Struct("<I")
+NO_STRING = 0xFFFFFFFF
+
+
+def _encode_string(value:str)-> bytes:
+    # called after the book has committed the row, so anything that isn't None is
+    # logged as its str() (e.g. a numeric user_id) rather than failing here
+    if value is None:
+        return STRING_LENGTH.pack(NO_STRING)
+    encoded = (value if isinstance(value, str) else str(value)).encode("utf-8", "surrogatepass")
+    if len(encoded) >= NO_STRING:
+        raise ValueError(f"String of {len(encoded)} bytes is too long for the event log")
+    return STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+def _decode_string(payload:bytes, offset:int)-> Tuple[str, int]:
+    length, = STRING_LENGTH.unpack_from(payload, offset)
+    offset += STRING_LENGTH.size
+    if length == NO_STRING:
+        return None, offset
+    return payload[offset:offset + length].decode("utf-8", "surrogatepass"), offset + length
+
+
+def _frames(path:str)-> Iterator[Tuple[int, int, bytes, int]]:
+    # streamed frame by frame, the log is never held in memory as a whole
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as fh:
+        offset = 0
+        while True:
+            header = fh.read(FRAME.size)
+            if len(header) < FRAME.size:
+                return
+            length, checksum, kind, sequence = FRAME.unpack(header)
+            payload = fh.read(length)
+            if len(payload) < length or zlib.crc32(payload, zlib.crc32(header[8:])) != checksum:
+                return
+            offset += FRAME.size + length
+            yield sequence, kind, payload, offset
+
+
+def read_events(path:str, after_sequence:int=0)-> Iterator[Tuple[int, int, bytes, int]]:
+    """
+    Yield (sequence, kind, payload, end offset) for every intact event in the log with
+    a sequence above `after_sequence`. Reading stops at the first torn or corrupt
+    frame, i.e. whatever a crash left half-written.
+    """
+    for event in _frames(path):
+        if event[0] > after_sequence:
+            yield event
+
+
+class EventLog:
+    """
+    attributes:
+        Path (the log file, appended to)
+        Group size (events buffered before a commit)
+        Commit interval (seconds an event may wait in the buffer before a commit)
+        Sequence (number of the last event written)
+
+    The log subscribes to a TradeBook like any other listener. Events are encoded into
+    an in-memory buffer and written with a single write and fsync per group, so the
+    cost of the fsync is shared by every event of the group. A group is committed when
+    it is full or `commit_interval` seconds after its first event, by a timer thread if
+    no further event arrives. An event is durable once commit() has run; a crash can
+    lose at most the events still buffered.
+    """
+    def __init__(self, path:str, group_size:int=1000, commit_interval:float=0.05, fsync:bool=True,
+                 start_sequence:int=0, end:int=None)-> None:
+        if group_size <= 0:
+            raise ValueError("group_size must be a positive integer")
+        self._path = path
+        self._group_size = group_size
+        self._commit_interval = commit_interval
+        self._fsync = fsync
+        self._book = None
+
+        # drop a torn tail left by a crash and continue the sequence after the last event
+        # (or after `start_sequence`, the sequence of the snapshot the log was reset at).
+        # `end` is the end of the last intact event when the caller has just read the log.
+        self._sequence = start_sequence
+        if end is None:
+            end = 0
+            for sequence, _, _, end in _frames(path):
+                self._sequence = max(self._sequence, sequence)
+        self._file = open(path, "ab")
+        self._file.truncate(end)
+
+        self._buffer = bytearray()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        # the timer thread commits too, so the buffer and the file are used under this lock
+        self._lock = threading.RLock()
+        self._timer = None
+        self.commits = 0
+
+    @property
+    def path(self)-> str:
+        return self._path
+
+    @property
+    def sequence(self)-> int:
+        return self._sequence
+
+    @property
+    def pending(self)-> int:
+        """
+        Events buffered but not yet committed.
+        """
+        return self._pending
+
+    def attach(self, book:TradeBook)-> None:
+        """
+        Start logging every change made to `book`.
+        """
+        self._book = book
+        book.subscribe(self)
+
+    def detach(self)-> None:
+        if self._book is not None:
+            self._book.unsubscribe(self)
+            self._book = None
+
+    def _record(self, kind:int, payload:bytes)-> None:
+        with self._lock:
+            self._sequence += 1
+            checked = FRAME_CHECKED.pack(kind, self._sequence)
+            buffer = self._buffer
+            buffer += struct.pack("<II", len(payload), zlib.crc32(payload, zlib.crc32(checked)))
+            buffer += checked
+            buffer += payload
+            self._pending += 1
+            if self._pending >= self._group_size or time.monotonic() - self._last_commit >= self._commit_interval:
+                self.commit()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._commit_interval, self._commit_idle)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _commit_idle(self)-> None:
+        with self._lock:
+            self._timer = None
+            if not self._file.closed:
+                self.commit()
+
+    def _cancel_timer(self)-> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def on_append(self, row:int)-> None:
+        book = self._book
+        columns = book._columns
+        numbers = [columns[name][row] for name in NUMERIC_COLUMNS]
+        numbers[-2:] = [int(value.astype(np.int64)) for value in numbers[-2:]]
+        payload = ADD_PAYLOAD.pack(*numbers) + _encode_string(book.trade_ids[row])
+        payload += _encode_string(book.users.value(int(columns["user"][row])))
+        payload += _encode_string(book.symbols.value(int(columns["symbol"][row])))
+        payload += _encode_string(book.venues.value(int(columns["venue"][row])))
+        self._record(ADD, payload)
+
+    def on_status_change(self, row:int, old_code:int, new_code:int)-> None:
+        self._record(STATUS, STATUS_PAYLOAD.pack(row, new_code))
+
+    def on_status_change_many(self, rows:np.ndarray, old_codes:np.ndarray, new_code:int)-> None:
+        # one event for the whole batch: on replay it is applied completely or not at all
+        self._record(STATUS_MANY, STATUS_MANY_HEADER.pack(new_code) + rows.astype("<i8").tobytes())
+
+    def commit(self)-> None:
+        """
+        Write and fsync every buffered event.
+        """
+        with self._lock:
+            self._cancel_timer()
+            if self._buffer:
+                self._file.write(self._buffer)
+                self._file.flush()
+                if self._fsync:
+                    os.fsync(self._file.fileno())
+                self._buffer = bytearray()
+                self._pending = 0
+                self.commits += 1
+            self._last_commit = time.monotonic()
+
+    def reset(self)-> None:
+        """
+        Empty the log, e.g. once a snapshot covering every event has been written.
+        The sequence keeps counting from where it was.
+        """
+        with self._lock:
+            self.commit()
+            self._file.truncate(0)
+            self._file.seek(0)
+
+    def close(self)-> None:
+        with self._lock:
+            self.commit()
+            self.detach()
+            self._file.close()
+
+
+def _decode_add(payload:bytes)-> Tuple[str, Dict[str, object]]:
+    numbers = ADD_PAYLOAD.unpack_from(payload)
+    values = dict(zip(NUMERIC_COLUMNS, numbers))
+    # NaT is stored as its int64 value and comes back as NaT
+    for name in ("expiry", "timestamp"):
+        values[name] = np.int64(values[name]).astype(COLUMNS[name])
+    trade_id, offset = _decode_string(payload, ADD_PAYLOAD.size)
+    for name in STRING_COLUMNS:
+        values[name], offset = _decode_string(payload, offset)
+    return trade_id, values
+
+
+def _replay(path:str, book:TradeBook, after_sequence:int)-> Tuple[int, int]:
+    # (last sequence, end of the last intact event) after applying the events
+    last = after_sequence
+    end = 0
+    for sequence, kind, payload, end in _frames(path):
+        if sequence <= after_sequence:
+            continue
+        if kind == ADD:
+            trade_id, values = _decode_add(payload)
+            book.append_row(trade_id, values)
+        elif kind == STATUS:
+            row, code = STATUS_PAYLOAD.unpack(payload)
+            book.set_status(row, STATUSES[code])
+        elif kind == STATUS_MANY:
+            code, = STATUS_MANY_HEADER.unpack_from(payload)
+            book.set_status_many(np.frombuffer(payload, dtype="<i8", offset=STATUS_MANY_HEADER.size), STATUSES[code])
+        else:
+            raise ValueError(f"Unknown event kind {kind} at sequence {sequence}")
+        last = sequence
+    return last, end
+
+
+def replay(path:str, book:TradeBook, after_sequence:int=0)-> int:
+    """
+    Apply the events of the log at `path` with a sequence above `after_sequence` (the
+    sequence a snapshot was taken at) to `book`, and return the last sequence applied.
+    The book's listeners are notified as usual, so derived state is rebuilt as well.
+    """
+    return _replay(path, book, after_sequence)[0]
+
+
+def recover(path:str, book:TradeBook, after_sequence:int=0, **options)-> EventLog:
+    """
+    replay() the log into `book` and open it for appending after the last intact event,
+    reading the file once. `options` are passed to EventLog. The log is not attached.
+    """
+    last, end = _replay(path, book, after_sequence)
+    return EventLog(path, start_sequence=last, end=end, **options)
@@ -0,0 +1,268 @@
+"""
+metrics.py
+
+This module contains the Metrics registry used to instrument trade processing:
+counters, timing histograms and gauges, readable in-process with snapshot() or as
+Prometheus text with prometheus() / serve().
+
+Instrumentation is off unless a Metrics object is given to the TradeProcessor; the
+instrumented code then only pays for an `is None` check per batch or pass.
+"""
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+# upper bounds in seconds, from 10 microseconds to 60 seconds
+DEFAULT_BUCKETS = [0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    attributes:
+        Bounds (bucket upper bounds, ascending)
+        Counts (observations per bucket, the last bucket is everything above the bounds)
+        Sum and count of all observations
+    """
+    def __init__(self, bounds:List[float]=None)-> None:
+        self.bounds = list(bounds or DEFAULT_BUCKETS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float)-> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def observe_many(self, values:np.ndarray)-> None:
+        values = np.asarray(values, dtype=np.float64)
+        buckets = np.bincount(np.searchsorted(self.bounds, values, side="left"), minlength=len(self.counts))
+        self.counts = [count + int(added) for count, added in zip(self.counts, buckets)]
+        self.sum += float(values.sum())
+        self.count += len(values)
+
+    def cumulative(self)-> List[int]:
+        return np.cumsum(self.counts).tolist()
+
+    def quantile(self, q:float)-> float:
+        """
+        Upper bound of the bucket holding the q-th quantile (inf past the last bound).
+        """
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(self.cumulative(), q * self.count, side="left"))
+        return self.bounds[index] if index < len(self.bounds) else float("inf")
+
+    def snapshot(self)-> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _labels(labels:Dict[str, str])-> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels:Labels, extra:Labels=())-> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_value(value:float)-> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    attributes:
+        Prefix (prepended to every metric name in the Prometheus output)
+        Buckets (histogram bounds in seconds)
+
+    Metric names are plain strings and labels keyword arguments, e.g.
+    increment("stage_rows_total", 500, stage="add"). Gauges are either set to a value
+    or registered as a callable that is read when a snapshot is taken, so queue depths
+    cost nothing while trades are processed.
+    """
+    def __init__(self, prefix:str="trade", buckets:List[float]=None)-> None:
+        self.prefix = prefix
+        self.buckets = list(buckets or DEFAULT_BUCKETS)
+        # the Prometheus endpoint reads from another thread
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+
+    def increment(self, name:str, value:float=1, **labels)-> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _histogram(self, name:str, labels:Dict[str, str])-> Histogram:
+        key = (name, _labels(labels))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, name:str, value:float, **labels)-> None:
+        with self._lock:
+            self._histogram(name, labels).observe(value)
+
+    def observe_many(self, name:str, values:np.ndarray, **labels)-> None:
+        with self._lock:
+            self._histogram(name, labels).observe_many(values)
+
+    def set_gauge(self, name:str, value:float | Callable[[], float], **labels)-> None:
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def remove_gauge(self, name:str, **labels)-> None:
+        with self._lock:
+            self._gauges.pop((name, _labels(labels)), None)
+
+    def record_stage(self, stage:str, rows_in:int, rows_out:int, seconds:float)-> None:
+        """
+        One batch (or one four-pass pass) through a lifecycle stage.
+        """
+        labels = (("stage", stage),)
+        with self._lock:
+            counters = self._counters
+            for name, value in (("stage_batches_total", 1), ("stage_rows_in_total", rows_in),
+                                ("stage_rows_out_total", rows_out)):
+                counters[(name, labels)] = counters.get((name, labels), 0) + value
+            self._histogram("stage_seconds", {"stage": stage}).observe(seconds)
+
+    def record_validation(self, report)-> None:
+        """
+        Count the trades of a ValidationReport and its rejections per rule.
+        """
+        valid = int(report.valid.sum())
+        self.increment("validated_total", valid)
+        self.increment("rejected_total", len(report) - valid)
+        for rule, count in report.rejections_by_rule().items():
+            if count:
+                self.increment("rejections_total", count, rule=rule)
+
+    def reset(self)-> None:
+        """
+        Zero the counters and histograms; registered gauges are kept.
+        """
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def _gauge_values(self)-> Dict[Tuple[str, Labels], float]:
+        values = {}
+        for key, gauge in self._gauges.items():
+            values[key] = gauge() if callable(gauge) else gauge
+        return values
+
+    @staticmethod
+    def _nest(values:Dict[Tuple[str, Labels], object])-> Dict[str, object]:
+        # unlabelled metrics map to their value, labelled ones to {label values: value}
+        nested = {}
+        for (name, labels), value in sorted(values.items()):
+            if labels:
+                nested.setdefault(name, {})[",".join(label for _, label in labels)] = value
+            else:
+                nested[name] = value
+        return nested
+
+    def snapshot(self)-> Dict[str, Dict[str, object]]:
+        """
+        Current values as plain dicts: counters, gauges and histogram summaries
+        (count, sum, mean and bucket-resolution p50 / p90 / p99 in seconds).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: histogram.snapshot() for key, histogram in self._histograms.items()}
+            gauges = self._gauge_values()
+        return {
+            "counters": self._nest(counters),
+            "gauges": self._nest(gauges),
+            "histograms": self._nest(histograms),
+        }
+
+    def prometheus(self)-> str:
+        """
+        Every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in self._histograms.items()
+            }
+            gauges = self._gauge_values()
+
+        lines = []
+        declared = set()
+
+        def declare(name:str, kind:str)-> None:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            name = f"{self.prefix}_{name}"
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in sorted(gauges.items()):
+            name = f"{self.prefix}_{name}"
+            declare(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (cumulative, total, count) in sorted(histograms.items()):
+            name = f"{self.prefix}_{name}"
+            declare(name, "histogram")
+            for bound, observed in zip(self.buckets + [float("inf")], cumulative):
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {observed}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port:int, host:str="127.0.0.1")-> "ThreadingHTTPServer":
+        """
+        Serve prometheus() on http://host:port/metrics from a background thread.
+        Call shutdown() on the returned server to stop it.
+        """
+        # imported here, http.server is slow to import and only needed by the endpoint
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self)-> None:
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format:str, *args)-> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,110 @@
+"""
+option_pricing.py
+
+This module contains vectorized Black-Scholes pricing and Greeks for whole option
+books, and the OptionModel class holding the volatility and rate inputs used by the
+risk engine.
+"""
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+
+DAYS_PER_YEAR = 365.0
+
+# Zelen & Severo (Abramowitz & Stegun 26.2.17) coefficients, |error| < 7.5e-8
+_P = 0.2316419
+_B = (0.319381530, -0.356563782, 1.781477937, -1.821255978, 1.330274429)
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x:np.ndarray)-> np.ndarray:
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def norm_cdf(x:np.ndarray)-> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    t = 1.0 / (1.0 + _P * np.abs(x))
+    polynomial = t * (_B[0] + t * (_B[1] + t * (_B[2] + t * (_B[3] + t * _B[4]))))
+    upper_tail = norm_pdf(x) * polynomial
+    return np.where(x >= 0, 1.0 - upper_tail, upper_tail)
+
+
+def year_fractions(expiry:np.ndarray, now:datetime=None)-> np.ndarray:
+    """
+    ACT/365 years from `now` to each datetime64 expiry, floored at zero.
+    """
+    now = np.datetime64(now or datetime.now(), "us")
+    seconds = (np.asarray(expiry).astype("datetime64[us]") - now) / np.timedelta64(1, "s")
+    return np.maximum(seconds / (DAYS_PER_YEAR * 86400.0), 0.0)
+
+
+def black_scholes(spot:np.ndarray, strike:np.ndarray, time_to_expiry:np.ndarray, volatility:np.ndarray,
+                  rate:np.ndarray, is_call:np.ndarray)-> Dict[str, np.ndarray]:
+    """
+    Black-Scholes price, delta, gamma, vega and theta for arrays of European options.
+
+    All inputs broadcast against each other. Vega is per 1.00 of volatility and theta per
+    year. Options at or past expiry, or with zero volatility, are valued at their
+    discounted intrinsic value with zero gamma and vega.
+    """
+    spot, strike, time_to_expiry, volatility, rate, is_call = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (spot, strike, time_to_expiry, volatility, rate)),
+        np.asarray(is_call, dtype=bool))
+
+    live = (time_to_expiry > 0) & (volatility > 0) & (spot > 0) & (strike > 0)
+    t = np.where(live, time_to_expiry, 1.0)
+    sigma = np.where(live, volatility, 1.0)
+    sqrt_t = np.sqrt(t)
+    discount = np.exp(-rate * time_to_expiry)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+    d1 = np.where(live, d1, 0.0)
+    d2 = d1 - sigma * sqrt_t
+    nd1, nd2 = norm_cdf(d1), norm_cdf(d2)
+    pdf_d1 = norm_pdf(d1)
+
+    call_price = spot * nd1 - strike * discount * nd2
+    put_price = strike * discount * (1.0 - nd2) - spot * (1.0 - nd1)
+    price = np.where(is_call, call_price, put_price)
+    delta = np.where(is_call, nd1, nd1 - 1.0)
+    gamma = pdf_d1 / (spot * sigma * sqrt_t)
+    vega = spot * pdf_d1 * sqrt_t
+    decay = -spot * pdf_d1 * sigma / (2.0 * sqrt_t)
+    theta = np.where(is_call, decay - rate * strike * discount * nd2,
+                     decay + rate * strike * discount * (1.0 - nd2))
+
+    # expired / degenerate options: intrinsic value and a step delta
+    intrinsic = np.where(is_call, np.maximum(spot - strike * discount, 0.0), np.maximum(strike * discount - spot, 0.0))
+    in_the_money = np.where(is_call, spot > strike, spot < strike)
+    dead = ~live
+    price = np.where(dead, intrinsic, price)
+    delta = np.where(dead, np.where(in_the_money, np.where(is_call, 1.0, -1.0), 0.0), delta)
+    gamma = np.where(dead, 0.0, gamma)
+    vega = np.where(dead, 0.0, vega)
+    theta = np.where(dead, 0.0, theta)
+
+    return {"price": price, "delta": delta, "gamma": gamma, "vega": vega, "theta": theta}
+
+
+class OptionModel:
+    """
+    attributes:
+        Volatility (a single value, or symbol -> volatility with a default for the rest)
+        Rate (continuously compounded risk-free rate)
+    """
+    def __init__(self, volatility:float | Dict[str, float]=0.2, rate:float=0.0, default_volatility:float=0.2)-> None:
+        self.volatility = volatility
+        self.rate = rate
+        self.default_volatility = default_volatility
+
+    def volatilities(self, symbols:List[str])-> np.ndarray:
+        """
+        Volatility per symbol, aligned with `symbols` (e.g. TradeBook.symbols.values).
+        """
+        if isinstance(self.volatility, dict):
+            return np.array([self.volatility.get(symbol, self.default_volatility) for symbol in symbols],
+                            dtype=np.float64)
+        return np.full(len(symbols), float(self.volatility))
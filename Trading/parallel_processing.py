@@ -0,0 +1,154 @@
+"""
+parallel_processing.py
+
+This module contains the multi-process mode of TradeProcessor.process_trades. The input
+is partitioned by user_id or symbol, each worker process runs its own TradeProcessor
+over its shard, and the partial risk aggregates and net quantities are merged at the end.
+"""
+import multiprocessing as mp
+import os
+import queue
+from typing import Dict, Iterable, List
+from zlib import crc32
+
+
+PARTITION_KEYS = {
+    "user_id": ("user_id",),
+    "symbol": ("symbol", "underlying_symbol", "isin"),
+}
+
+# batches queued per worker before the reader blocks, bounds the parent's memory
+QUEUE_DEPTH = 4
+# seconds between liveness checks while the parent waits on a worker queue
+POLL_INTERVAL = 1.0
+
+
+def shard_of(trade_details:Dict, fields:tuple, workers:int)-> int:
+    """
+    Stable shard number of a trade. crc32 is used instead of hash() because string
+    hashes are randomised per process.
+    """
+    for field in fields:
+        key = trade_details.get(field)
+        if key is not None:
+            return crc32(str(key).encode()) % workers
+    return 0
+
+
+def _worker(inbox:mp.Queue, outbox:mp.Queue)-> None:
+    from .trade_processor import TradeProcessor
+
+    processor = TradeProcessor()
+    add_errors = {}
+    rejected = {}
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        result = processor.run_pipeline(batch, batch_size=len(batch))
+        add_errors.update(result.add_errors)
+        rejected.update(result.rejected)
+
+    outbox.put({
+        "trades": len(processor.trades),
+        "risk_exposure": processor.current_risk_exposure(),
+        "net_quantity": processor.calculate_net_quantity(),
+        "add_errors": add_errors,
+        "rejected": rejected,
+    })
+
+
+def _check_alive(process:mp.Process)-> None:
+    if not process.is_alive():
+        raise RuntimeError(f"Worker {process.name} died with exit code {process.exitcode}")
+
+
+def _put(inbox:mp.Queue, batch:List[Dict] | None, process:mp.Process)-> None:
+    # a full inbox never drains if its worker is gone, so don't block on it forever
+    while True:
+        _check_alive(process)
+        try:
+            inbox.put(batch, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            continue
+
+
+def _collect(outbox:mp.Queue, processes:List[mp.Process])-> List[Dict]:
+    parts = []
+    while len(parts) < len(processes):
+        try:
+            parts.append(outbox.get(timeout=POLL_INTERVAL))
+        except queue.Empty:
+            # a worker that exited cleanly has already put its result, which may still
+            # be in flight; only one that failed is an error
+            for process in processes:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(f"Worker {process.name} died with exit code {process.exitcode}")
+    return parts
+
+
+def _add_totals(total:Dict, part:Dict)-> None:
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _add_totals(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def merge_results(parts:List[Dict])-> Dict:
+    merged = {"trades": 0, "risk_exposure": {}, "net_quantity": {}, "add_errors": {}, "rejected": {}}
+    for part in parts:
+        merged["trades"] += part["trades"]
+        _add_totals(merged["risk_exposure"], part["risk_exposure"])
+        _add_totals(merged["net_quantity"], part["net_quantity"])
+        merged["add_errors"].update(part["add_errors"])
+        merged["rejected"].update(part["rejected"])
+    return merged
+
+
+def process_trades_parallel(trade_details:Iterable[Dict], workers:int=None, partition_by:str="user_id",
+                            batch_size:int=10000)-> Dict:
+    """
+    Process `trade_details` on `workers` processes (default: one per core).
+
+    Trades are streamed to the workers in batches of `batch_size`. Duplicate trade ids
+    are only detected within a shard, so partition by a key that keeps them together.
+    Raises RuntimeError if a worker process dies instead of waiting on it forever.
+    """
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Invalid partition key: {partition_by}. Try 'user_id' or 'symbol'.")
+    workers = workers or os.cpu_count() or 1
+    fields = PARTITION_KEYS[partition_by]
+
+    outbox = mp.Queue()
+    inboxes = [mp.Queue(QUEUE_DEPTH) for _ in range(workers)]
+    processes = [mp.Process(target=_worker, args=(inbox, outbox), daemon=True) for inbox in inboxes]
+    for process in processes:
+        process.start()
+
+    buffers = [[] for _ in range(workers)]
+    try:
+        for trade in trade_details:
+            shard = shard_of(trade, fields, workers)
+            buffers[shard].append(trade)
+            if len(buffers[shard]) >= batch_size:
+                _put(inboxes[shard], buffers[shard], processes[shard])
+                buffers[shard] = []
+
+        for shard, buffer in enumerate(buffers):
+            if buffer:
+                _put(inboxes[shard], buffer, processes[shard])
+            _put(inboxes[shard], None, processes[shard])
+
+        # drain the results before joining, a worker can't exit while its result is unread
+        parts = _collect(outbox, processes)
+    finally:
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+    merged = merge_results(parts)
+    merged["workers"] = workers
+    return merged
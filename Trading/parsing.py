@@ -0,0 +1,74 @@
+"""
+parsing.py
+
+This module contains the per trade type schemas of trade lines (the field order of
+each trade type, as in trade_data.txt) and parse_line, which names the fields of one
+line with them. read_data uses the same schemas for its bulk parser.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class Field(NamedTuple):
+    name: str
+    # "str", "float", "int", "date" (YYYY-MM-DD) or "choice"
+    kind: str
+    # accepted values of a "choice" field, compared upper-cased
+    choices: Tuple[str, ...] = ()
+
+
+class Schema(NamedTuple):
+    fields: List[Field]
+    # the leading fields every line must have, the remaining ones are optional
+    required: int
+
+
+_HEADER = [Field("trade_id", "str"), Field("user_id", "str"), Field("trade_type", "str")]
+_DIRECTION = Field("direction", "choice", ("BUY", "SELL"))
+
+# field order of each trade type in a trade file, as in trade_data.txt
+SCHEMAS = {
+    "EQUITY": Schema(_HEADER + [
+        Field("symbol", "str"), _DIRECTION, Field("quantity", "float"), Field("price", "float"),
+        Field("market", "str"),
+    ], required=7),
+    "BOND": Schema(_HEADER + [
+        Field("isin", "str"), _DIRECTION, Field("face_value", "float"), Field("price", "float"),
+        Field("coupon_rate", "float"), Field("maturity_date", "date"), Field("issuer", "str"),
+    ], required=9),
+    # premium and expiration_date may be left off, as in trade_data.txt; validation then
+    # rejects the trade for its missing expiry
+    "DERIVATIVE": Schema(_HEADER + [
+        Field("underlying_symbol", "str"), Field("option_type", "choice", ("CALL", "PUT")), _DIRECTION,
+        Field("quantity", "int"), Field("strike_price", "float"), Field("premium", "float"),
+        Field("expiration_date", "date"),
+    ], required=8),
+}
+
+
+def layout_error(trade_type:str, count:int)-> str:
+    """
+    Why a line of `trade_type` with `count` fields doesn't fit SCHEMAS, or None.
+    """
+    schema = SCHEMAS.get(trade_type)
+    if schema is None:
+        return f"Unknown trade type: {trade_type}"
+    if not schema.required <= count <= len(schema.fields):
+        if schema.required == len(schema.fields):
+            return f"{trade_type} lines need {schema.required} fields, got {count}"
+        return f"{trade_type} lines need {schema.required} to {len(schema.fields)} fields, got {count}"
+    return None
+
+
+def parse_line(line:str, delimiter:str=",")-> Dict[str, str]:
+    """
+    Name the fields of one trade line with SCHEMAS, e.g. for a line received over a
+    socket. Values stay strings (the trade classes convert them); a line whose trade
+    type or field count doesn't fit its schema raises ValueError.
+    """
+    values = line.strip().split(delimiter)
+    if len(values) < 3:
+        raise ValueError(f"Expected at least 3 fields, got {len(values)}")
+    message = layout_error(values[2], len(values))
+    if message:
+        raise ValueError(message)
+    return {field.name: value for field, value in zip(SCHEMAS[values[2]].fields, values)}
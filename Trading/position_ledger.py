@@ -0,0 +1,179 @@
+"""
+position_ledger.py
+
+This module contains the PositionLedger class, which keeps the net quantity, average
+cost and realized P&L of every (user, instrument) position up to date as trades are
+executed, instead of rebuilding positions from every trade on each query.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .base_trade import TradeStatus
+from .trade_book import TradeBook, TRADE_TYPES, TRADE_TYPE_CODES, STATUS_CODES
+
+
+# a trade affects positions once it is executed, and keeps doing so once settled
+POSITION_STATUSES = (TradeStatus.EXECUTED, TradeStatus.SETTLED)
+
+INITIAL_CAPACITY = 256
+
+
+class PositionLedger:
+    """
+    Average-cost position ledger backed by float64 arrays.
+
+    A position is keyed by (user, trade type, symbol), where symbol is the equity
+    symbol, bond ISIN or option underlying. Equities and derivatives move the position
+    by quantity at price / premium; bonds by face value at price. Reads are O(1).
+    """
+    def __init__(self, book:TradeBook, state:Dict[str, np.ndarray]=None)-> None:
+        self._book = book
+        self._counted = np.zeros(len(STATUS_CODES), dtype=bool)
+        for status in POSITION_STATUSES:
+            self._counted[STATUS_CODES[status]] = True
+
+        self._slots: Dict[Tuple[int, int, int], int] = {}
+        self._keys: List[Tuple[int, int, int]] = []
+        self._by_user: Dict[int, List[int]] = {}
+        self._net = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._average_cost = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        self._realized = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+
+        if state is None:
+            for row in range(len(book)):
+                self.on_append(row)
+        else:
+            self._restore(state)
+        book.subscribe(self)
+
+    def _restore(self, state:Dict[str, np.ndarray])-> None:
+        for key in map(tuple, state["keys"].tolist()):
+            self._slot(key)
+        count = len(self._keys)
+        self._net[:count] = state["net_quantity"]
+        self._average_cost[:count] = state["average_cost"]
+        self._realized[:count] = state["realized_pnl"]
+
+    def state(self)-> Dict[str, np.ndarray]:
+        """
+        Position keys and values as arrays, e.g. for a snapshot.
+        """
+        count = len(self._keys)
+        return {
+            "keys": np.array(self._keys, dtype=np.int32).reshape(count, 3),
+            "net_quantity": self._net[:count],
+            "average_cost": self._average_cost[:count],
+            "realized_pnl": self._realized[:count],
+        }
+
+    def _slot(self, key:Tuple[int, int, int])-> int:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = len(self._keys)
+            if slot == len(self._net):
+                self._net = np.concatenate([self._net, np.zeros_like(self._net)])
+                self._average_cost = np.concatenate([self._average_cost, np.zeros_like(self._average_cost)])
+                self._realized = np.concatenate([self._realized, np.zeros_like(self._realized)])
+            self._slots[key] = slot
+            self._keys.append(key)
+            self._by_user.setdefault(key[0], []).append(slot)
+        return slot
+
+    def _trade_terms(self, row:int)-> Tuple[Tuple[int, int, int], float, float]:
+        columns = self._book._columns
+        trade_type = int(columns["trade_type"][row])
+        key = (int(columns["user"][row]), trade_type, int(columns["symbol"][row]))
+        if trade_type == TRADE_TYPE_CODES["BOND"]:
+            quantity, price = columns["face_value"][row], columns["price"][row]
+        elif trade_type == TRADE_TYPE_CODES["DERIVATIVE"]:
+            quantity, price = columns["quantity"][row], columns["premium"][row]
+        else:
+            quantity, price = columns["quantity"][row], columns["price"][row]
+        return key, float(columns["direction"][row]) * float(quantity), float(price)
+
+    def _apply(self, key:Tuple[int, int, int], signed_quantity:float, price:float)-> None:
+        if signed_quantity == 0:
+            return
+        slot = self._slot(key)
+        net = self._net[slot]
+        average_cost = self._average_cost[slot]
+
+        if net == 0 or (net > 0) == (signed_quantity > 0):
+            # opening or adding to a position
+            new_net = net + signed_quantity
+            self._average_cost[slot] = (abs(net) * average_cost + abs(signed_quantity) * price) / abs(new_net)
+        else:
+            # reducing, closing or flipping a position
+            closed = min(abs(signed_quantity), abs(net))
+            self._realized[slot] += closed * (price - average_cost) * np.sign(net)
+            new_net = net + signed_quantity
+            if new_net == 0:
+                self._average_cost[slot] = 0.0
+            elif (new_net > 0) != (net > 0):
+                self._average_cost[slot] = price
+        self._net[slot] = new_net
+
+    def on_append(self, row:int)-> None:
+        if self._counted[self._book._columns["status"][row]]:
+            key, signed_quantity, price = self._trade_terms(row)
+            self._apply(key, signed_quantity, price)
+
+    def on_status_change(self, row:int, old_code:int, new_code:int)-> None:
+        was_counted = self._counted[old_code]
+        is_counted = self._counted[new_code]
+        if was_counted == is_counted:
+            return
+        key, signed_quantity, price = self._trade_terms(row)
+        # leaving the executed states (e.g. a cancel) books the opposite trade at the same
+        # price: the net quantity is restored exactly, cost and P&L only approximately
+        self._apply(key, signed_quantity if is_counted else -signed_quantity, price)
+
+    def on_status_change_many(self, rows:np.ndarray, old_codes:np.ndarray, new_code:int)-> None:
+        # e.g. settling executed trades leaves every position as it is
+        flips = self._counted[old_codes] != self._counted[new_code]
+        for row, old_code in zip(rows[flips].tolist(), old_codes[flips].tolist()):
+            self.on_status_change(row, old_code, new_code)
+
+    def _position(self, slot:int)-> Dict[str, float]:
+        return {
+            "net_quantity": float(self._net[slot]),
+            "average_cost": float(self._average_cost[slot]),
+            "realized_pnl": float(self._realized[slot]),
+        }
+
+    def position(self, user_id:str, symbol:str, trade_type:str="EQUITY")-> Dict[str, float]:
+        key = (self._book.users.lookup(user_id), TRADE_TYPE_CODES[trade_type], self._book.symbols.lookup(symbol))
+        slot = self._slots.get(key)
+        if slot is None:
+            return {"net_quantity": 0.0, "average_cost": 0.0, "realized_pnl": 0.0}
+        return self._position(slot)
+
+    def net_quantity(self, user_id:str, symbol:str, trade_type:str="EQUITY")-> float:
+        return self.position(user_id, symbol, trade_type)["net_quantity"]
+
+    def positions_for_user(self, user_id:str)-> List[Dict[str, str | float]]:
+        positions = []
+        for slot in self._by_user.get(self._book.users.lookup(user_id), []):
+            _, trade_type, symbol = self._keys[slot]
+            position = self._position(slot)
+            position["trade_type"] = TRADE_TYPES[trade_type]
+            position["symbol"] = self._book.symbols.value(symbol)
+            positions.append(position)
+        return positions
+
+    def net_quantities(self, trade_type:str="EQUITY")-> Dict[str, Dict[str, float]]:
+        """
+        user_id -> symbol -> net quantity for one trade type.
+        """
+        type_code = TRADE_TYPE_CODES[trade_type]
+        users = self._book.users
+        symbols = self._book.symbols
+        net_quantities = {}
+        for slot, (user, code, symbol) in enumerate(self._keys):
+            if code == type_code:
+                net_quantities.setdefault(users.value(user), {})[symbols.value(symbol)] = float(self._net[slot])
+        return net_quantities
+
+    def __len__(self)-> int:
+        return len(self._keys)
@@ -0,0 +1,148 @@
+"""
+price_cache.py
+
+This module contains the PriceCache class, an in-process cache of market prices keyed
+by symbol or ISIN with TTL expiry and LRU eviction, and the loaders that fill it.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+
+# a loader takes the symbols missing from the cache and returns the prices it knows
+PriceLoader = Callable[[List[str]], Dict[str, float]]
+
+
+class StaticPriceLoader:
+    """
+    In-process loader backed by a dict, e.g. for tests or a stubbed market data feed.
+    """
+    def __init__(self, prices:Dict[str, float]=None)-> None:
+        self.prices = dict(prices or {})
+
+    def __call__(self, symbols:List[str])-> Dict[str, float]:
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+
+class FilePriceLoader:
+    """
+    Loader backed by a local "symbol,price" file. The file is re-read only when its
+    modification time changes.
+    """
+    def __init__(self, path:str, delimiter:str=",")-> None:
+        self._path = path
+        self._delimiter = delimiter
+        self._mtime = None
+        self._prices = {}
+
+    def _refresh(self)-> None:
+        mtime = os.stat(self._path).st_mtime
+        if mtime == self._mtime:
+            return
+        prices = {}
+        with open(self._path, "r") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                symbol, price = line.split(self._delimiter)[:2]
+                prices[symbol] = float(price)
+        self._prices = prices
+        self._mtime = mtime
+
+    def __call__(self, symbols:List[str])-> Dict[str, float]:
+        self._refresh()
+        return {symbol: self._prices[symbol] for symbol in symbols if symbol in self._prices}
+
+
+class PriceCache:
+    """
+    attributes:
+        TTL (seconds a price stays fresh, None for no expiry)
+        Max size (least recently used prices are evicted beyond it)
+        Loader (called once per lookup with every missing or expired symbol)
+    """
+    def __init__(self, loader:PriceLoader=None, ttl:float=60.0, max_size:int=100000,
+                 clock:Callable[[], float]=time.monotonic)-> None:
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        self._loader = loader
+        self._ttl = ttl
+        self._max_size = max_size
+        self._clock = clock
+        # symbol -> (price, expires_at), ordered from least to most recently used
+        self._prices = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, prices:Dict[str, float])-> None:
+        """
+        Store many prices at once, all with the same expiry.
+        """
+        expires_at = self._clock() + self._ttl if self._ttl is not None else None
+        entries = self._prices
+        for symbol, price in prices.items():
+            entries[symbol] = (float(price), expires_at)
+            entries.move_to_end(symbol)
+        while len(entries) > self._max_size:
+            entries.popitem(last=False)
+
+    def _fresh(self, symbol:str, now:float)-> float:
+        entry = self._prices.get(symbol)
+        if entry is None:
+            return None
+        price, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._prices[symbol]
+            return None
+        self._prices.move_to_end(symbol)
+        return price
+
+    def get_many(self, symbols:Iterable[str])-> Dict[str, float]:
+        """
+        Prices of `symbols`, loading every missing or expired one with a single loader
+        call. Symbols without a price anywhere are left out.
+        """
+        now = self._clock()
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            price = self._fresh(symbol, now)
+            if price is None:
+                missing.append(symbol)
+            else:
+                prices[symbol] = price
+        self.hits += len(prices)
+        self.misses += len(missing)
+
+        if missing and self._loader is not None:
+            loaded = self._loader(missing)
+            self.update(loaded)
+            prices.update(loaded)
+        return prices
+
+    def get(self, symbol:str)-> float:
+        return self.get_many([symbol]).get(symbol)
+
+    def price_vector(self, symbols:List[str])-> np.ndarray:
+        """
+        Prices aligned with `symbols` (e.g. TradeBook.symbols.values), NaN where unknown.
+        """
+        prices = self.get_many(symbols)
+        return np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+
+    def invalidate(self, symbols:Iterable[str]=None)-> None:
+        if symbols is None:
+            self._prices.clear()
+            return
+        for symbol in symbols:
+            self._prices.pop(symbol, None)
+
+    def __contains__(self, symbol:str)-> bool:
+        return self._fresh(symbol, self._clock()) is not None
+
+    def __len__(self)-> int:
+        return len(self._prices)
@@ -0,0 +1,173 @@
+"""
+risk_aggregates.py
+
+This module contains the RiskAggregates class, which keeps running risk totals for a
+TradeBook and updates them with O(1) deltas on every add and status change.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+
+from .base_trade import TradeStatus
+from .risk_engine import RiskEngine, BOND
+from .trade_book import TradeBook, TRADE_TYPES, TRADE_TYPE_CODES, STATUSES, STATUS_CODES
+
+
+# statuses whose trades count towards exposure, matching RiskEngine.open_mask
+DEFAULT_COUNTED_STATUSES = [status for status in TradeStatus if status != TradeStatus.CANCELLED]
+
+
+class RiskAggregates:
+    """
+    Running risk totals (overall, per trade type, per user and per symbol).
+
+    The risk of each row is computed once when the trade is booked and stored, so a
+    status change that moves a trade in or out of the counted statuses only adds or
+    subtracts that stored value. Risk that depends on the calendar (bond years to
+    maturity) is therefore taken as of booking; call rebuild() to re-mark everything.
+    Batches appended with TradeBook.extend are priced with one RiskEngine.risk_vector
+    call over the new rows.
+    """
+    def __init__(self, book:TradeBook, counted_statuses:Iterable[TradeStatus]=None,
+                 state:Dict[str, np.ndarray]=None)-> None:
+        self._book = book
+        self._engine = RiskEngine(book)
+        statuses = DEFAULT_COUNTED_STATUSES if counted_statuses is None else counted_statuses
+        self._counted = np.zeros(len(STATUSES), dtype=bool)
+        for status in statuses:
+            self._counted[STATUS_CODES[TradeStatus(status)]] = True
+
+        if state is None:
+            self._risk = np.zeros(max(len(book), 1), dtype=np.float64)
+            self.rebuild()
+        else:
+            self._restore(state)
+        book.subscribe(self)
+
+    def rebuild(self)-> None:
+        """
+        Recompute every row's risk and all totals from scratch.
+        """
+        self._total = 0.0
+        self._by_type = [0.0] * len(TRADE_TYPES)
+        self._by_user = {}
+        self._by_symbol = {}
+        self._risk = np.zeros(max(len(self._book), 1), dtype=np.float64)
+        self.on_append_many(np.arange(len(self._book), dtype=np.int64))
+
+    def _restore(self, state:Dict[str, np.ndarray])-> None:
+        self._counted = state["counted"].astype(bool)
+        self._risk = state["risk"] if len(state["risk"]) else np.zeros(1, dtype=np.float64)
+        self._total = float(state["total"][0])
+        self._by_type = state["by_type"].tolist()
+        self._by_user = dict(zip(state["user_codes"].tolist(), state["user_totals"].tolist()))
+        self._by_symbol = dict(zip(state["symbol_codes"].tolist(), state["symbol_totals"].tolist()))
+
+    def state(self)-> Dict[str, np.ndarray]:
+        """
+        Per-row risk and running totals as arrays, e.g. for a snapshot.
+        """
+        return {
+            "counted": self._counted,
+            "risk": self._risk[:len(self._book)],
+            "total": np.array([self._total]),
+            "by_type": np.array(self._by_type, dtype=np.float64),
+            "user_codes": np.fromiter(self._by_user.keys(), dtype=np.int64, count=len(self._by_user)),
+            "user_totals": np.fromiter(self._by_user.values(), dtype=np.float64, count=len(self._by_user)),
+            "symbol_codes": np.fromiter(self._by_symbol.keys(), dtype=np.int64, count=len(self._by_symbol)),
+            "symbol_totals": np.fromiter(self._by_symbol.values(), dtype=np.float64, count=len(self._by_symbol)),
+        }
+
+    def _reserve(self, size:int)-> None:
+        if size > len(self._risk):
+            grown = np.zeros(max(len(self._risk) * 2, size), dtype=np.float64)
+            grown[:len(self._risk)] = self._risk
+            self._risk = grown
+
+    def _set_row_risk(self, row:int)-> None:
+        self._reserve(row + 1)
+        columns = self._book._columns
+        if columns["trade_type"][row] == BOND and np.isnat(columns["expiry"][row]):
+            # no maturity, no risk (as in RiskEngine.risk_vector)
+            self._risk[row] = 0.0
+        else:
+            self._risk[row] = self._book.view(row).calculate_risk()
+
+    def _apply(self, row:int, sign:float)-> None:
+        columns = self._book._columns
+        delta = sign * float(self._risk[row])
+        user = int(columns["user"][row])
+        symbol = int(columns["symbol"][row])
+
+        self._total += delta
+        self._by_type[columns["trade_type"][row]] += delta
+        self._by_user[user] = self._by_user.get(user, 0.0) + delta
+        self._by_symbol[symbol] = self._by_symbol.get(symbol, 0.0) + delta
+
+    def _apply_many(self, rows:np.ndarray, sign:float)-> None:
+        columns = self._book._columns
+        deltas = self._risk[rows] * sign
+
+        self._total += float(deltas.sum())
+        by_type = np.bincount(columns["trade_type"][rows], weights=deltas, minlength=len(TRADE_TYPES))
+        self._by_type = [total + float(delta) for total, delta in zip(self._by_type, by_type)]
+        for totals, codes in ((self._by_user, columns["user"][rows]), (self._by_symbol, columns["symbol"][rows])):
+            keys, inverse = np.unique(codes, return_inverse=True)
+            for key, delta in zip(keys.tolist(), np.bincount(inverse, weights=deltas).tolist()):
+                totals[key] = totals.get(key, 0.0) + delta
+
+    def on_append(self, row:int)-> None:
+        self._set_row_risk(row)
+        if self._counted[self._book._columns["status"][row]]:
+            self._apply(row, 1.0)
+
+    def on_append_many(self, rows:np.ndarray)-> None:
+        if not len(rows):
+            return
+        self._reserve(int(rows.max()) + 1)
+        self._risk[rows] = self._engine.risk_vector(rows=rows)
+        counted = rows[self._counted[self._book._columns["status"][rows]]]
+        if len(counted):
+            self._apply_many(counted, 1.0)
+
+    def on_status_change(self, row:int, old_code:int, new_code:int)-> None:
+        was_counted = self._counted[old_code]
+        is_counted = self._counted[new_code]
+        if was_counted and not is_counted:
+            self._apply(row, -1.0)
+        elif is_counted and not was_counted:
+            self._apply(row, 1.0)
+
+    def on_status_change_many(self, rows:np.ndarray, old_codes:np.ndarray, new_code:int)-> None:
+        # only rows moving in or out of the counted statuses change the totals
+        flips = self._counted[old_codes] != self._counted[new_code]
+        if flips.any():
+            self._apply_many(rows[flips], 1.0 if self._counted[new_code] else -1.0)
+
+    @property
+    def total(self)-> float:
+        return self._total
+
+    def trade_type_exposure(self, trade_type:str)-> float:
+        return self._by_type[TRADE_TYPE_CODES[trade_type]]
+
+    def user_exposure(self, user_id:str)-> float:
+        return self._by_user.get(self._book.users.lookup(user_id), 0.0)
+
+    def symbol_exposure(self, symbol:str)-> float:
+        return self._by_symbol.get(self._book.symbols.lookup(symbol), 0.0)
+
+    def exposure(self)-> Dict[str, float | Dict[str, float]]:
+        """
+        Current totals in the same shape as RiskEngine.exposure.
+        """
+        users = self._book.users
+        symbols = self._book.symbols
+        return {
+            "all_risk_exposures": self._total,
+            "equity_risk_exposures": self._by_type[TRADE_TYPE_CODES["EQUITY"]],
+            "bond_risk_exposures": self._by_type[TRADE_TYPE_CODES["BOND"]],
+            "derivative_risk_exposures": self._by_type[TRADE_TYPE_CODES["DERIVATIVE"]],
+            "by_user": {users.value(code): total for code, total in self._by_user.items()},
+            "by_symbol": {symbols.value(code): total for code, total in self._by_symbol.items()},
+        }
@@ -0,0 +1,206 @@
+"""
+risk_engine.py
+
+This module contains the RiskEngine class, which computes trade risk for a whole
+TradeBook with array operations instead of one calculate_risk() call per trade.
+"""
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+
+from .trade_book import TradeBook, TRADE_TYPES, TRADE_TYPE_CODES, STATUS_CODES, OPTION_TYPE_CODES
+from .base_trade import TradeStatus
+from .price_cache import PriceCache
+from .option_pricing import OptionModel, black_scholes, year_fractions
+from .bond_analytics import BondAnalytics
+
+
+EQUITY = TRADE_TYPE_CODES["EQUITY"]
+BOND = TRADE_TYPE_CODES["BOND"]
+DERIVATIVE = TRADE_TYPE_CODES["DERIVATIVE"]
+
+# same factor as EquityTrade.calculate_risk
+EQUITY_RISK_FACTOR = 0.08
+# same simple delta as DerivativeTrade.calculate_risk
+DERIVATIVE_DELTA = 0.5
+
+
+class RiskEngine:
+    """
+    Batch version of EquityTrade, BondTrade and DerivativeTrade calculate_risk.
+
+    All formulas are evaluated once over the book columns, and the per-type, per-user
+    and per-symbol totals are produced from the same risk vector with np.bincount.
+    """
+    def __init__(self, book:TradeBook)-> None:
+        self._book = book
+
+    def marks(self, prices:PriceCache)-> np.ndarray:
+        """
+        Current market price of every row's symbol / ISIN / underlying from `prices`,
+        NaN where the cache has no price.
+        """
+        book = self._book
+        symbol_prices = np.append(prices.price_vector(book.symbols.values), np.nan)
+        # symbol code -1 (no symbol) picks the trailing NaN
+        return symbol_prices[book.column("symbol")]
+
+    def option_greeks(self, option_model:OptionModel, marks:np.ndarray=None, now:datetime=None,
+                      rows:np.ndarray=None)-> Dict[str, np.ndarray]:
+        """
+        Black-Scholes price and Greeks of every derivative row in one vectorized call.
+
+        The underlying price is the row's mark when available and the strike otherwise.
+        With `rows`, only the derivative rows among them are priced (in their order).
+        Returns the derivative "rows", the "spot" used and the black_scholes outputs.
+        """
+        book = self._book
+        if rows is None:
+            rows = np.flatnonzero(book.column("trade_type") == DERIVATIVE)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            rows = rows[book.column("trade_type")[rows] == DERIVATIVE]
+        strike = book.column("strike")[rows]
+        spot = strike if marks is None else np.where(np.isnan(marks[rows]), strike, marks[rows])
+        volatilities = np.append(option_model.volatilities(book.symbols.values), option_model.default_volatility)
+
+        greeks = black_scholes(
+            spot,
+            strike,
+            year_fractions(book.column("expiry")[rows], now),
+            volatilities[book.column("symbol")[rows]],
+            option_model.rate,
+            book.column("option_type")[rows] == OPTION_TYPE_CODES["call"],
+        )
+        greeks["rows"] = rows
+        greeks["spot"] = spot
+        return greeks
+
+    def bond_analytics(self, analytics:BondAnalytics, marks:np.ndarray=None, now:datetime=None)-> Dict[str, np.ndarray]:
+        """
+        Accrued interest, yield, durations, convexity and DV01 of every bond row in one
+        vectorized call, at the row's mark when available and the traded price otherwise.
+        Returns the bond "rows", the "price" used and the BondAnalytics outputs.
+        """
+        book = self._book
+        rows = np.flatnonzero(book.column("trade_type") == BOND)
+        price = book.column("price")[rows]
+        if marks is not None:
+            price = np.where(np.isnan(marks[rows]), price, marks[rows])
+
+        result = analytics.analytics(
+            book.column("coupon_rate")[rows],
+            book.column("expiry")[rows],
+            price,
+            book.column("face_value")[rows],
+            now,
+        )
+        result["rows"] = rows
+        result["price"] = price
+        return result
+
+    def risk_vector(self, now:datetime=None, marks:np.ndarray=None, option_model:OptionModel=None,
+                    rows:np.ndarray=None)-> np.ndarray:
+        """
+        Return the risk of every row of the book, matching each trade's calculate_risk(),
+        or of `rows` only (aligned with `rows`) when given.
+
+        With `marks` (see marks()), equity and bond risk use the market price instead of
+        the traded price and derivative delta uses the underlying price instead of the
+        strike. Rows without a mark fall back to the trade's own price.
+
+        With `option_model`, derivative risk is the Black-Scholes delta notional
+        (delta x underlying price x quantity) instead of the flat 0.5 delta.
+
+        Bonds without a maturity date carry no risk.
+        """
+        book = self._book
+        now = now or datetime.now()
+
+        def column(name:str)-> np.ndarray:
+            values = book.column(name)
+            return values if rows is None else values[rows]
+
+        trade_type = column("trade_type")
+        quantity = column("quantity")
+        price = column("price")
+        strike = column("strike")
+        if marks is not None:
+            row_marks = marks if rows is None else marks[rows]
+            price = np.where(np.isnan(row_marks), price, row_marks)
+            strike = np.where(np.isnan(row_marks), strike, row_marks)
+
+        risk = np.zeros(len(trade_type), dtype=np.float64)
+
+        equity = trade_type == EQUITY
+        risk[equity] = price[equity] * quantity[equity] * EQUITY_RISK_FACTOR
+
+        bond = trade_type == BOND
+        maturity = column("expiry")[bond]
+        maturity_year = maturity.astype("datetime64[Y]").astype(np.int64) + 1970
+        years_to_maturity = np.where(np.isnat(maturity), 0, maturity_year - now.year)
+        risk[bond] = column("face_value")[bond] * price[bond] * years_to_maturity
+
+        derivative = trade_type == DERIVATIVE
+        sign = np.where(column("option_type")[derivative] == OPTION_TYPE_CODES["call"], 1.0, -1.0)
+        risk[derivative] = sign * DERIVATIVE_DELTA * strike[derivative] * quantity[derivative]
+
+        if option_model is not None:
+            greeks = self.option_greeks(option_model, marks, now, rows)
+            # option_greeks keeps the derivative rows in order, i.e. the `derivative` positions
+            positions = greeks["rows"] if rows is None else np.flatnonzero(derivative)
+            risk[positions] = greeks["delta"] * greeks["spot"] * book.column("quantity")[greeks["rows"]]
+
+        return risk
+
+    def open_mask(self)-> np.ndarray:
+        """
+        Rows that carry exposure, i.e. every trade that has not been cancelled.
+        """
+        return self._book.column("status") != STATUS_CODES[TradeStatus.CANCELLED]
+
+    def unexpired_mask(self, now:datetime=None)-> np.ndarray:
+        """
+        Rows whose expiry / maturity is after `now` (default: now), or that have none.
+        """
+        expiry = self._book.column("expiry")
+        return np.isnat(expiry) | (expiry.astype("datetime64[us]") > np.datetime64(now or datetime.now(), "us"))
+
+    @staticmethod
+    def _totals(codes:np.ndarray, risk:np.ndarray, values:list)-> Dict[str, float]:
+        # codes are -1 for missing values, shift by one so they can be bincounted
+        shifted = codes.astype(np.int64) + 1
+        totals = np.bincount(shifted, weights=risk, minlength=len(values) + 1)
+        counts = np.bincount(shifted, minlength=len(values) + 1)
+        return {
+            (values[code - 1] if code else None): float(totals[code])
+            for code in np.flatnonzero(counts)
+        }
+
+    def exposure(self, mask:np.ndarray=None, now:datetime=None, prices:PriceCache=None,
+                 option_model:OptionModel=None)-> Dict[str, float | Dict[str, float]]:
+        """
+        Aggregate risk over the rows selected by `mask` (default: every open trade),
+        marked to market against `prices` when given and with options priced by
+        `option_model` when given.
+
+        Returns the totals reported by TradeProcessor.calculate_risk_exposure plus
+        "by_user" and "by_symbol" breakdowns.
+        """
+        book = self._book
+        if mask is None:
+            mask = self.open_mask()
+
+        marks = self.marks(prices) if prices is not None else None
+        risk = self.risk_vector(now, marks, option_model)[mask]
+        by_type = np.bincount(book.column("trade_type")[mask], weights=risk, minlength=len(TRADE_TYPES))
+
+        return {
+            "all_risk_exposures": float(risk.sum()),
+            "equity_risk_exposures": float(by_type[EQUITY]),
+            "bond_risk_exposures": float(by_type[BOND]),
+            "derivative_risk_exposures": float(by_type[DERIVATIVE]),
+            "by_user": self._totals(book.column("user")[mask], risk, book.users.values),
+            "by_symbol": self._totals(book.column("symbol")[mask], risk, book.symbols.values),
+        }
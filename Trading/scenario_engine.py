@@ -0,0 +1,271 @@
+"""
+scenario_engine.py
+
+This module contains the ScenarioEngine class, which applies a set of market shocks
+(underlying price, volatility and rate) to a whole TradeBook at once and reports the
+risk exposure and P&L of every scenario per trade type, plus historical VaR.
+"""
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .trade_book import TradeBook, TRADE_TYPES, TRADE_TYPE_CODES, OPTION_TYPE_CODES
+from .risk_engine import RiskEngine, EQUITY_RISK_FACTOR, DERIVATIVE_DELTA
+from .price_cache import PriceCache
+from .option_pricing import OptionModel, black_scholes, year_fractions
+from .bond_analytics import BondAnalytics
+
+
+EQUITY = TRADE_TYPE_CODES["EQUITY"]
+BOND = TRADE_TYPE_CODES["BOND"]
+DERIVATIVE = TRADE_TYPE_CODES["DERIVATIVE"]
+
+BUCKETS = TRADE_TYPES + ["ALL"]
+
+# (scenarios x derivative rows) cells evaluated per black_scholes call
+CHUNK_CELLS = 1_000_000
+
+
+class ScenarioSet:
+    """
+    attributes:
+        Names (one per scenario)
+        Price shocks (relative moves of equity prices and option underlyings, one per
+            scenario or one per scenario and symbol)
+        Volatility shocks (absolute change of option volatility)
+        Rate shocks (absolute change of bond yields and of the option rate)
+    """
+    def __init__(self, names:Sequence[str], price_shocks:Sequence, vol_shocks:Sequence[float]=None,
+                 rate_shocks:Sequence[float]=None, symbols:Sequence[str]=None)-> None:
+        count = len(names)
+        self.names = list(names)
+        self.price_shocks = np.asarray(price_shocks, dtype=np.float64)
+        self.vol_shocks = np.zeros(count) if vol_shocks is None else np.asarray(vol_shocks, dtype=np.float64)
+        self.rate_shocks = np.zeros(count) if rate_shocks is None else np.asarray(rate_shocks, dtype=np.float64)
+        self.symbols = list(symbols) if symbols is not None else None
+
+        if self.price_shocks.ndim == 2 and self.symbols is None:
+            raise ValueError("Per-symbol price shocks need the list of symbols")
+        if self.price_shocks.shape[0] != count or len(self.vol_shocks) != count or len(self.rate_shocks) != count:
+            raise ValueError("Every shock must have one entry per scenario")
+
+    @classmethod
+    def grid(cls, price_shocks:Sequence[float]=(0.0,), vol_shocks:Sequence[float]=(0.0,),
+             rate_shocks:Sequence[float]=(0.0,))-> "ScenarioSet":
+        """
+        Every combination of the given price, volatility and rate shocks, e.g.
+        grid([-0.1, 0.0], [0.0], [0.005]) for "equities -10% and rates +50bp".
+        """
+        combinations = list(product(price_shocks, vol_shocks, rate_shocks))
+        names = [f"price {price:+.1%} vol {vol:+.2f} rate {rate * 1e4:+.0f}bp" for price, vol, rate in combinations]
+        price, vol, rate = (np.array(values, dtype=np.float64).reshape(-1) for values in zip(*combinations))
+        return cls(names, price, vol, rate)
+
+    @classmethod
+    def historical(cls, prices:Dict[str, Sequence[float]], horizon:int=1)-> "ScenarioSet":
+        """
+        One scenario per observed `horizon`-day return of every symbol, from a dict of
+        symbol -> price history (oldest first, all of the same length).
+        """
+        symbols = list(prices)
+        history = np.array([prices[symbol] for symbol in symbols], dtype=np.float64).T
+        if len(history) <= horizon:
+            raise ValueError("Price history must be longer than the horizon")
+        returns = history[horizon:] / history[:-horizon] - 1.0
+        names = [f"historical {day}" for day in range(len(returns))]
+        return cls(names, returns, symbols=symbols)
+
+    def price_matrix(self, symbols:List[str])-> np.ndarray:
+        """
+        Price shock per scenario and book symbol code, with one extra zero column for
+        rows without a symbol (code -1).
+        """
+        matrix = np.zeros((len(self), len(symbols) + 1))
+        if self.price_shocks.ndim == 1:
+            matrix[:, :-1] = self.price_shocks[:, None]
+        else:
+            columns = {symbol: column for column, symbol in enumerate(self.symbols)}
+            for code, symbol in enumerate(symbols):
+                column = columns.get(symbol)
+                if column is not None:
+                    matrix[:, code] = self.price_shocks[:, column]
+        return matrix
+
+    def __len__(self)-> int:
+        return len(self.names)
+
+
+class ScenarioResult:
+    """
+    Exposure and P&L of every scenario, as (scenarios x buckets) matrices whose
+    columns follow BUCKETS (one per trade type, then the total).
+    """
+    def __init__(self, names:List[str], base_exposure:np.ndarray, exposure:np.ndarray, pnl:np.ndarray)-> None:
+        self.names = names
+        self.buckets = BUCKETS
+        self.base_exposure = base_exposure
+        self.exposure = exposure
+        self.pnl = pnl
+
+    def table(self, values:str="exposure")-> List[Dict[str, float]]:
+        """
+        One dict per scenario with the "scenario" name and a value per bucket.
+        """
+        matrix = getattr(self, values)
+        return [
+            {"scenario": name, **{bucket: float(value) for bucket, value in zip(self.buckets, row)}}
+            for name, row in zip(self.names, matrix.tolist())
+        ]
+
+    def value_at_risk(self, confidence:float=0.99, bucket:str="ALL")-> float:
+        """
+        Loss not exceeded in `confidence` of the scenarios, as a positive number.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence must be between 0 and 1")
+        pnl = self.pnl[:, self.buckets.index(bucket)]
+        return float(-np.quantile(pnl, 1.0 - confidence))
+
+    def expected_shortfall(self, confidence:float=0.99, bucket:str="ALL")-> float:
+        """
+        Average loss of the scenarios at or beyond the value at risk.
+        """
+        pnl = self.pnl[:, self.buckets.index(bucket)]
+        tail = pnl[pnl <= -self.value_at_risk(confidence, bucket)]
+        return float(-tail.mean())
+
+
+class ScenarioEngine:
+    """
+    Evaluates many scenarios over the book columns without touching the trades.
+
+    Exposure uses the RiskEngine definitions with shocked inputs. P&L is the change in
+    value against the unshocked book, signed by trade direction (SELL is short).
+    Equity moves are linear in price, so they are aggregated per symbol and applied
+    to all scenarios with one matrix product. Bonds are repriced from their yield once
+    per distinct rate shock, and options are repriced with black_scholes over blocks
+    of (scenarios x option rows).
+    """
+    def __init__(self, book:TradeBook, option_model:OptionModel=None, bond_analytics:BondAnalytics=None)-> None:
+        self._book = book
+        self._risk_engine = RiskEngine(book)
+        self._option_model = option_model
+        self._bond_analytics = bond_analytics or BondAnalytics()
+
+    def run(self, scenarios:ScenarioSet, mask:np.ndarray=None, prices:PriceCache=None,
+            now:datetime=None)-> ScenarioResult:
+        """
+        Exposure and P&L of the rows selected by `mask` (default: every open trade)
+        under each scenario, marked to `prices` when given.
+        """
+        book = self._book
+        now = now or datetime.now()
+        if mask is None:
+            mask = self._risk_engine.open_mask()
+        marks = self._risk_engine.marks(prices) if prices is not None else None
+
+        shocks = scenarios.price_matrix(book.symbols.values)
+        exposure = np.zeros((len(scenarios), len(BUCKETS)))
+        pnl = np.zeros((len(scenarios), len(BUCKETS)))
+        base = np.zeros(len(BUCKETS))
+
+        trade_type = book.column("trade_type")
+        for code, evaluate in ((EQUITY, self._equity), (BOND, self._bond), (DERIVATIVE, self._derivative)):
+            rows = np.flatnonzero(mask & (trade_type == code))
+            if len(rows):
+                base[code], exposure[:, code], pnl[:, code] = evaluate(rows, scenarios, shocks, marks, now)
+
+        base[-1] = base[:-1].sum()
+        exposure[:, -1] = exposure[:, :-1].sum(axis=1)
+        pnl[:, -1] = pnl[:, :-1].sum(axis=1)
+        return ScenarioResult(scenarios.names, base, exposure, pnl)
+
+    def _marked(self, name:str, rows:np.ndarray, marks:np.ndarray)-> np.ndarray:
+        values = self._book.column(name)[rows]
+        if marks is None:
+            return values
+        return np.where(np.isnan(marks[rows]), values, marks[rows])
+
+    def _signs(self, rows:np.ndarray)-> np.ndarray:
+        return np.where(self._book.column("direction")[rows] == -1, -1.0, 1.0)
+
+    def _symbols(self, rows:np.ndarray)-> np.ndarray:
+        # code -1 (no symbol) picks the zero column at the end of the shock matrix
+        codes = self._book.column("symbol")[rows].astype(np.int64)
+        return np.where(codes < 0, len(self._book.symbols), codes)
+
+    def _equity(self, rows:np.ndarray, scenarios:ScenarioSet, shocks:np.ndarray, marks:np.ndarray,
+                now:datetime)-> Tuple[float, np.ndarray, np.ndarray]:
+        notional = self._marked("price", rows, marks) * self._book.column("quantity")[rows]
+        symbols = self._symbols(rows)
+        by_symbol = np.bincount(symbols, weights=notional, minlength=shocks.shape[1])
+        signed_by_symbol = np.bincount(symbols, weights=notional * self._signs(rows), minlength=shocks.shape[1])
+
+        base = notional.sum() * EQUITY_RISK_FACTOR
+        exposure = base + shocks @ by_symbol * EQUITY_RISK_FACTOR
+        return base, exposure, shocks @ signed_by_symbol
+
+    def _bond(self, rows:np.ndarray, scenarios:ScenarioSet, shocks:np.ndarray, marks:np.ndarray,
+              now:datetime)-> Tuple[float, np.ndarray, np.ndarray]:
+        book = self._book
+        analytics = self._bond_analytics
+        price = self._marked("price", rows, marks)
+        face_value = book.column("face_value")[rows]
+        years = book.column("expiry")[rows].astype("datetime64[Y]").astype(np.int64) + 1970 - now.year
+        signed_face = face_value * self._signs(rows)
+
+        schedule = analytics.schedule(book.column("coupon_rate")[rows], book.column("expiry")[rows], now)
+        yields = analytics.yields(schedule, price)
+        solvable = ~np.isnan(yields)
+        base = float((face_value * price * years).sum())
+
+        rate_shocks, scenario_rate = np.unique(scenarios.rate_shocks, return_inverse=True)
+        exposure_by_rate = np.empty(len(rate_shocks))
+        pnl_by_rate = np.empty(len(rate_shocks))
+        for index, shock in enumerate(rate_shocks.tolist()):
+            shocked = analytics.clean_prices(schedule, np.where(solvable, yields + shock, 0.0))
+            shocked = np.where(solvable, shocked, price)
+            exposure_by_rate[index] = (face_value * shocked * years).sum()
+            pnl_by_rate[index] = (signed_face * (shocked - price)).sum() / 100.0
+        return base, exposure_by_rate[scenario_rate], pnl_by_rate[scenario_rate]
+
+    def _derivative(self, rows:np.ndarray, scenarios:ScenarioSet, shocks:np.ndarray, marks:np.ndarray,
+                    now:datetime)-> Tuple[float, np.ndarray, np.ndarray]:
+        book = self._book
+        model = self._option_model or OptionModel()
+        strike = book.column("strike")[rows]
+        spot = self._marked("strike", rows, marks)
+        quantity = book.column("quantity")[rows]
+        signed_quantity = quantity * self._signs(rows)
+        is_call = book.column("option_type")[rows] == OPTION_TYPE_CODES["call"]
+        time_to_expiry = year_fractions(book.column("expiry")[rows], now)
+        symbols = self._symbols(rows)
+        volatility = np.append(model.volatilities(book.symbols.values), model.default_volatility)[symbols]
+
+        base_prices = black_scholes(spot, strike, time_to_expiry, volatility, model.rate, is_call)
+        flat_delta = np.where(is_call, DERIVATIVE_DELTA, -DERIVATIVE_DELTA)
+        if self._option_model is not None:
+            base = float((base_prices["delta"] * spot * quantity).sum())
+        else:
+            base = float((flat_delta * spot * quantity).sum())
+
+        exposure = np.empty(len(scenarios))
+        pnl = np.empty(len(scenarios))
+        block = max(1, CHUNK_CELLS // len(rows))
+        for start in range(0, len(scenarios), block):
+            stop = min(start + block, len(scenarios))
+            shocked_spot = spot * (1.0 + shocks[start:stop][:, symbols])
+            result = black_scholes(
+                shocked_spot,
+                strike,
+                time_to_expiry,
+                np.maximum(volatility + scenarios.vol_shocks[start:stop, None], 0.0),
+                model.rate + scenarios.rate_shocks[start:stop, None],
+                is_call,
+            )
+            delta = result["delta"] if self._option_model is not None else flat_delta
+            exposure[start:stop] = (delta * shocked_spot * quantity).sum(axis=1)
+            pnl[start:stop] = ((result["price"] - base_prices["price"]) * signed_quantity).sum(axis=1)
+        return base, exposure, pnl
@@ -0,0 +1,763 @@
+"""
+trade_book.py
+
+This module contains the TradeBook class, a columnar store that keeps trades in typed
+NumPy arrays instead of one Python object per trade, and the row views used to read
+trades back out of it.
+"""
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from .base_trade import BaseTrade, TradeStatus
+from .trade_factory import REQUIRED_FIELDS, TradeFactory, new_trade_ids
+
+
+# small int codes used by the int8 columns
+TRADE_TYPES = ["EQUITY", "BOND", "DERIVATIVE"]
+TRADE_TYPE_CODES = {trade_type: code for code, trade_type in enumerate(TRADE_TYPES)}
+
+STATUSES = list(TradeStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+# status name -> code, skips building a TradeStatus on the per-trade path
+STATUS_NAME_CODES = {status.value: code for status, code in STATUS_CODES.items()}
+
+
+def _transition_table()-> np.ndarray:
+    table = np.zeros((len(STATUSES), len(STATUSES)), dtype=bool)
+    for status, targets in BaseTrade.STATUS.items():
+        for target in targets:
+            table[STATUS_CODES[status], STATUS_CODES[target]] = True
+    return table
+
+
+# TRANSITIONS[old code, new code] is True when BaseTrade.STATUS allows the move
+TRANSITIONS = _transition_table()
+
+DIRECTIONS = {1: "BUY", -1: "SELL"}
+DIRECTION_CODES = {"BUY": 1, "SELL": -1}
+
+OPTION_TYPES = {1: "call", -1: "put"}
+OPTION_TYPE_CODES = {"call": 1, "put": -1}
+
+# name -> dtype of every column kept by the book
+COLUMNS = {
+    "trade_type": np.int8,
+    "status": np.int8,
+    "direction": np.int8,
+    "option_type": np.int8,
+    "user": np.int32,           # interned user_id
+    "symbol": np.int32,         # interned equity symbol / bond ISIN / derivative underlying
+    "venue": np.int32,          # interned equity market / bond issuer
+    "quantity": np.float64,     # equity quantity / derivative contracts
+    "price": np.float64,        # equity price / bond price
+    "strike": np.float64,
+    "premium": np.float64,
+    "face_value": np.float64,
+    "coupon_rate": np.float64,
+    "expiry": "datetime64[D]",  # bond maturity / derivative expiration
+    "timestamp": "datetime64[us]",
+}
+
+# int32 columns holding Interner codes, -1 when the value is missing
+INTERNED_COLUMNS = ("user", "symbol", "venue")
+
+# per trade type: trade field -> (book column, kind) used by TradeBook.extend
+BOOK_FIELDS = {
+    "EQUITY": {
+        "symbol": ("symbol", "symbol"),
+        "market": ("venue", "venue"),
+        "quantity": ("quantity", "float"),
+        "price": ("price", "float"),
+    },
+    "BOND": {
+        "isin": ("symbol", "symbol"),
+        "issuer": ("venue", "venue"),
+        "face_value": ("face_value", "float"),
+        "price": ("price", "float"),
+        "coupon_rate": ("coupon_rate", "float"),
+        "maturity_date": ("expiry", "date"),
+    },
+    "DERIVATIVE": {
+        "underlying_symbol": ("symbol", "symbol"),
+        "option_type": ("option_type", "option_type"),
+        "quantity": ("quantity", "float"),
+        "strike_price": ("strike", "float"),
+        "premium": ("premium", "float"),
+        "expiration_date": ("expiry", "date"),
+    },
+}
+
+
+INITIAL_CAPACITY = 1024
+
+
+def status_code(status:str | TradeStatus)-> int:
+    return STATUS_CODES[TradeStatus(status)]
+
+
+# code returned by Interner.lookup for a value that was never interned; it is neither
+# a valid id nor the -1 of a missing value, so it matches no row
+UNKNOWN = -2
+
+
+class Interner:
+    """
+    Maps strings to dense integer ids and back. None is always stored as -1.
+    """
+    __slots__ = ("_ids", "_values")
+
+    def __init__(self, values:List[str]=None)-> None:
+        self._ids = {}
+        self._values = []
+        for value in values or []:
+            self.intern(value)
+
+    def intern(self, value:str)-> int:
+        if value is None:
+            return -1
+        code = self._ids.get(value)
+        if code is None:
+            code = len(self._values)
+            self._ids[value] = code
+            self._values.append(value)
+        return code
+
+    def lookup(self, value:str)-> int:
+        """
+        Id of `value` without interning it: -1 for None and UNKNOWN for a value that
+        was never seen.
+        """
+        if value is None:
+            return -1
+        return self._ids.get(value, UNKNOWN)
+
+    def value(self, code:int)-> str:
+        return self._values[code] if code >= 0 else None
+
+    @property
+    def values(self)-> List[str]:
+        return self._values
+
+    def __len__(self)-> int:
+        return len(self._values)
+
+
+class TradeMethod:
+    """
+    A method of a trade class reused by a view, looked up in TradeFactory.TRADETYPES
+    the first time it is called so the trade class module is only imported on use.
+    The resolved function then replaces the descriptor on the view class.
+    """
+    def __init__(self, trade_type:str)-> None:
+        self._trade_type = trade_type
+        self._name = None
+
+    def __set_name__(self, owner:type, name:str)-> None:
+        self._name = name
+
+    def __get__(self, view:"TradeView", owner:type):
+        function = getattr(TradeFactory.TRADETYPES[self._trade_type], self._name)
+        setattr(owner, self._name, function)
+        return function if view is None else function.__get__(view, owner)
+
+
+class TradeView:
+    """
+    Lightweight read view over one row of a TradeBook.
+
+    Views expose the same attributes as the trade classes and reuse their validation
+    and status transition logic, but hold no data of their own.
+    """
+    __slots__ = ("_book", "_row")
+
+    STATUS = BaseTrade.STATUS
+
+    def __init__(self, book:"TradeBook", row:int)-> None:
+        self._book = book
+        self._row = row
+
+    def _get(self, name:str):
+        return self._book._columns[name][self._row]
+
+    def _date(self, name:str)-> datetime:
+        value = self._get(name)
+        if np.isnat(value):
+            return None
+        return value.astype("datetime64[us]").item()
+
+    @property
+    def row(self)-> int:
+        return self._row
+
+    @property
+    def trade_id(self)-> str:
+        return self._book._trade_ids[self._row]
+
+    @property
+    def trade_type(self)-> str:
+        return TRADE_TYPES[self._get("trade_type")]
+
+    @property
+    def user_id(self)-> str:
+        return self._book.users.value(int(self._get("user")))
+
+    @property
+    def timestamp(self)-> datetime:
+        return self._date("timestamp")
+
+    @property
+    def status(self)-> str:
+        return STATUSES[self._get("status")].value
+
+    @status.setter
+    def status(self, value:str | TradeStatus)-> None:
+        # checked against TRANSITIONS like transition_status; setting the current status is a no-op
+        try:
+            new_code = status_code(value)
+        except ValueError:
+            raise ValueError(f"Invalid status: {value}") from None
+        if new_code != self._get("status"):
+            self._move(new_code)
+
+    def _move(self, new_code:int)-> None:
+        old_code = self._get("status")
+        if not TRANSITIONS[old_code, new_code]:
+            raise ValueError(f"Trade {self.trade_id} cannot move from {STATUSES[old_code].value} "
+                             f"to {STATUSES[new_code].value}.")
+        self._book.set_status(self._row, STATUSES[new_code])
+
+    def transition_status(self, current_status:str, new_status:str="")-> TradeStatus:
+        """
+        Same contract as BaseTrade.transition_status, checked against TRANSITIONS, but
+        a move that isn't allowed raises ValueError. The status is read from the book,
+        so `current_status` is not used.
+        """
+        old_code = self._get("status")
+        if new_status:
+            new_code = STATUS_NAME_CODES.get(new_status.value if isinstance(new_status, TradeStatus) else new_status)
+            if new_code is None:
+                raise ValueError(f"Invalid status: {new_status}")
+        else:
+            allowed = np.flatnonzero(TRANSITIONS[old_code])
+            if not len(allowed):
+                raise ValueError(f"Trade {self.trade_id} is {STATUSES[old_code].value} and cannot move on.")
+            new_code = int(allowed[0])
+        self._move(new_code)
+        return STATUSES[new_code]
+
+    @property
+    def direction(self)-> str:
+        return DIRECTIONS.get(int(self._get("direction")))
+
+    def __str__(self)-> str:
+        return f"Trade Type: {self.trade_type}, ID: {self.trade_id}, Timestamp: {self.timestamp}, Status: {self.status}"
+
+
+class EquityTradeView(TradeView):
+    __slots__ = ()
+
+    validate_trade = TradeMethod("EQUITY")
+    calculate_risk = TradeMethod("EQUITY")
+
+    @property
+    def symbol(self)-> str:
+        return self._book.symbols.value(int(self._get("symbol")))
+
+    @property
+    def quantity(self)-> float:
+        return float(self._get("quantity"))
+
+    @property
+    def price(self)-> float:
+        return float(self._get("price"))
+
+    @property
+    def market(self)-> str:
+        return self._book.venues.value(int(self._get("venue")))
+
+
+class BondTradeView(TradeView):
+    __slots__ = ()
+
+    validate_trade = TradeMethod("BOND")
+    calculate_risk = TradeMethod("BOND")
+    analytics = TradeMethod("BOND")
+
+    @property
+    def isin(self)-> str:
+        return self._book.symbols.value(int(self._get("symbol")))
+
+    @property
+    def face_value(self)-> float:
+        return float(self._get("face_value"))
+
+    @property
+    def price(self)-> float:
+        return float(self._get("price"))
+
+    @property
+    def coupon_rate(self)-> float:
+        return float(self._get("coupon_rate"))
+
+    @property
+    def maturity_date(self)-> datetime:
+        return self._date("expiry")
+
+    @property
+    def issuer(self)-> str:
+        return self._book.venues.value(int(self._get("venue")))
+
+
+class DerivativeTradeView(TradeView):
+    __slots__ = ()
+
+    validate_trade = TradeMethod("DERIVATIVE")
+    calculate_risk = TradeMethod("DERIVATIVE")
+    greeks = TradeMethod("DERIVATIVE")
+
+    @property
+    def underlying_symbol(self)-> str:
+        return self._book.symbols.value(int(self._get("symbol")))
+
+    @property
+    def option_type(self)-> str:
+        return OPTION_TYPES.get(int(self._get("option_type")))
+
+    @property
+    def strike_price(self)-> float:
+        return float(self._get("strike"))
+
+    @property
+    def expiration_date(self)-> datetime:
+        return self._date("expiry")
+
+    @property
+    def quantity(self)-> int:
+        return int(self._get("quantity"))
+
+    @property
+    def premium(self)-> float:
+        return float(self._get("premium"))
+
+
+VIEW_TYPES = [EquityTradeView, BondTradeView, DerivativeTradeView]
+
+
+class TradeBookSlice:
+    """
+    A masked view over a TradeBook. Columns are gathered from the book on access.
+    """
+    __slots__ = ("_book", "_rows")
+
+    def __init__(self, book:"TradeBook", rows:np.ndarray)-> None:
+        self._book = book
+        self._rows = rows
+
+    @property
+    def book(self)-> "TradeBook":
+        return self._book
+
+    @property
+    def rows(self)-> np.ndarray:
+        return self._rows
+
+    def column(self, name:str)-> np.ndarray:
+        return self._book.column(name)[self._rows]
+
+    def views(self)-> Iterator[TradeView]:
+        for row in self._rows:
+            yield self._book.view(int(row))
+
+    def __len__(self)-> int:
+        return len(self._rows)
+
+
+class TradeBook(Mapping):
+    """
+    Columnar trade store.
+
+    Every field lives in a typed NumPy column, strings are interned to integer ids and
+    trade ids map to row numbers. The book behaves as a read-only mapping from trade_id
+    to a row view, so it can stand in for the old dict of trade objects.
+    """
+    def __init__(self, capacity:int=INITIAL_CAPACITY)-> None:
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._columns = {name: self._empty_column(name, self._capacity) for name in COLUMNS}
+        self._trade_ids = []
+        self._index = {}
+        self.users = Interner()
+        self.symbols = Interner()
+        self.venues = Interner()
+        self._listeners = []
+
+    @classmethod
+    def from_columns(cls, columns:Dict[str, np.ndarray], trade_ids:Sequence[str], index:Dict[str, int]=None,
+                     users:Interner=None, symbols:Interner=None, venues:Interner=None)-> "TradeBook":
+        """
+        Build a book around existing full-length columns (e.g. memory-mapped from a
+        snapshot) without copying them. The columns are only copied once the book
+        has to grow.
+        """
+        size = len(trade_ids)
+        if set(columns) != set(COLUMNS) or any(len(column) != size for column in columns.values()):
+            raise ValueError("Columns must match TradeBook.COLUMNS and the number of trade ids")
+        book = cls(capacity=1)
+        book._columns = dict(columns)
+        book._size = size
+        book._capacity = max(size, 1)
+        if size == 0:
+            book._columns = {name: cls._empty_column(name, 1) for name in COLUMNS}
+        book._trade_ids = trade_ids
+        book._index = index if index is not None else {trade_id: row for row, trade_id in enumerate(trade_ids)}
+        book.users = users or Interner()
+        book.symbols = symbols or Interner()
+        book.venues = venues or Interner()
+        return book
+
+    @staticmethod
+    def _empty_column(name:str, capacity:int)-> np.ndarray:
+        dtype = np.dtype(COLUMNS[name])
+        if dtype.kind == "M":
+            return np.full(capacity, np.datetime64("NaT"), dtype=dtype)
+        if name in INTERNED_COLUMNS:
+            # rows that never set the column (e.g. the venue of a derivative) are missing,
+            # not the first interned value
+            return np.full(capacity, -1, dtype=dtype)
+        return np.zeros(capacity, dtype=dtype)
+
+    def _reserve(self, size:int)-> None:
+        if size <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < size:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = self._empty_column(name, capacity)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, trade:BaseTrade)-> int:
+        """
+        Copy the fields of `trade` into the columns and return its row number.
+        """
+        trade_id = trade.trade_id
+        if trade_id in self._index:
+            raise ValueError(f"Trade {trade_id} already exists in the book.")
+
+        trade_type = trade.trade_type
+        if trade_type not in TRADE_TYPE_CODES:
+            raise ValueError(f"Invalid trade type: {trade_type}.")
+
+        row = self._size
+        self._reserve(row + 1)
+        columns = self._columns
+
+        columns["trade_type"][row] = TRADE_TYPE_CODES[trade_type]
+        columns["status"][row] = status_code(trade._status)
+        columns["user"][row] = self.users.intern(getattr(trade, "user_id", None))
+        columns["direction"][row] = DIRECTION_CODES.get(str(getattr(trade, "direction", "")).upper(), 0)
+        if trade.timestamp is not None:
+            columns["timestamp"][row] = np.datetime64(trade.timestamp, "us")
+
+        if trade_type == "EQUITY":
+            columns["symbol"][row] = self.symbols.intern(trade.symbol)
+            columns["venue"][row] = self.venues.intern(trade.market)
+            columns["quantity"][row] = trade.quantity
+            columns["price"][row] = trade.price
+        elif trade_type == "BOND":
+            columns["symbol"][row] = self.symbols.intern(trade.isin)
+            columns["venue"][row] = self.venues.intern(trade.issuer)
+            columns["face_value"][row] = trade.face_value
+            columns["price"][row] = trade.price
+            columns["coupon_rate"][row] = trade.coupon_rate
+            columns["expiry"][row] = np.datetime64(trade.maturity_date, "D")
+        else:
+            columns["symbol"][row] = self.symbols.intern(trade.underlying_symbol)
+            columns["option_type"][row] = OPTION_TYPE_CODES.get(str(trade.option_type).lower(), 0)
+            columns["quantity"][row] = trade.quantity
+            columns["strike"][row] = trade.strike_price
+            columns["premium"][row] = trade.premium
+            columns["expiry"][row] = np.datetime64(trade.expiration_date, "D")
+
+        self._trade_ids.append(trade_id)
+        self._index[trade_id] = row
+        self._size = row + 1
+
+        for listener in self._listeners:
+            listener.on_append(row)
+        return row
+
+    def append_row(self, trade_id:str, values:Dict[str, object])-> int:
+        """
+        Append one row from raw book values, e.g. when replaying an event log. `values`
+        is keyed by column name, with "user", "symbol" and "venue" given as strings.
+        """
+        if trade_id in self._index:
+            raise ValueError(f"Trade {trade_id} already exists in the book.")
+        row = self._size
+        self._reserve(row + 1)
+        interners = {"user": self.users, "symbol": self.symbols, "venue": self.venues}
+        for name, value in values.items():
+            interner = interners.get(name)
+            self._columns[name][row] = interner.intern(value) if interner is not None else value
+
+        self._trade_ids.append(trade_id)
+        self._index[trade_id] = row
+        self._size = row + 1
+
+        for listener in self._listeners:
+            listener.on_append(row)
+        return row
+
+    def _intern_column(self, interner:Interner, values:Sequence[str])-> np.ndarray:
+        # intern each distinct value once and broadcast the codes back; None stays -1
+        values = np.asarray(values, dtype=object)
+        present = values != None  # noqa: E711 (elementwise)
+        codes = np.full(len(values), -1, dtype=np.int32)
+        uniques, inverse = np.unique(values[present].astype(str), return_inverse=True)
+        codes[present] = np.array([interner.intern(value) for value in uniques.tolist()], dtype=np.int32)[inverse]
+        return codes
+
+    def _convert_columns(self, trade_type:str, columns:Dict[str, Sequence])-> Dict[str, np.ndarray]:
+        # every non-string column converted up front, so a bad value is reported before
+        # anything is written to the book
+        required = REQUIRED_FIELDS[trade_type]
+        missing = [name for name in required if name not in columns]
+        if missing:
+            raise ValueError(f"Missing {trade_type} columns: {', '.join(missing)}.")
+
+        converted = {}
+        for name, (column, kind) in BOOK_FIELDS[trade_type].items():
+            if name not in columns or kind in ("symbol", "venue"):
+                continue
+            values = columns[name]
+            if kind == "option_type":
+                option_types = np.char.lower(np.asarray(values, dtype=str))
+                converted[name] = np.where(option_types == "call", 1, np.where(option_types == "put", -1, 0))
+                continue
+            try:
+                values = np.asarray(values, dtype="datetime64[D]" if kind == "date" else np.float64)
+            except (TypeError, ValueError) as error:
+                raise ValueError(f"Invalid {name} values: {error}") from None
+            if name in required and (np.isnat(values) if kind == "date" else np.isnan(values)).any():
+                raise ValueError(f"Missing {name} values.")
+            converted[name] = values
+        return converted
+
+    def extend(self, trade_type:str, columns:Dict[str, Sequence], trade_ids:Sequence[str]=None,
+               timestamp:datetime=None)-> np.ndarray:
+        """
+        Append a batch of trades of one type straight from typed columns and return
+        their rows. No trade objects are created.
+
+        `columns` uses the trade field names (e.g. "symbol", "quantity", "maturity_date")
+        plus "user_id" and "direction". Every row shares `timestamp`. The batch is
+        checked (REQUIRED_FIELDS present and convertible) before any row is written, so
+        a ValueError leaves the book unchanged.
+        """
+        if trade_type not in BOOK_FIELDS:
+            raise ValueError(f"Invalid trade type: {trade_type}.")
+        lengths = {len(values) for values in columns.values()}
+        if trade_ids is not None:
+            lengths.add(len(trade_ids))
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        count = lengths.pop() if lengths else 0
+        if trade_ids is None:
+            trade_ids = new_trade_ids(count)
+
+        trade_ids = list(trade_ids)
+        if len(set(trade_ids)) != count or any(trade_id in self._index for trade_id in trade_ids):
+            raise ValueError("Trade ids must be unique and not already in the book.")
+        converted = self._convert_columns(trade_type, columns)
+
+        start = self._size
+        self._reserve(start + count)
+        block = slice(start, start + count)
+        target = self._columns
+
+        target["trade_type"][block] = TRADE_TYPE_CODES[trade_type]
+        target["status"][block] = STATUS_CODES[TradeStatus.NEW]
+        target["timestamp"][block] = np.datetime64(timestamp or datetime.now(), "us")
+        if "user_id" in columns:
+            target["user"][block] = self._intern_column(self.users, columns["user_id"])
+        else:
+            target["user"][block] = -1
+        if "direction" in columns:
+            directions = np.char.upper(np.asarray(columns["direction"], dtype=str))
+            target["direction"][block] = np.where(directions == "BUY", 1, np.where(directions == "SELL", -1, 0))
+
+        interners = {"symbol": self.symbols, "venue": self.venues}
+        for name, (column, kind) in BOOK_FIELDS[trade_type].items():
+            if name in converted:
+                target[column][block] = converted[name]
+            elif name not in columns:
+                target[column][block] = -1 if kind in interners else self._empty_column(column, count)
+            else:
+                target[column][block] = self._intern_column(interners[kind], columns[name])
+
+        for offset, trade_id in enumerate(trade_ids):
+            self._index[trade_id] = start + offset
+        self._trade_ids.extend(trade_ids)
+        self._size = start + count
+
+        rows = np.arange(start, start + count, dtype=np.int64)
+        self._notify_append_many(rows)
+        return rows
+
+    def _notify_append_many(self, rows:np.ndarray)-> None:
+        # listeners with an on_append_many hook take the whole batch at once
+        if not len(rows):
+            return
+        for listener in self._listeners:
+            bulk = getattr(listener, "on_append_many", None)
+            if bulk is not None:
+                bulk(rows)
+            else:
+                for row in rows.tolist():
+                    listener.on_append(row)
+
+    def subscribe(self, listener)-> None:
+        """
+        Register an object notified of every change to the book.
+
+        Listeners implement on_append(row) and on_status_change(row, old_code, new_code),
+        which lets derived state such as risk aggregates be updated incrementally. They
+        may also implement on_append_many(rows) and on_status_change_many(rows,
+        old_codes, new_code) to take batch changes in one call.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener)-> None:
+        self._listeners.remove(listener)
+
+    def row_of(self, trade_id:str)-> int:
+        return self._index.get(trade_id)
+
+    def view(self, row:int)-> TradeView:
+        return VIEW_TYPES[self._columns["trade_type"][row]](self, row)
+
+    def get(self, trade_id:str, default=None)-> TradeView:
+        row = self._index.get(trade_id)
+        if row is None:
+            return default
+        return self.view(row)
+
+    def column(self, name:str)-> np.ndarray:
+        """
+        Return the filled part of a column. This is a view, not a copy.
+        """
+        return self._columns[name][:self._size]
+
+    def set_status(self, row:int, status:str | TradeStatus)-> None:
+        column = self._columns["status"]
+        old_code = int(column[row])
+        new_code = status_code(status)
+        if old_code == new_code:
+            return
+        column[row] = new_code
+
+        for listener in self._listeners:
+            listener.on_status_change(row, old_code, new_code)
+
+    def set_status_many(self, rows:np.ndarray, status:str | TradeStatus)-> None:
+        """
+        Set the same status on many rows with one column write.
+        """
+        column = self._columns["status"]
+        rows = np.asarray(rows, dtype=np.int64)
+        new_code = status_code(status)
+        old_codes = column[rows]
+        changed = old_codes != new_code
+        rows, old_codes = rows[changed], old_codes[changed]
+        column[rows] = new_code
+        self._notify_status_many(rows, old_codes, new_code)
+
+    def _notify_status_many(self, rows:np.ndarray, old_codes:np.ndarray, new_code:int)-> None:
+        # listeners with an on_status_change_many hook take the whole batch at once
+        if not len(rows):
+            return
+        for listener in self._listeners:
+            bulk = getattr(listener, "on_status_change_many", None)
+            if bulk is not None:
+                bulk(rows, old_codes, new_code)
+            else:
+                for row, old_code in zip(rows.tolist(), old_codes.tolist()):
+                    listener.on_status_change(row, old_code, new_code)
+
+    def transition_many(self, rows:np.ndarray, status:str | TradeStatus)-> np.ndarray:
+        """
+        Move `rows` to `status` where TRANSITIONS allows it and return the boolean
+        mask of the rejected rows (aligned with `rows`).
+
+        Every row is checked against the statuses held before the call and the
+        accepted rows are written with one column write, so the batch is applied as
+        a whole. Rows below 0 (e.g. unknown trade ids) and repeats of a row already
+        in the batch are rejected.
+        """
+        column = self._columns["status"]
+        rows = np.asarray(rows, dtype=np.int64)
+        new_code = status_code(status)
+        rejected = (rows < 0) | (rows >= self._size)
+        old_codes = np.zeros(len(rows), dtype=column.dtype)
+        old_codes[~rejected] = column[rows[~rejected]]
+        rejected |= ~TRANSITIONS[old_codes, new_code]
+
+        accepted = np.flatnonzero(~rejected)
+        if len(accepted) and np.bincount(rows[accepted]).max() > 1:
+            _, first = np.unique(rows[accepted], return_index=True)
+            repeated = np.ones(len(accepted), dtype=bool)
+            repeated[first] = False
+            rejected[accepted[repeated]] = True
+            accepted = accepted[~repeated]
+
+        rows, old_codes = rows[accepted], old_codes[accepted]
+        column[rows] = new_code
+        self._notify_status_many(rows, old_codes, new_code)
+        return rejected
+
+    def mask(self, trade_type:str=None, status:str | TradeStatus=None, user_id:str=None, symbol:str=None)-> np.ndarray:
+        """
+        Build a boolean row mask from equality filters. Unset filters match everything.
+        """
+        mask = np.ones(self._size, dtype=bool)
+        if trade_type is not None:
+            mask &= self.column("trade_type") == TRADE_TYPE_CODES.get(trade_type, -1)
+        if status is not None:
+            mask &= self.column("status") == status_code(status)
+        if user_id is not None:
+            mask &= self.column("user") == self.users.lookup(user_id)
+        if symbol is not None:
+            mask &= self.column("symbol") == self.symbols.lookup(symbol)
+        return mask
+
+    def where(self, mask:np.ndarray)-> TradeBookSlice:
+        return TradeBookSlice(self, np.flatnonzero(mask))
+
+    @property
+    def trade_ids(self)-> List[str]:
+        return self._trade_ids
+
+    @property
+    def nbytes(self)-> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def columns(self)-> Dict[str, np.ndarray]:
+        return {name: self.column(name) for name in self._columns}
+
+    def __getitem__(self, trade_id:str)-> TradeView:
+        return self.view(self._index[trade_id])
+
+    def __contains__(self, trade_id:object)-> bool:
+        return trade_id in self._index
+
+    def __iter__(self)-> Iterator[str]:
+        return iter(self._trade_ids)
+
+    def __len__(self)-> int:
+        return self._size
@@ -4,20 +4,112 @@ trade_factory.py
 This module contains the TradeFactory class, which is responsible for creating trades.
 """
 
+import os
+from collections.abc import Mapping
 from datetime import datetime
-from uuid import uuid4
+from importlib import import_module
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .base_trade import BaseTrade, TradeStatus, parse_date
+
+
+def new_trade_ids(count:int)-> List[str]:
+    """
+    Generate `count` random version 4 UUID strings from one urandom call.
+    """
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode(), dtype="S1").reshape(count, 32)
+
+    # lay the digits out as 8-4-4-4-12 groups, one id per line, and split once
+    text = np.full((count, 37), b"-", dtype="S1")
+    text[:, 36] = b"\n"
+    for start, end, offset in ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24)):
+        text[:, offset:offset + end - start] = hex_digits[:, start:end]
+    return text.tobytes().decode().split("\n")[:count]
+
+
+# trade fields the trade classes can't be built without (their risk depends on them);
+# TradeFactory.create_trades and TradeBook.extend reject batches that lack them
+REQUIRED_FIELDS = {
+    "EQUITY": ("quantity", "price"),
+    "BOND": ("face_value", "price", "coupon_rate", "maturity_date"),
+    "DERIVATIVE": (),
+}
+
+
+def _typed_column(name:str, values:Sequence, kind:type, count:int)-> List:
+    if values is None:
+        # as the constructors do for a missing optional field
+        return [0 if kind in (int, float) else None] * count
+    try:
+        if kind is float:
+            return np.asarray(values, dtype=np.float64).tolist()
+        if kind is int:
+            numbers = np.asarray(values)
+            if numbers.dtype.kind not in "iu":
+                numbers = numbers.astype(np.float64)
+                if not (np.isfinite(numbers) & (numbers == np.trunc(numbers))).all():
+                    raise ValueError("expected whole numbers")
+            return numbers.astype(np.int64).tolist()
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Invalid {name} values: {error}") from None
+    if kind is datetime:
+        return [parse_date(value) for value in values]
+    return list(values)
+
+
+def _has_missing(values:List)-> bool:
+    return any(value is None or value != value for value in values)
+
+
+class TradeTypeRegistry(Mapping):
+    """
+    trade_type -> trade class. Classes can be registered by (module, class name) and
+    are then only imported the first time they are looked up, so a run that books
+    one trade type does not import the others.
+    """
+    def __init__(self, trade_types:Dict[str, Tuple[str, str] | type]=None)-> None:
+        self._entries = {}
+        for trade_type, trade_class in (trade_types or {}).items():
+            self.register(trade_type, trade_class)
+
+    def register(self, trade_type:str, trade_class:Tuple[str, str] | type)-> None:
+        """
+        Register a trade class, or a (module, class name) pair to import it from;
+        modules starting with "." are relative to this package.
+        """
+        self._entries[trade_type] = trade_class
+
+    def loaded(self, trade_type:str)-> bool:
+        return isinstance(self._entries.get(trade_type), type)
+
+    def __getitem__(self, trade_type:str)-> type:
+        trade_class = self._entries[trade_type]
+        if not isinstance(trade_class, type):
+            module, name = trade_class
+            trade_class = self._entries[trade_type] = getattr(import_module(module, __package__), name)
+        return trade_class
+
+    def __contains__(self, trade_type:object)-> bool:
+        return trade_type in self._entries
+
+    def __iter__(self)-> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self)-> int:
+        return len(self._entries)
 
-from base_trade import BaseTrade
-from equity_trade import EquityTrade
-from bond_trade import BondTrade
-from derivative_trade import DerivativeTrade
 
 class TradeFactory:
-    TRADETYPES = {
-        "EQUITY": EquityTrade,
-        "BOND": BondTrade,
-        "DERIVATIVE": DerivativeTrade,
-    }
+    TRADETYPES = TradeTypeRegistry({
+        "EQUITY": (".equity_trade", "EquityTrade"),
+        "BOND": (".bond_trade", "BondTrade"),
+        "DERIVATIVE": (".derivative_trade", "DerivativeTrade"),
+    })
 
     @staticmethod
     def create_trade(trade_type:str="", **kwargs)-> BaseTrade:
@@ -27,8 +119,56 @@ class TradeFactory:
         if "timestamp" not in kwargs:
             kwargs["timestamp"] = datetime.now()
         if "trade_id" not in kwargs:
-            kwargs["trade_id"] = str(uuid4())
+            kwargs["trade_id"] = new_trade_ids(1)[0]
         if "trade_type" not in kwargs:
             kwargs["trade_type"] = trade_type
 
         return TradeFactory.TRADETYPES[trade_type](**kwargs)
+
+    @staticmethod
+    def create_trades(trade_type:str, columns:Dict[str, Sequence], timestamp:datetime=None)-> List[BaseTrade]:
+        """
+        Create many trades of one type from column batches, e.g. {"symbol": [...], "price": [...]}.
+
+        Each column is converted once as a whole instead of per trade, repeated dates are
+        parsed once, every trade shares one batch timestamp and missing trade ids are
+        generated in bulk. Columns not listed in the class FIELDS are ignored. Like
+        TradeBook.extend, a batch without values for every REQUIRED_FIELDS column, or
+        with values that don't convert (e.g. a fractional int), raises ValueError.
+        """
+        if trade_type not in TradeFactory.TRADETYPES:
+            raise ValueError("Invalid trade type")
+        trade_class = TradeFactory.TRADETYPES[trade_type]
+        required = REQUIRED_FIELDS.get(trade_type, ())
+        missing = [name for name in required if name not in columns]
+        if missing:
+            raise ValueError(f"Missing {trade_type} columns: {', '.join(missing)}.")
+
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        count = lengths.pop() if lengths else 0
+
+        timestamp = timestamp or datetime.now()
+        trade_ids = list(columns["trade_id"]) if "trade_id" in columns else new_trade_ids(count)
+        user_ids = _typed_column("user_id", columns.get("user_id"), str, count)
+        fields = []
+        for name, (attribute, kind) in trade_class.FIELDS.items():
+            values = _typed_column(name, columns.get(name), kind, count)
+            if name in required and _has_missing(values):
+                raise ValueError(f"Missing {name} values.")
+            fields.append((attribute, values))
+
+        trades = []
+        new = trade_class.__new__
+        for i in range(count):
+            trade = new(trade_class)
+            trade._trade_type = trade_type
+            trade._timestamp = timestamp
+            trade._status = TradeStatus.NEW
+            trade.trade_id = trade_ids[i]
+            trade.user_id = user_ids[i]
+            for attribute, values in fields:
+                setattr(trade, attribute, values[i])
+            trades.append(trade)
+        return trades
@@ -0,0 +1,118 @@
+"""
+trade_index.py
+
+This module contains the TradeIndex class, which maintains secondary indexes of a
+TradeBook by user, symbol and status so that lookups don't have to scan the book.
+"""
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from .base_trade import TradeStatus
+from .trade_book import TradeBook, STATUSES, status_code
+
+
+def group_rows(codes:np.ndarray)-> Tuple[np.ndarray, np.ndarray]:
+    """
+    Group row numbers by code (-1 included) as (rows, offsets): the rows of code c are
+    rows[offsets[c + 1]:offsets[c + 2]].
+    """
+    shifted = codes.astype(np.int64) + 1
+    rows = np.argsort(shifted, kind="stable")
+    offsets = np.zeros(int(shifted.max(initial=0)) + 2, dtype=np.int64)
+    np.cumsum(np.bincount(shifted, minlength=len(offsets) - 1), out=offsets[1:])
+    return rows, offsets
+
+
+class TradeIndex:
+    """
+    Secondary indexes over the rows of a TradeBook.
+
+    User and symbol never change after a trade is booked, so those indexes are a
+    grouped copy of the rows present at construction (or loaded from a snapshot) plus
+    append-only lists of the rows booked since. The status index holds one set of
+    rows per status; it is built from the status column on first use and then moved
+    along on every status change the book reports.
+    """
+    def __init__(self, book:TradeBook, state:Dict[str, np.ndarray]=None)-> None:
+        self._book = book
+        if state is None:
+            self._users = group_rows(book.column("user"))
+            self._symbols = group_rows(book.column("symbol"))
+        else:
+            self._users = (state["user_rows"], state["user_offsets"])
+            self._symbols = (state["symbol_rows"], state["symbol_offsets"])
+        self._by_user: Dict[int, List[int]] = {}
+        self._by_symbol: Dict[int, List[int]] = {}
+        self._by_status: List[Set[int]] = None
+        book.subscribe(self)
+
+    def on_append(self, row:int)-> None:
+        columns = self._book._columns
+        self._by_user.setdefault(int(columns["user"][row]), []).append(row)
+        self._by_symbol.setdefault(int(columns["symbol"][row]), []).append(row)
+        if self._by_status is not None:
+            self._by_status[columns["status"][row]].add(row)
+
+    def on_status_change(self, row:int, old_code:int, new_code:int)-> None:
+        # until the status index is built the status column itself is the index
+        if self._by_status is not None:
+            self._by_status[old_code].discard(row)
+            self._by_status[new_code].add(row)
+
+    def on_status_change_many(self, rows:np.ndarray, old_codes:np.ndarray, new_code:int)-> None:
+        if self._by_status is not None:
+            for old_code in np.unique(old_codes).tolist():
+                moved = rows[old_codes == old_code].tolist()
+                self._by_status[old_code].difference_update(moved)
+                self._by_status[new_code].update(moved)
+
+    @staticmethod
+    def _rows(grouped:Tuple[np.ndarray, np.ndarray], appended:Dict[int, List[int]], code:int)-> np.ndarray:
+        rows, offsets = grouped
+        position = code + 1
+        base = rows[offsets[position]:offsets[position + 1]] if 0 <= position < len(offsets) - 1 else rows[:0]
+        extra = appended.get(code)
+        if not extra:
+            return base.astype(np.int64)
+        return np.concatenate([base, np.array(extra, dtype=np.int64)])
+
+    def rows_for_user(self, user_id:str)-> np.ndarray:
+        return self._rows(self._users, self._by_user, self._book.users.lookup(user_id))
+
+    def rows_for_symbol(self, symbol:str)-> np.ndarray:
+        """
+        Rows whose symbol, ISIN or underlying symbol is `symbol`.
+        """
+        return self._rows(self._symbols, self._by_symbol, self._book.symbols.lookup(symbol))
+
+    def _statuses(self)-> List[Set[int]]:
+        if self._by_status is None:
+            rows, offsets = group_rows(self._book.column("status"))
+            self._by_status = [
+                set(rows[offsets[code + 1]:offsets[code + 2]].tolist()) if code + 2 < len(offsets) else set()
+                for code in range(len(STATUSES))
+            ]
+        return self._by_status
+
+    def rows_with_status(self, status:str | TradeStatus)-> np.ndarray:
+        rows = np.fromiter(self._statuses()[status_code(status)], dtype=np.int64)
+        rows.sort()
+        return rows
+
+    def count_with_status(self, status:str | TradeStatus)-> int:
+        return len(self._statuses()[status_code(status)])
+
+    def state(self)-> Dict[str, np.ndarray]:
+        """
+        User and symbol indexes as grouped row arrays, e.g. for a snapshot.
+        """
+        book = self._book
+        user_rows, user_offsets = group_rows(book.column("user"))
+        symbol_rows, symbol_offsets = group_rows(book.column("symbol"))
+        return {
+            "user_rows": user_rows,
+            "user_offsets": user_offsets,
+            "symbol_rows": symbol_rows,
+            "symbol_offsets": symbol_offsets,
+        }
@@ -0,0 +1,180 @@
+"""
+trade_pipeline.py
+
+This module contains the staged trade pipeline. Each batch of trades flows through
+add -> validate -> execute -> settle once, and the risk is read at the end, instead of
+TradeProcessor.process_trades walking the whole book once per lifecycle step.
+"""
+from abc import ABC, abstractmethod
+from itertools import islice
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from .base_trade import TradeStatus
+from .trade_book import STATUS_CODES
+from .batch_validation import validate_batch
+
+
+class PipelineBatch:
+    """
+    One batch moving through the pipeline. `rows` holds the book rows that are still
+    live; stages drop rows that should not continue.
+    """
+    __slots__ = ("trade_details", "rows")
+
+    def __init__(self, trade_details:List[Dict])-> None:
+        self.trade_details = trade_details
+        self.rows = np.empty(0, dtype=np.int64)
+
+
+class PipelineResult:
+    """
+    Outcome of a pipeline run.
+    """
+    def __init__(self)-> None:
+        self.batches = 0
+        self.received = 0
+        # stage name -> number of rows that left the stage
+        self.stage_counts = {}
+        # trade_id -> reason the trade could not be added
+        self.add_errors = {}
+        # trade_id -> validation errors
+        self.rejected = {}
+        self.risk_exposure = None
+
+    def count(self, stage:str, rows:int)-> None:
+        self.stage_counts[stage] = self.stage_counts.get(stage, 0) + rows
+
+    def __repr__(self)-> str:
+        return (f"PipelineResult(batches={self.batches}, received={self.received}, stage_counts={self.stage_counts}, "
+                f"add_errors={len(self.add_errors)}, rejected={len(self.rejected)})")
+
+
+class Stage(ABC):
+    name = "stage"
+
+    @abstractmethod
+    def process(self, processor, batch:PipelineBatch, result:PipelineResult)-> None:
+        pass
+
+    def finish(self, processor, result:PipelineResult)-> None:
+        pass
+
+
+class AddStage(Stage):
+    name = "add"
+
+    def process(self, processor, batch:PipelineBatch, result:PipelineResult)-> None:
+        book = processor.trades
+        start = len(book)
+        for trade_details in batch.trade_details:
+            try:
+                processor.add_trade(trade_details)
+            except (ValueError, TypeError, KeyError) as e:
+                result.add_errors[trade_details.get("trade_id")] = str(e)
+                if processor.metrics is not None:
+                    processor.metrics.increment("add_errors_total")
+        # appends are sequential, so the new trades are exactly the rows added above
+        batch.rows = np.arange(start, len(book), dtype=np.int64)
+
+
+class ValidateStage(Stage):
+    name = "validate"
+
+    def process(self, processor, batch:PipelineBatch, result:PipelineResult)-> None:
+        report = validate_batch(processor.trades, batch.rows)
+        if processor.metrics is not None:
+            processor.metrics.record_validation(report)
+        result.rejected.update(report.invalid_trades())
+        batch.rows = batch.rows[report.valid]
+
+
+class TransitionStage(Stage):
+    """
+    Move every row currently in `from_status` to `to_status` in one bulk write.
+    """
+    def __init__(self, name:str, from_status:TradeStatus, to_status:TradeStatus)-> None:
+        self.name = name
+        self._from_code = STATUS_CODES[from_status]
+        self._to_status = to_status
+
+    def process(self, processor, batch:PipelineBatch, result:PipelineResult)-> None:
+        book = processor.trades
+        batch.rows = batch.rows[book.column("status")[batch.rows] == self._from_code]
+        book.set_status_many(batch.rows, self._to_status)
+
+
+class RiskStage(Stage):
+    name = "risk"
+
+    def process(self, processor, batch:PipelineBatch, result:PipelineResult)-> None:
+        pass
+
+    def finish(self, processor, result:PipelineResult)-> None:
+        # the running aggregates are kept current by the book, no rescan needed
+        result.risk_exposure = processor.current_risk_exposure()
+
+
+def default_stages()-> List[Stage]:
+    return [
+        AddStage(),
+        ValidateStage(),
+        TransitionStage("execute", TradeStatus.VALIDATED, TradeStatus.EXECUTED),
+        TransitionStage("settle", TradeStatus.EXECUTED, TradeStatus.SETTLED),
+        RiskStage(),
+    ]
+
+
+class TradePipeline:
+    """
+    Runs batches of trade dicts through a list of stages. Pass your own list to insert,
+    drop or reorder stages; the first stage is expected to add the trades to the book.
+    """
+    def __init__(self, stages:List[Stage]=None, batch_size:int=10000)-> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive integer")
+        self.stages = default_stages() if stages is None else list(stages)
+        self.batch_size = batch_size
+
+    def _batches(self, trade_details:Iterator[Dict])-> Iterator[List[Dict]]:
+        while True:
+            batch = list(islice(trade_details, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def run(self, processor, trade_details:Iterable[Dict])-> PipelineResult:
+        result = PipelineResult()
+        metrics = processor.metrics
+        for trade_batch in self._batches(iter(trade_details)):
+            batch = PipelineBatch(trade_batch)
+            result.batches += 1
+            result.received += len(trade_batch)
+            if metrics is None:
+                for stage in self.stages:
+                    stage.process(processor, batch, result)
+                    result.count(stage.name, len(batch.rows))
+            else:
+                self._run_timed(processor, batch, result, metrics)
+
+        for stage in self.stages:
+            if metrics is None:
+                stage.finish(processor, result)
+            else:
+                start = perf_counter()
+                stage.finish(processor, result)
+                metrics.observe("stage_finish_seconds", perf_counter() - start, stage=stage.name)
+        return result
+
+    def _run_timed(self, processor, batch:PipelineBatch, result:PipelineResult, metrics)-> None:
+        rows_in = len(batch.trade_details)
+        for stage in self.stages:
+            start = perf_counter()
+            stage.process(processor, batch, result)
+            seconds = perf_counter() - start
+            rows_out = len(batch.rows)
+            result.count(stage.name, rows_out)
+            metrics.record_stage(stage.name, rows_in, rows_out, seconds)
+            rows_in = rows_out
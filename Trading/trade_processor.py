@@ -4,25 +4,124 @@ This module contains the TradeProcessor class, which is responsible for processi
 """
 
 from datetime import datetime
-from typing import List, Dict
-from uuid import uuid4
+from time import perf_counter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List
 
-from base_trade import BaseTrade
-from equity_trade import EquityTrade
-from bond_trade import BondTrade
-from derivative_trade import DerivativeTrade
-from trade_factory import TradeFactory
+import numpy as np
+
+from .base_trade import BaseTrade
+from .trade_factory import TradeFactory
+from .trade_book import TradeBook, TradeView, status_code
+from .risk_engine import RiskEngine
+from .price_cache import PriceCache
+from .option_pricing import OptionModel
+from .bond_analytics import BondAnalytics
+from .risk_aggregates import RiskAggregates
+from .trade_index import TradeIndex
+from .position_ledger import PositionLedger
+from .batch_validation import ValidationReport, validate_batch
+from .trade_pipeline import PipelineResult, Stage, TradePipeline
+from .metrics import Metrics
+
+# snapshots, the event log, scenarios and parallel runs are imported when first used,
+# which keeps short command line runs from paying for them
+if TYPE_CHECKING:
+    from .event_log import EventLog
+    from .scenario_engine import ScenarioResult, ScenarioSet
 
 
 class TradeProcessor:
-    def __init__(self)-> None:
-        # Dictionary to store trades
-        self._trades = {}
+    def __init__(self, price_cache:PriceCache=None, option_model:OptionModel=None,
+                 bond_analytics:BondAnalytics=None, snapshot:str=None, event_log:str=None,
+                 metrics:Metrics=None)-> None:
+        # Columnar store of the trades, behaves as a mapping of trade_id -> row view,
+        # memory mapped from `snapshot` (see save_snapshot) when one is given
+        if snapshot is None:
+            self._trades, states, metadata = TradeBook(), {}, {}
+        else:
+            from .book_snapshot import load_snapshot
+            self._trades, states, metadata = load_snapshot(snapshot)
+        self._risk_engine = RiskEngine(self._trades)
+        # Market prices used to mark risk to market, trade prices are used when None
+        self._price_cache = price_cache
+        # Black-Scholes inputs for derivative risk, the flat 0.5 delta is used when None
+        self._option_model = option_model
+        # Yield / duration calculator, keeps its coupon schedules cached between calls
+        self._bond_analytics = bond_analytics or BondAnalytics()
+        # Running risk totals, kept up to date by the book on every add and status change
+        self._risk_aggregates = RiskAggregates(self._trades, state=states.get("risk_aggregates"))
+        # Secondary indexes by user, symbol and status, also kept current by the book
+        self._index = TradeIndex(self._trades, states.get("index"))
+        # Positions per (user, instrument), updated as trades are executed
+        self._ledger = PositionLedger(self._trades, states.get("ledger"))
+        # Write-ahead log of every add and status change, replayed on top of the snapshot
+        self._event_log = None
+        if event_log is not None:
+            from .event_log import recover
+            self._event_log = recover(event_log, self._trades, metadata.get("event_sequence", 0))
+            self._event_log.attach(self._trades)
+        # Stage counters, timings and queue depths; no instrumentation when None
+        self._metrics = None
+        self.metrics = metrics
     
     @property
-    def trades(self)-> Dict[uuid4, BaseTrade]:
+    def trades(self)-> TradeBook:
         return self._trades
 
+    @property
+    def metrics(self)-> Metrics:
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, value:Metrics)-> None:
+        if self._metrics is not None:
+            self._metrics.remove_gauge("book_trades")
+            self._metrics.remove_gauge("queue_depth", queue="event_log")
+        self._metrics = value
+        if value is not None:
+            value.set_gauge("book_trades", lambda: len(self._trades))
+            if self._event_log is not None:
+                value.set_gauge("queue_depth", lambda: self._event_log.pending, queue="event_log")
+
+    def _record_pass(self, stage:str, rows_in:int, rows_out:int, start:float)-> None:
+        if self._metrics is not None:
+            self._metrics.record_stage(stage, rows_in, rows_out, perf_counter() - start)
+
+    def save_snapshot(self, path:str)-> int:
+        """
+        Write the trade book, risk aggregates, indexes and positions to a binary
+        snapshot that TradeProcessor(snapshot=path) reloads without reparsing.
+        """
+        from .book_snapshot import save_snapshot
+        sequence = self._event_log.sequence if self._event_log is not None else 0
+        self.sync()
+        return save_snapshot(path, self._trades, {
+            "risk_aggregates": self._risk_aggregates.state(),
+            "index": self._index.state(),
+            "ledger": self._ledger.state(),
+        }, {"event_sequence": sequence})
+
+    @property
+    def event_log(self)-> "EventLog":
+        return self._event_log
+
+    def sync(self)-> None:
+        """
+        Make every change logged so far durable.
+        """
+        if self._event_log is not None:
+            self._event_log.commit()
+
+    def checkpoint(self, path:str)-> int:
+        """
+        Save a snapshot and empty the event log it covers, so a restart with
+        TradeProcessor(snapshot=path, event_log=...) only replays newer events.
+        """
+        size = self.save_snapshot(path)
+        if self._event_log is not None:
+            self._event_log.reset()
+        return size
+
     def add_trade(self, trade_details:Dict)-> None:
         trade_id = trade_details["trade_id"]
         
@@ -34,39 +133,70 @@ class TradeProcessor:
             raise ValueError(f"Invalid trade type: {trade_type}. Try 'EQUITY', 'BOND', or 'DERIVATIVE'.")
         
         trade = TradeFactory.create_trade(**trade_details)
-        self.trades[trade_id] = trade
+        self.trades.append(trade)
 
-    def get_trade(self, trade_id:uuid4)-> BaseTrade:
-        if trade_id not in self._trades:
-            return None
-        return self.trades[trade_id]
+    def add_trades(self, trade_type:str, columns:Dict[str, List], trade_ids:List[str]=None,
+                   timestamp:datetime=None)-> List[str]:
+        """
+        Bulk version of add_trade for already typed column batches of a single trade type.
+        Returns the trade ids of the new trades.
+        """
+        rows = self.trades.extend(trade_type, columns, trade_ids, timestamp)
+        return self.trades.trade_ids[len(self.trades) - len(rows):]
+
+    def get_trade(self, trade_id:str)-> TradeView:
+        return self.trades.get(trade_id)
+
+    @property
+    def index(self)-> TradeIndex:
+        return self._index
 
-    # def update_trade(self, trade_id:uuid4, trade_details:Dict)-> None:
+    def _views(self, rows)-> List[TradeView]:
+        return [self.trades.view(row) for row in rows.tolist()]
+
+    def _filter_status(self, rows, status:str=None):
+        if status is None:
+            return rows
+        return rows[self.trades.column("status")[rows] == status_code(status)]
+
+    def trades_for_user(self, user_id:str, status:str=None)-> List[TradeView]:
+        return self._views(self._filter_status(self._index.rows_for_user(user_id), status))
+
+    def trades_for_symbol(self, symbol:str, status:str=None)-> List[TradeView]:
+        """
+        Trades whose symbol, ISIN or underlying symbol is `symbol`.
+        """
+        return self._views(self._filter_status(self._index.rows_for_symbol(symbol), status))
+
+    def trades_with_status(self, status:str)-> List[TradeView]:
+        return self._views(self._index.rows_with_status(status))
+
+    # def update_trade(self, trade_id:str, trade_details:Dict)-> None:
     #     trade = self.get_trade(trade_id)
     #     if not trade:
     #         raise ValueError(f"Trade {trade_id} does not exist. Try adding the trade instead.")
     #     trade.update_trade(trade_details)
 
-    # def delete_trade(self, trade_id:uuid4)-> None:
+    # def delete_trade(self, trade_id:str)-> None:
     #     if trade_id not in self._trades:
     #         raise ValueError(f"Trade {trade_id} does not exist. Try adding the trade instead.")
     #     del self.trades[trade_id]
 
-    def cancel_trade(self, trade_id:uuid4)-> None:
+    def cancel_trade(self, trade_id:str)-> None:
         trade = self.get_trade(trade_id)
         if not trade:
             raise ValueError(f"Trade {trade_id} does not exist. Cannot cancel if it doesn't exist.")
         
-        if trade.status not in ["EXECUTED", "SETTLED"]:
-            trade.status = "CANCELLED"
-        else:
+        if trade.status in ["EXECUTED", "SETTLED"]:
             raise ValueError(f"Trade {trade_id} is already executed or settled. Cannot be cancelled.")
+        trade.transition_status(trade.status, "CANCELLED")
         
     
     def validate_trade(self, trade: BaseTrade=None)-> None:
         if trade:
             errors = trade.validate_trade()
-            if errors:
+            # trade classes return True when valid and a list of errors otherwise
+            if errors is not True:
                 self.cancel_trade(trade.trade_id)
                 message = f"Trade {trade.trade_id} is invalid. Please check the trade details and try again."
             else:
@@ -82,6 +212,25 @@ class TradeProcessor:
                 "message": message
                 }
         
+    def validate_batch(self, trade_ids:Iterable[str]=None, now:datetime=None)-> ValidationReport:
+        """
+        Validate many trades at once (default: every NEW trade) and apply the
+        resulting VALIDATED / CANCELLED statuses in bulk.
+        """
+        rows = None
+        if trade_ids is not None:
+            rows = [self._row_of(trade_id) for trade_id in trade_ids]
+        report = validate_batch(self.trades, rows, now)
+        if self._metrics is not None:
+            self._metrics.record_validation(report)
+        return report
+
+    def _row_of(self, trade_id:str)-> int:
+        row = self.trades.row_of(trade_id)
+        if row is None:
+            raise ValueError(f"Trade {trade_id} does not exist.")
+        return row
+
     def execute_trade(self, trade: BaseTrade=None)-> None:
         if trade:
             trade.transition_status(trade.status, "EXECUTED")
@@ -95,65 +244,221 @@ class TradeProcessor:
             raise ValueError(f"Trade {trade.trade_id} does not exist. Cannot settle if it doesn't exist.")
 
 
-    def calculate_risk_exposure(self)-> Dict[str, float]:
-        all_risk_exposures = 0
-        equity_risk_exposures = 0
-        bond_risk_exposures = 0
-        derivative_risk_exposures = 0
-
-        for trade in self.trades.values():
-            risk_exposure = trade.calculate_risk()
-            if trade.trade_type == "equity":
-                equity_risk_exposures += risk_exposure
-            elif trade.trade_type == "bond":
-                bond_risk_exposures += risk_exposure
-            else:
-                derivative_risk_exposures += risk_exposure
-            all_risk_exposures += risk_exposure
+    @property
+    def price_cache(self)-> PriceCache:
+        return self._price_cache
+
+    @price_cache.setter
+    def price_cache(self, value:PriceCache)-> None:
+        self._price_cache = value
+
+    @property
+    def option_model(self)-> OptionModel:
+        return self._option_model
 
+    @option_model.setter
+    def option_model(self, value:OptionModel)-> None:
+        self._option_model = value
+
+    def calculate_option_greeks(self)-> Dict[str, Dict[str, float]]:
+        """
+        Black-Scholes price and Greeks per live derivative trade_id (not cancelled and
+        not expired), using the processor's option model (or the OptionModel defaults)
+        and price cache.
+        """
+        engine = self._risk_engine
+        marks = engine.marks(self._price_cache) if self._price_cache is not None else None
+        live = np.flatnonzero(engine.open_mask() & engine.unexpired_mask())
+        greeks = engine.option_greeks(self._option_model or OptionModel(), marks, rows=live)
+        trade_ids = self.trades.trade_ids
+        names = ("price", "delta", "gamma", "vega", "theta")
+        return {
+            trade_ids[row]: {name: float(greeks[name][index]) for name in names}
+            for index, row in enumerate(greeks["rows"].tolist())
+        }
+
+    @property
+    def bond_analytics(self)-> BondAnalytics:
+        return self._bond_analytics
+
+    def calculate_bond_analytics(self)-> Dict[str, Dict[str, float]]:
+        """
+        Accrued interest, yield, durations, convexity and DV01 per bond trade_id, at
+        market prices when the processor has a price cache.
+        """
+        engine = self._risk_engine
+        marks = engine.marks(self._price_cache) if self._price_cache is not None else None
+        result = engine.bond_analytics(self._bond_analytics, marks)
+        trade_ids = self.trades.trade_ids
+        names = ("accrued_interest", "yield", "macaulay_duration", "modified_duration", "convexity", "dv01")
+        return {
+            trade_ids[row]: {name: float(result[name][index]) for name in names}
+            for index, row in enumerate(result["rows"].tolist())
+        }
+
+    def run_scenarios(self, scenarios:"ScenarioSet")-> "ScenarioResult":
+        """
+        Exposure and P&L of the open trades under every scenario, split by trade type.
+        """
+        from .scenario_engine import ScenarioEngine
+        engine = ScenarioEngine(self._trades, self._option_model, self._bond_analytics)
+        return engine.run(scenarios, prices=self._price_cache)
+
+    def calculate_value_at_risk(self, price_history:Dict[str, List[float]], confidence:float=0.99,
+                                horizon:int=1)-> Dict[str, float]:
+        """
+        Historical VaR and expected shortfall of the open trades, replaying every
+        `horizon`-day return in `price_history` (symbol -> prices, oldest first).
+        """
+        from .scenario_engine import ScenarioSet
+        result = self.run_scenarios(ScenarioSet.historical(price_history, horizon))
+        return {
+            "value_at_risk": result.value_at_risk(confidence),
+            "expected_shortfall": result.expected_shortfall(confidence),
+        }
+
+    def calculate_risk_exposure(self)-> Dict[str, float]:
+        """
+        Total risk of all trades that have not been cancelled, split by trade type.
+        Marked to market when the processor has a price cache.
+        """
+        report = self.calculate_risk_report()
         return {
-            "all_risk_exposures": all_risk_exposures,
-            "equity_risk_exposures": equity_risk_exposures,
-            "bond_risk_exposures": bond_risk_exposures,
-            "derivative_risk_exposures": derivative_risk_exposures
+            "all_risk_exposures": report["all_risk_exposures"],
+            "equity_risk_exposures": report["equity_risk_exposures"],
+            "bond_risk_exposures": report["bond_risk_exposures"],
+            "derivative_risk_exposures": report["derivative_risk_exposures"]
         }
 
-    def transition_trade_status(self, trade_id:uuid4, new_status:str)-> None:
+    def calculate_risk_report(self)-> Dict[str, float | Dict[str, float]]:
+        """
+        Risk totals per trade type, per user and per symbol from one vectorized pass.
+        """
+        return self._risk_engine.exposure(prices=self._price_cache, option_model=self._option_model)
+
+    @property
+    def risk_aggregates(self)-> RiskAggregates:
+        return self._risk_aggregates
+
+    def current_risk_exposure(self)-> Dict[str, float | Dict[str, float]]:
+        """
+        Risk totals maintained incrementally, without rescanning the book. These use
+        the prices at booking; calculate_risk_report gives the mark-to-market view.
+        """
+        return self._risk_aggregates.exposure()
+
+    def transition_trade_status(self, trade_id:str, new_status:str)-> None:
         trade = self.get_trade(trade_id)
         if not trade:
             raise ValueError(f"Trade {trade_id} does not exist. Cannot transition status if it doesn't exist.")
-        trade.transition_status(trade.status)
+        trade.transition_status(trade.status, new_status)
+
+    def transition_trades(self, trade_ids:Iterable[str], new_status:str)-> np.ndarray:
+        """
+        Move many trades to `new_status` at once and return a boolean mask, aligned
+        with `trade_ids`, of the trades that were not moved (unknown trade id or a
+        transition BaseTrade.STATUS does not allow). The allowed moves are applied
+        together, see TradeBook.transition_many.
+        """
+        rows = np.fromiter((-1 if row is None else row for row in map(self.trades.row_of, trade_ids)),
+                           dtype=np.int64)
+        return self.trades.transition_many(rows, new_status)
+
+    def settle_executed(self)-> int:
+        """
+        End-of-day settlement: move every EXECUTED trade to SETTLED in one bulk
+        transition and return the number of trades settled.
+        """
+        rows = np.flatnonzero(self.trades.mask(status="EXECUTED"))
+        self.trades.transition_many(rows, "SETTLED")
+        return len(rows)
+
+    def calculate_net_quantity(self, trade: BaseTrade=None)-> Dict[str, Dict[str, float]]:
+        """
+        Net equity quantity per user and symbol over the executed trades, read from the
+        position ledger instead of being rebuilt from every trade.
+        """
+        return self._ledger.net_quantities()
 
-    def calculate_net_quantity(self, trade: BaseTrade)-> float:
-        user_net_quantity = {}
+    @property
+    def ledger(self)-> PositionLedger:
+        return self._ledger
+
+    def get_position(self, user_id:str, symbol:str, trade_type:str="EQUITY")-> Dict[str, float]:
+        return self._ledger.position(user_id, symbol, trade_type)
+
+    @staticmethod
+    def _iter_trade_details(trade_data:Iterable[Dict | List[Dict]])-> Iterator[Dict]:
+        # accept single trade dicts as well as batches of them (see read_data.iter_batches)
+        for item in trade_data:
+            if isinstance(item, dict):
+                yield item
+            else:
+                yield from item
 
-        for trade in self.trades.values():
-            if trade.user_id not in user_net_quantity:
-                user_net_quantity[trade.user_id] = {}
+    def process_trades(self, trade_data:Iterable[Dict | List[Dict]], mode:str="four_pass", stages:List[Stage]=None,
+                       batch_size:int=10000, workers:int=None, partition_by:str="user_id")-> PipelineResult | Dict | None:
+        """
+        Process trades from any iterable of trade dicts or batches of trade dicts.
 
-            user_net_quantity[trade.user_id][trade.symbol] = user_net_quantity.get(trade.user_id, {}).get(trade.symbol, 0) \
-                + trade.quantity if trade.direction == "BUY" else -trade.quantity
+        The input is consumed lazily, so a generator such as read_data.iter_trades
+        can be passed without materialising the file first.
 
-        return user_net_quantity
-            
-    def process_trades(self, trade_data:List[Dict])->None:
-        for trade in trade_data:
+        mode="four_pass" adds, validates, executes and settles the whole book in
+        separate passes and prints the risk exposure. mode="pipeline" sends each
+        batch through `stages` (see trade_pipeline.default_stages) in a single pass
+        and returns a PipelineResult instead of printing. mode="parallel" shards
+        the input by `partition_by` over `workers` processes, each running its own
+        TradeProcessor, and returns the merged risk exposure and net quantities;
+        this processor's own book is left untouched.
+        """
+        if mode == "pipeline":
+            return self.run_pipeline(trade_data, stages, batch_size)
+        if mode == "parallel":
+            from .parallel_processing import process_trades_parallel
+            return process_trades_parallel(self._iter_trade_details(trade_data), workers, partition_by, batch_size)
+        if mode != "four_pass":
+            raise ValueError(f"Invalid mode: {mode}. Try 'four_pass', 'pipeline' or 'parallel'.")
+
+        metrics = self._metrics
+        start = perf_counter()
+        received = 0
+        for trade in self._iter_trade_details(trade_data):
+            received += 1
             self.add_trade(trade)
+        if metrics is not None:
+            self._record_pass("add", received, received, start)
+            start = perf_counter()
     
         # validate the trades
-        for trade in self.trades.values():
-            self.validate_trade(trade)
+        report = self.validate_batch()
+        if metrics is not None:
+            self._record_pass("validate", len(report), int(report.valid.sum()), start)
+            start = perf_counter()
         
-        # execute the trades
-        for trade in self.trades.values():
-            self.execute_trade(trade)
+        # execute the trades; trades that cannot move (cancelled, settled) are left as they are
+        rows = np.arange(len(self.trades), dtype=np.int64)
+        rejected = self.trades.transition_many(rows, "EXECUTED")
+        if metrics is not None:
+            self._record_pass("execute", len(rows), len(rows) - int(rejected.sum()), start)
+            start = perf_counter()
 
         # settle the trades
-        for trade in self.trades.values():
-            self.settle_trade(trade)
+        rejected = self.trades.transition_many(rows, "SETTLED")
+        if metrics is not None:
+            self._record_pass("settle", len(rows), len(rows) - int(rejected.sum()), start)
+
+        self.sync()
 
         # calculate the risk exposure
+        start = perf_counter()
         risk_exposure = self.calculate_risk_exposure()
+        self._record_pass("risk", len(self.trades), len(self.trades), start)
         print(risk_exposure)
 
-
+    def run_pipeline(self, trade_data:Iterable[Dict | List[Dict]], stages:List[Stage]=None,
+                     batch_size:int=10000)-> PipelineResult:
+        pipeline = TradePipeline(stages, batch_size)
+        result = pipeline.run(self, self._iter_trade_details(trade_data))
+        self.sync()
+        return result
@@ -0,0 +1,335 @@
+"""
+trade_service.py
+
+This module contains the TradeService class, a long-running asyncio service around a
+TradeProcessor. Clients send newline-delimited JSON or CSV trades over a TCP or Unix
+socket; trades are queued, fed to the processor in micro-batches and risk / position
+queries are answered between batches.
+
+    python -m Trading.trade_service --port 9000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .parsing import parse_line
+from .trade_processor import TradeProcessor
+from .trade_pipeline import TradePipeline, Stage
+from .metrics import Metrics
+
+
+# lines a connection reads before letting the other connections run
+YIELD_EVERY = 64
+
+
+async def _read_line(reader:asyncio.StreamReader)-> bytes:
+    """
+    Read the next line, b"" at the end of the stream. A line longer than the reader's
+    limit is skipped up to its newline and raises ValueError, so the connection can
+    carry on with the next line.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError:
+        pass
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            break
+        except asyncio.LimitOverrunError as e:
+            # drop what is buffered so far and keep reading
+            await reader.readexactly(e.consumed)
+        except asyncio.IncompleteReadError:
+            break
+    raise ValueError("Line too long")
+
+
+class TradeService:
+    """
+    attributes:
+        Processor (the TradeProcessor trades are booked into)
+        Queue size (trades waiting to be processed; readers stop reading when it is full)
+        Batch size and batch timeout (a micro-batch is processed once it is full or its
+            oldest trade has waited `batch_timeout` seconds)
+
+    Protocol, one message per line:
+        {"trade_type": ...}          a trade, as JSON
+        t001,u001,EQUITY,...         a trade, as CSV laid out as in parsing.SCHEMAS
+                                     (or in `columns` order when columns are given)
+        {"query": "risk"}            running risk totals
+        {"query": "risk_report"}     mark-to-market risk report (scans the book)
+        {"query": "position", "user_id": ..., "symbol": ..., "trade_type": ...}
+        {"query": "positions", "user_id": ...}
+        {"query": "trade", "trade_id": ...}
+        {"query": "stats"}           service counters and queue depth
+        {"query": "metrics"}         the processor's metrics snapshot, when it has metrics
+        {"query": "flush"}           replies once every trade sent before it is processed
+    Trades are not acknowledged one by one; queries get one JSON line back, and errors
+    come back as {"error": ...}.
+
+    Backpressure: when the queue is full a connection waits to enqueue and stops
+    reading its socket, so the kernel buffers fill and TCP flow control slows the
+    sender down instead of the service buffering without bound.
+    """
+    def __init__(self, processor:TradeProcessor=None, queue_size:int=10000, batch_size:int=500,
+                 batch_timeout:float=0.005, columns:Sequence[str]=None, delimiter:str=",",
+                 stages:List[Stage]=None)-> None:
+        if queue_size <= 0 or batch_size <= 0:
+            raise ValueError("queue_size and batch_size must be positive integers")
+        self._processor = processor or TradeProcessor()
+        self._pipeline = TradePipeline(stages, batch_size)
+        self._queue_size = queue_size
+        self._batch_size = batch_size
+        self._batch_timeout = batch_timeout
+        # fixed CSV layout; None parses every line with its trade type's schema
+        self._columns = list(columns) if columns else None
+        self._delimiter = delimiter
+
+        self._queue = None
+        self._servers = []
+        self._batcher = None
+        self._stats = {
+            "received": 0, "processed": 0, "batches": 0, "add_errors": 0, "rejected": 0,
+            "failed": 0, "max_queue_depth": 0, "latency_total": 0.0, "latency_max": 0.0,
+        }
+
+    @property
+    def processor(self)-> TradeProcessor:
+        return self._processor
+
+    async def start(self, host:str=None, port:int=None, path:str=None)-> None:
+        """
+        Start the batcher and listen on a TCP `host`/`port`, a Unix socket `path`, or both.
+        """
+        if port is None and path is None:
+            raise ValueError("Give a TCP port, a Unix socket path or both")
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._queue_size)
+            self._batcher = asyncio.create_task(self._run_batches())
+            if self._processor.metrics is not None:
+                self._processor.metrics.set_gauge("queue_depth", self._queue_depth, queue="service")
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self._handle, host or "127.0.0.1", port))
+        if path is not None:
+            self._servers.append(await asyncio.start_unix_server(self._handle, path))
+
+    @property
+    def sockets(self)-> List[Tuple]:
+        return [sock.getsockname() for server in self._servers for sock in server.sockets]
+
+    async def serve_forever(self)-> None:
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def stop(self)-> None:
+        """
+        Stop accepting connections, process every queued trade and stop the batcher.
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._queue is not None:
+            await self.flush()
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._queue = None
+        self._processor.sync()
+
+    def _queue_depth(self)-> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, trade_details:Dict)-> None:
+        """
+        Queue one trade, waiting while the queue is full.
+        """
+        await self._queue.put((trade_details, time.perf_counter()))
+        self._stats["received"] += 1
+        depth = self._queue.qsize()
+        if depth > self._stats["max_queue_depth"]:
+            self._stats["max_queue_depth"] = depth
+
+    async def flush(self)-> None:
+        """
+        Wait until every trade queued so far has been processed.
+        """
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put(done)
+        await done
+
+    async def _run_batches(self)-> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            deadline = loop.time() + self._batch_timeout
+            batch = []
+            waiters = []
+            while True:
+                if isinstance(item, asyncio.Future):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self._batch_size:
+                    break
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+            try:
+                if batch:
+                    self._process(batch)
+            except Exception as e:
+                # a failing batch must not stop the batcher, or flush() and stop() would
+                # wait forever; its trades are counted as failed
+                self._stats["failed"] += len(batch)
+                print(f"Batch of {len(batch)} trades failed: {e!r}", file=sys.stderr)
+            finally:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+            # let connections answer queries between batches
+            await asyncio.sleep(0)
+
+    def _process(self, batch:List[Tuple[Dict, float]])-> None:
+        result = self._pipeline.run(self._processor, (trade_details for trade_details, _ in batch))
+        self._processor.sync()
+
+        now = time.perf_counter()
+        stats = self._stats
+        stats["batches"] += 1
+        stats["processed"] += len(batch)
+        stats["add_errors"] += len(result.add_errors)
+        stats["rejected"] += len(result.rejected)
+        metrics = self._processor.metrics
+        if metrics is not None:
+            metrics.observe_many("ingest_latency_seconds", now - np.fromiter(
+                (queued_at for _, queued_at in batch), dtype=np.float64, count=len(batch)))
+        for _, queued_at in batch:
+            latency = now - queued_at
+            stats["latency_total"] += latency
+            if latency > stats["latency_max"]:
+                stats["latency_max"] = latency
+
+    def stats(self)-> Dict[str, float]:
+        stats = dict(self._stats)
+        latency_total = stats.pop("latency_total")
+        stats["latency_max"] = stats["latency_max"] * 1000.0
+        stats["latency_avg"] = latency_total / stats["processed"] * 1000.0 if stats["processed"] else 0.0
+        stats["queue_depth"] = self._queue_depth()
+        stats["trades"] = len(self._processor.trades)
+        return stats
+
+    def _parse_csv(self, line:str)-> Dict[str, str]:
+        if self._columns is None:
+            return parse_line(line, self._delimiter)
+        values = line.split(self._delimiter)
+        if len(values) != len(self._columns):
+            raise ValueError(f"Expected {len(self._columns)} fields, got {len(values)}")
+        return dict(zip(self._columns, values))
+
+    async def _query(self, message:Dict)-> Dict:
+        processor = self._processor
+        query = message["query"]
+        if query == "risk":
+            return processor.current_risk_exposure()
+        if query == "risk_report":
+            return processor.calculate_risk_report()
+        if query == "position":
+            return processor.get_position(message["user_id"], message["symbol"], message.get("trade_type", "EQUITY"))
+        if query == "positions":
+            return {"positions": processor.ledger.positions_for_user(message["user_id"])}
+        if query == "trade":
+            trade = processor.get_trade(message["trade_id"])
+            if trade is None:
+                raise ValueError(f"Trade {message['trade_id']} does not exist.")
+            return {"trade_id": trade.trade_id, "trade_type": trade.trade_type, "status": trade.status}
+        if query == "stats":
+            return self.stats()
+        if query == "metrics":
+            if processor.metrics is None:
+                raise ValueError("Metrics are not enabled")
+            return processor.metrics.snapshot()
+        if query == "flush":
+            await self.flush()
+            return self.stats()
+        raise ValueError(f"Unknown query: {query}")
+
+    async def _handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter)-> None:
+        lines = 0
+        try:
+            while True:
+                # readline() and put() return without yielding while data is buffered,
+                # so hand the loop over regularly to keep other connections responsive
+                lines += 1
+                if lines % YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+                response = None
+                try:
+                    line = await _read_line(reader)
+                    if not line:
+                        break
+                    # a line that isn't UTF-8 raises UnicodeDecodeError, a ValueError
+                    line = line.decode("utf-8").strip()
+                    if not line:
+                        continue
+                    if line.startswith("{"):
+                        message = json.loads(line)
+                        if "query" in message:
+                            response = await self._query(message)
+                        else:
+                            await self.submit(message)
+                    else:
+                        await self.submit(self._parse_csv(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"error": str(e)}
+
+                if response is not None:
+                    writer.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host:str=None, port:int=None, path:str=None, **kwargs)-> None:
+    service = TradeService(**kwargs)
+    await service.start(host, port, path)
+    try:
+        await service.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the trade ingestion service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics over HTTP on this port")
+    args = parser.parse_args()
+    processor = None
+    if args.metrics_port is not None:
+        processor = TradeProcessor(metrics=Metrics())
+        processor.metrics.serve(args.metrics_port, args.host)
+    asyncio.run(serve(args.host, args.port, args.unix, processor=processor, queue_size=args.queue_size,
+                      batch_size=args.batch_size))
@@ -0,0 +1,282 @@
+"""
+run_benchmarks.py
+
+This module times the trade processing hot paths (reading a trade file, creating
+trades, processing them, risk exposure and net quantities) on synthetic files of
+several sizes and writes throughput, latency percentiles and peak memory to JSON.
+
+    python benchmarks/run_benchmarks.py --rows 10000 100000 --output results.json
+    python benchmarks/run_benchmarks.py --rows 10000 --compare results.json
+"""
+import argparse
+import contextlib
+import functools
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from read_data import iter_typed, load_trades, read_file  # noqa: E402
+from Trading.trade_factory import TradeFactory  # noqa: E402
+from Trading.trade_processor import TradeProcessor  # noqa: E402
+
+from trade_generator import DEFAULT_TRADE_DATE, TradeGenerator  # noqa: E402
+
+
+PERCENTILES = (50, 90, 99)
+# individual create_trade calls timed per size
+CREATE_SAMPLE = 100000
+# run settings that decide the generated trades; compare() needs them to match
+INPUT_SETTINGS = ("seed", "trade_date")
+BATCH_SIZE = 10000
+
+
+def _percentiles(seconds:List[float])-> Dict[str, float]:
+    values = np.asarray(seconds, dtype=np.float64) * 1000.0
+    latency = {f"p{percentile}": float(np.percentile(values, percentile)) for percentile in PERCENTILES}
+    latency["max"] = float(values.max())
+    return latency
+
+
+def _peak_memory(run:Callable[[], object])-> int:
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Benchmark:
+    """
+    attributes:
+        Name
+        Rows (trades handled by one run, used for throughput)
+        Setup (builds the input of a run, not timed)
+        Run (the timed call; returns the per-item latencies in seconds, or None when
+            only the whole run is timed)
+    """
+    def __init__(self, name:str, rows:int, setup:Callable[[], object], run:Callable[[object], List[float]])-> None:
+        self.name = name
+        self.rows = rows
+        self.setup = setup
+        self.run = run
+
+    def measure(self, repeat:int, memory:bool)-> Dict[str, object]:
+        durations = []
+        latencies = []
+        for _ in range(repeat):
+            state = self.setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                items = self.run(state)
+                durations.append(time.perf_counter() - start)
+            if items:
+                latencies.extend(items)
+
+        best = min(durations)
+        result = {
+            "benchmark": self.name,
+            "rows": self.rows,
+            "repeat": repeat,
+            "seconds": best,
+            "throughput": self.rows / best if best else None,
+            # per-item latencies when the benchmark records them, otherwise per run
+            "latency_ms": _percentiles(latencies or durations),
+            "latency_unit": "item" if latencies else "run",
+        }
+        if memory:
+            state = self.setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result["peak_memory_bytes"] = _peak_memory(lambda: self.run(state))
+        return result
+
+
+def _create_trades(trades:List[Dict])-> List[float]:
+    latencies = []
+    clock = time.perf_counter
+    for trade in trades:
+        start = clock()
+        TradeFactory.create_trade(**trade)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def _generate(trades:Iterator[Dict])-> None:
+    for _ in trades:
+        pass
+
+
+def _process_batches(trades:Iterator[Dict])-> List[float]:
+    processor = TradeProcessor()
+    latencies = []
+    while True:
+        # batches are pulled from the generator outside the timed section
+        batch = list(itertools.islice(trades, BATCH_SIZE))
+        if not batch:
+            break
+        began = time.perf_counter()
+        processor.process_trades(batch, mode="pipeline")
+        latencies.append((time.perf_counter() - began) / len(batch))
+    return latencies
+
+
+def _loaded_processor(trades:Iterator[Dict])-> TradeProcessor:
+    processor = TradeProcessor()
+    processor.process_trades(trades, mode="pipeline")
+    return processor
+
+
+def benchmarks(path:str, rows:int, trades:Callable[[], Iterator[Dict]])-> List[Benchmark]:
+    """
+    The benchmarks over the trade file at `path` and the same `rows` trades as dicts.
+    `trades` yields them anew on each call, so they are never all held in memory. The
+    process_trades runs consume them as they are generated (only the pipeline's per-trade
+    latencies leave generation out); TradeGenerator.trades times generation on its own.
+    """
+    loaded = {}
+
+    def processor()-> TradeProcessor:
+        if "processor" not in loaded:
+            with contextlib.redirect_stdout(io.StringIO()):
+                loaded["processor"] = _loaded_processor(trades())
+        return loaded["processor"]
+
+    return [
+        Benchmark("read_data.read_file", rows, lambda: path, lambda source: read_file(source) and None),
+        Benchmark("read_data.iter_typed", rows, lambda: path, lambda source: list(iter_typed(source)) and None),
+        Benchmark("read_data.load_trades", rows, lambda: TradeProcessor(),
+                  lambda target: load_trades(target, path) and None),
+        Benchmark("TradeGenerator.trades", rows, trades, _generate),
+        Benchmark("TradeFactory.create_trade", min(rows, CREATE_SAMPLE),
+                  lambda: list(itertools.islice(trades(), CREATE_SAMPLE)), _create_trades),
+        Benchmark("TradeProcessor.process_trades[four_pass]", rows, lambda: TradeProcessor(),
+                  lambda target: target.process_trades(trades())),
+        Benchmark("TradeProcessor.process_trades[pipeline]", rows, trades, _process_batches),
+        Benchmark("TradeProcessor.calculate_risk_exposure", rows, processor,
+                  lambda target: target.calculate_risk_exposure() and None),
+        Benchmark("TradeProcessor.calculate_net_quantity", rows, processor,
+                  lambda target: target.calculate_net_quantity() and None),
+    ]
+
+
+def _git_commit()-> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes:List[int], seed:int=0, repeat:int=3, memory:bool=True, workdir:str=None,
+        only:List[str]=None, trade_date:date=DEFAULT_TRADE_DATE)-> Dict[str, object]:
+    results = []
+    generator = TradeGenerator(seed, trade_date=trade_date)
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"trades_{size}.txt")
+            generator.write(path, size)
+            for benchmark in benchmarks(path, size, functools.partial(generator.trades, size)):
+                if only and not any(name in benchmark.name for name in only):
+                    continue
+                result = benchmark.measure(repeat, memory)
+                result["size"] = size
+                results.append(result)
+                print(f"{benchmark.name:<45} {size:>10} rows  {result['seconds']:9.4f} s  "
+                      f"{result['throughput'] or 0:14,.0f} rows/s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "trade_date": generator.trade_date.isoformat(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def check_inputs(meta:Dict[str, object], baseline:Dict[str, object])-> None:
+    """
+    Raise ValueError unless `meta` has the seed and trade date the baseline was run with.
+    """
+    recorded = baseline.get("meta", {})
+    for name in INPUT_SETTINGS:
+        if meta.get(name) != recorded.get(name):
+            raise ValueError(f"The baseline was generated with {name} {recorded.get(name)}, "
+                             f"this run with {meta.get(name)}; their trades differ")
+
+
+def compare(current:Dict[str, object], baseline:Dict[str, object])-> List[Dict[str, object]]:
+    """
+    Ratio of current to baseline time for every benchmark and size present in both
+    (above 1 means slower). Both runs must have generated the same trades.
+    """
+    check_inputs(current["meta"], baseline)
+    previous = {(result["benchmark"], result["size"]): result for result in baseline["results"]}
+    changes = []
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["size"]))
+        if before:
+            changes.append({
+                "benchmark": result["benchmark"],
+                "size": result["size"],
+                "baseline_seconds": before["seconds"],
+                "seconds": result["seconds"],
+                "ratio": result["seconds"] / before["seconds"] if before["seconds"] else None,
+            })
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the trade processing hot paths.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trade-date", type=date.fromisoformat, default=DEFAULT_TRADE_DATE,
+                        help=f"YYYY-MM-DD the trades are generated for (default {DEFAULT_TRADE_DATE})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory run")
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name contains one of these")
+    parser.add_argument("--workdir", help="directory for the generated trade files")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        # fail before spending the run on trades that can't be compared
+        try:
+            check_inputs({"seed": args.seed, "trade_date": args.trade_date.isoformat()}, baseline)
+        except ValueError as e:
+            parser.error(str(e))
+
+    report = run(args.rows, args.seed, args.repeat, not args.no_memory, args.workdir, args.only, args.trade_date)
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,203 @@
+"""
+trade_generator.py
+
+This module contains the TradeGenerator class, which produces deterministic synthetic
+equity, bond and derivative trades, either as trade dicts for TradeProcessor or as
+trade files, with Zipf-skewed user and symbol activity.
+"""
+import argparse
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+
+TRADE_TYPES = ["EQUITY", "BOND", "DERIVATIVE"]
+
+# field order of each trade type in generated files; the first fields of every layout
+# follow Trading/trade_data.txt and all of them match Trading.parsing.SCHEMAS
+LAYOUTS = {
+    "EQUITY": ["trade_id", "user_id", "trade_type", "symbol", "direction", "quantity", "price"],
+    "BOND": ["trade_id", "user_id", "trade_type", "isin", "direction", "face_value", "price", "coupon_rate",
+             "maturity_date", "issuer"],
+    "DERIVATIVE": ["trade_id", "user_id", "trade_type", "underlying_symbol", "option_type", "direction",
+                   "quantity", "strike_price", "premium", "expiration_date"],
+}
+
+MARKETS = ["NYSE", "NASDAQ", "LSE", "XETRA"]
+ISSUERS = ["US Treasury", "German Bund", "UK Gilt", "Apple Inc", "Microsoft Corp", "JPMorgan Chase", "Toyota Motor"]
+FACE_VALUES = np.array([1000, 5000, 10000, 100000])
+
+# fixed so that runs on different days generate the same trades and stay comparable;
+# move it forward (and record new benchmark baselines) once its earliest expiries pass
+DEFAULT_TRADE_DATE = date(2026, 10, 1)
+
+# rows generated per step; fixed so that output does not depend on how it is consumed
+CHUNK_SIZE = 100000
+
+
+def zipf_weights(count:int, skew:float)-> np.ndarray:
+    """
+    Probability of each of `count` items when item k is picked in proportion to
+    1 / k**skew (skew 0 is uniform).
+    """
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** skew
+    return weights / weights.sum()
+
+
+class TradeGenerator:
+    """
+    attributes:
+        Seed (the same seed, settings and trade date always produce the same trades)
+        Users and symbols (number of distinct users, equity symbols and bond ISINs)
+        User and symbol skew (Zipf exponents; a few users and symbols dominate)
+        Mix (share of EQUITY, BOND and DERIVATIVE trades)
+        Trade date (expiries and maturities are generated after it; risk is measured
+            against the current date, so keep it recent)
+    """
+    def __init__(self, seed:int=0, users:int=1000, symbols:int=500, bonds:int=200, user_skew:float=1.1,
+                 symbol_skew:float=1.2, mix:List[float]=(0.6, 0.25, 0.15), trade_date:date=DEFAULT_TRADE_DATE)-> None:
+        if min(users, symbols, bonds) <= 0:
+            raise ValueError("users, symbols and bonds must be positive")
+        if len(mix) != len(TRADE_TYPES) or min(mix) < 0 or sum(mix) <= 0:
+            raise ValueError("mix needs one non-negative share per trade type")
+        self.seed = seed
+        self.trade_date = trade_date
+        self._mix = np.asarray(mix, dtype=np.float64) / sum(mix)
+        self._user_weights = zipf_weights(users, user_skew)
+        self._symbol_weights = zipf_weights(symbols, symbol_skew)
+        self._bond_weights = zipf_weights(bonds, symbol_skew)
+
+        # static reference data: names, reference prices and bond terms
+        reference = np.random.default_rng([seed, 0])
+        self._users = np.array([f"U{index:06d}" for index in range(users)])
+        self._symbols = np.array([f"SYM{index:05d}" for index in range(symbols)])
+        self._markets = reference.choice(MARKETS, symbols)
+        self._reference_prices = np.round(np.exp(reference.normal(4.0, 1.0, symbols)), 2)
+        self._isins = np.array([f"US{index:09d}0" for index in range(bonds)])
+        self._issuers = reference.choice(ISSUERS, bonds)
+        self._coupons = reference.choice(np.arange(0.5, 8.01, 0.125), bonds)
+        maturity_days = reference.integers(365, 30 * 365, bonds)
+        self._maturities = np.array(
+            [(trade_date + timedelta(days=int(days))).isoformat() for days in maturity_days])
+        # monthly expiries over the next two years
+        self._expiries = np.array(
+            [(trade_date + timedelta(days=30 * month + 15)).isoformat() for month in range(1, 25)])
+
+    def _chunk(self, index:int, start:int, count:int)-> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Columns of `count` trades starting at trade number `start`, split by trade type.
+        """
+        rng = np.random.default_rng([self.seed, 1, index])
+        trade_types = rng.choice(len(TRADE_TYPES), count, p=self._mix)
+        trade_ids = np.array([f"T{number:010d}" for number in range(start, start + count)])
+        users = self._users[rng.choice(len(self._users), count, p=self._user_weights)]
+        directions = np.where(rng.random(count) < 0.55, "BUY", "SELL")
+
+        chunk = {}
+        for code, trade_type in enumerate(TRADE_TYPES):
+            rows = np.flatnonzero(trade_types == code)
+            size = len(rows)
+            columns = {
+                "row": rows,
+                "trade_id": trade_ids[rows],
+                "user_id": users[rows],
+                "trade_type": np.full(size, trade_type),
+                "direction": directions[rows],
+            }
+            if trade_type == "EQUITY":
+                symbols = rng.choice(len(self._symbols), size, p=self._symbol_weights)
+                columns["symbol"] = self._symbols[symbols]
+                columns["market"] = self._markets[symbols]
+                columns["quantity"] = np.maximum(rng.lognormal(3.5, 1.2, size).astype(np.int64), 1)
+                columns["price"] = np.round(self._reference_prices[symbols] * rng.lognormal(0.0, 0.02, size), 2)
+            elif trade_type == "BOND":
+                bonds = rng.choice(len(self._isins), size, p=self._bond_weights)
+                columns["isin"] = self._isins[bonds]
+                columns["face_value"] = rng.choice(FACE_VALUES, size)
+                columns["price"] = np.round(rng.normal(100.0, 4.0, size), 3)
+                columns["coupon_rate"] = self._coupons[bonds]
+                columns["maturity_date"] = self._maturities[bonds]
+                columns["issuer"] = self._issuers[bonds]
+            else:
+                symbols = rng.choice(len(self._symbols), size, p=self._symbol_weights)
+                reference_prices = self._reference_prices[symbols]
+                columns["underlying_symbol"] = self._symbols[symbols]
+                columns["option_type"] = np.where(rng.random(size) < 0.5, "CALL", "PUT")
+                columns["quantity"] = rng.integers(1, 50, size)
+                columns["strike_price"] = np.round(reference_prices * rng.choice([0.8, 0.9, 1.0, 1.1, 1.2], size), 2)
+                columns["premium"] = np.round(reference_prices * rng.uniform(0.01, 0.1, size), 2)
+                columns["expiration_date"] = self._expiries[rng.integers(0, len(self._expiries), size)]
+            chunk[trade_type] = columns
+        return chunk
+
+    def _chunks(self, count:int)-> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+        for index, start in enumerate(range(0, count, CHUNK_SIZE)):
+            yield self._chunk(index, start, min(CHUNK_SIZE, count - start))
+
+    def columns(self, count:int)-> Iterator[Dict[str, Dict[str, np.ndarray]]]:
+        """
+        Yield the trades chunk by chunk as trade_type -> field -> array, ready for
+        TradeProcessor.add_trades / TradeBook.extend.
+        """
+        for chunk in self._chunks(count):
+            for columns in chunk.values():
+                columns.pop("row")
+            yield chunk
+
+    def trades(self, count:int)-> Iterator[Dict[str, str]]:
+        """
+        Yield `count` trade dicts in trade number order, as read from a file (all values
+        are strings).
+        """
+        for chunk in self._chunks(count):
+            for line in self._lines(chunk):
+                yield line
+
+    @staticmethod
+    def _lines(chunk:Dict[str, Dict[str, np.ndarray]])-> Iterator[Dict[str, str]]:
+        ordered = []
+        for columns in chunk.values():
+            names = [name for name in columns if name != "row"]
+            values = zip(*(columns[name].astype(str).tolist() for name in names))
+            ordered.extend(zip(columns["row"].tolist(), (dict(zip(names, row)) for row in values)))
+        ordered.sort(key=lambda item: item[0])
+        return (trade for _, trade in ordered)
+
+    def write(self, path:str, count:int, delimiter:str=",")-> int:
+        """
+        Write `count` trades to `path`, one line per trade in the LAYOUTS field order,
+        and return the number of lines written.
+        """
+        with open(path, "w") as fh:
+            if count <= 0:
+                return 0
+            for chunk in self._chunks(count):
+                lines = []
+                for trade_type, columns in chunk.items():
+                    fields = [columns[name].astype(str) for name in LAYOUTS[trade_type]]
+                    text = fields[0]
+                    for field in fields[1:]:
+                        text = np.char.add(np.char.add(text, delimiter), field)
+                    lines.extend(zip(columns["row"].tolist(), text.tolist()))
+                lines.sort(key=lambda item: item[0])
+                fh.write("\n".join(line for _, line in lines))
+                fh.write("\n")
+        return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic trade file.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--user-skew", type=float, default=1.1)
+    parser.add_argument("--symbol-skew", type=float, default=1.2)
+    parser.add_argument("--trade-date", type=date.fromisoformat, default=DEFAULT_TRADE_DATE,
+                        help=f"YYYY-MM-DD the trades are generated for (default {DEFAULT_TRADE_DATE})")
+    args = parser.parse_args()
+    generator = TradeGenerator(args.seed, args.users, args.symbols, user_skew=args.user_skew,
+                               symbol_skew=args.symbol_skew, trade_date=args.trade_date)
+    generator.write(args.path, args.rows)
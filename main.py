@@ -1,11 +1,42 @@
-if __name__ == "__main__":
-    from read_data import read_file
+"""
+main.py
+
+Command line entry point: load a trade file, take the trades through validation,
+execution and settlement and print the risk exposure.
+
+    python main.py [trade file]
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_TRADE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Trading", "trade_data.txt")
+
+
+def main(argv=None)-> int:
+    parser = argparse.ArgumentParser(description="Process a trade file and print the risk exposure.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRADE_FILE)
+    args = parser.parse_args(argv)
+
+    # imported after the arguments are parsed so that --help stays instant
+    from read_data import load_trades
     from Trading.trade_processor import TradeProcessor
 
-    #  read the input file
-    trade_data = read_file()
-    
-    # add the trades to the processor
+    # parse the file straight into the book, reporting the lines that were skipped
     processor = TradeProcessor()
-    processor.process_trades(trade_data)
-    
\ No newline at end of file
+    errors = load_trades(processor, args.path)
+    for error in errors:
+        print(f"{args.path}:{error.line_number}: {error.message}", file=sys.stderr)
+
+    # validate the loaded trades up front so that rejected ones are reported, not only cancelled
+    report = processor.validate_batch()
+    for trade_id, messages in report.invalid_trades().items():
+        print(f"{args.path}: trade {trade_id} rejected: {'; '.join(messages)}", file=sys.stderr)
+
+    # execute and settle the validated trades and print the risk exposure
+    processor.process_trades([])
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
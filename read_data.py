@@ -1,15 +1,250 @@
+"""
+read_data.py
+
+This module contains the helpers used to read trade files, either into trade dicts
+or, with the per trade type schemas, into typed column batches ready for
+TradeProcessor.add_trades.
+"""
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Sequence, TextIO, Tuple, Union
+
+import numpy as np
+
+from Trading.parsing import SCHEMAS, Field, Schema, layout_error, parse_line  # noqa: F401
+
+
+Source = Union[str, TextIO]
+
+
+_DTYPES = {"float": np.float64, "int": np.int64, "date": "datetime64[D]"}
+
+CHUNK_SIZE = 100000
+
+
+class TypedBatch(NamedTuple):
+    trade_type: str
+    # field name -> array (strings as object arrays), trade_id and user_id included,
+    # only the fields the lines had
+    columns: Dict[str, np.ndarray]
+    # line number in the source of every row
+    line_numbers: np.ndarray
+
+
+class ParseError(NamedTuple):
+    line_number: int
+    message: str
+
+
+class ParsedChunk(NamedTuple):
+    batches: List[TypedBatch]
+    errors: List[ParseError]
+
+
 def get_columns():
     # <user_id>,<trade_id>,<trade_type>,<symbol>,<direction>,<quantity>,<price>
     return ["user_id", "trade_id", "trade_type", "symbol", "direction", "quantity", "price"]
 
-def read_file():
-    with open("trade_data.txt", "r") as fh:
-        
-        columns = get_columns()
-        trade_data = []
-        
-        # read the file line by line and append to the trade_data list
-        for line in fh.readlines():
-            trade_data.append(dict(zip(columns, line.strip().split(","))))
-
-    return trade_data
+
+def _iter_lines(fh:TextIO, columns:Sequence[str], delimiter:str)-> Iterator[Dict[str, str]]:
+    for number, line in enumerate(fh, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if columns is None:
+            try:
+                yield parse_line(line, delimiter)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}") from None
+        else:
+            yield dict(zip(columns, line.split(delimiter)))
+
+
+def iter_trades(source:Source="trade_data.txt", columns:Sequence[str]=None, delimiter:str=",")-> Iterator[Dict[str, str]]:
+    """
+    Yield one trade dict per line of `source` without reading the whole file.
+
+    `source` can be a path or an already open file object. Each line's fields are
+    named with the SCHEMAS layout of its trade type (trade_id, user_id, trade_type,
+    ...); a line that doesn't fit raises ValueError with its line number, use
+    iter_typed or load_trades to skip and report such lines instead. `columns`
+    overrides the schemas with one fixed layout for every line, e.g. get_columns().
+    """
+    columns = list(columns) if columns else None
+
+    if hasattr(source, "read"):
+        yield from _iter_lines(source, columns, delimiter)
+    else:
+        with open(source, "r") as fh:
+            yield from _iter_lines(fh, columns, delimiter)
+
+
+def iter_batches(source:Source="trade_data.txt", batch_size:int=10000, columns:Sequence[str]=None,
+                 delimiter:str=",")-> Iterator[List[Dict[str, str]]]:
+    """
+    Yield lists of at most `batch_size` trade dicts read lazily from `source`.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer")
+
+    rows = iter_trades(source, columns, delimiter)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_file(source:Source="trade_data.txt", columns:Sequence[str]=None)-> List[Dict[str, str]]:
+    return list(iter_trades(source, columns))
+
+
+def _convert(values:np.ndarray, field:Field)-> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert one column of field strings and return it with the mask of the values
+    that are malformed.
+    """
+    # strings stay object arrays, which is what TradeBook interns them from
+    if field.kind == "str":
+        return values, values == ""
+    if field.kind == "choice":
+        bad = ~np.logical_or.reduce([values == choice for choice in field.choices])
+        if bad.any():
+            values = np.char.upper(values.astype(str)).astype(object)
+            bad = ~np.logical_or.reduce([values == choice for choice in field.choices])
+        return values, bad
+
+    dtype = _DTYPES[field.kind]
+    try:
+        column = values.astype(dtype)
+        bad = np.zeros(len(column), dtype=bool)
+    except ValueError:
+        # at least one bad value: convert one by one to find out which
+        column = np.zeros(len(values), dtype=dtype)
+        bad = np.zeros(len(values), dtype=bool)
+        for index, value in enumerate(values.tolist()):
+            try:
+                column[index] = np.array(value, dtype=dtype)
+            except ValueError:
+                bad[index] = True
+    if field.kind == "date":
+        bad |= np.isnat(column)
+    elif field.kind == "float":
+        bad |= ~np.isfinite(column)
+    return column, bad
+
+
+def _parse_group(trade_type:str, line_numbers:np.ndarray, fields:List[np.ndarray],
+                 errors:List[ParseError])-> TypedBatch:
+    message = layout_error(trade_type, len(fields))
+    if message:
+        errors.extend(ParseError(number, message) for number in line_numbers.tolist())
+        return None
+    schema = SCHEMAS[trade_type]
+
+    columns = {}
+    bad_rows = {}
+    for field, values in zip(schema.fields, fields):
+        if field.name == "trade_type":
+            continue
+        column, bad = _convert(values, field)
+        columns[field.name] = column
+        for index in np.flatnonzero(bad).tolist():
+            bad_rows.setdefault(index, f"Invalid {field.name}: {values[index]!r}")
+
+    if not bad_rows:
+        return TypedBatch(trade_type, columns, line_numbers)
+    errors.extend(ParseError(int(line_numbers[index]), message) for index, message in bad_rows.items())
+    valid = np.ones(len(line_numbers), dtype=bool)
+    valid[list(bad_rows)] = False
+    return TypedBatch(trade_type, {name: column[valid] for name, column in columns.items()}, line_numbers[valid])
+
+
+def _parse_chunk(lines:List[str], first_line:int, delimiter:str)-> ParsedChunk:
+    # split the whole chunk with one join + split, then pick the columns of each
+    # (trade type, field count) group out of the flat field array by offset
+    lines = [line.strip() for line in lines]
+    counts = np.array([line.count(delimiter) for line in lines], dtype=np.int64) + 1
+    starts = np.zeros(len(lines), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    fields = np.array(delimiter.join(lines).split(delimiter), dtype=object)
+    numbers = np.arange(first_line, first_line + len(lines), dtype=np.int64)
+
+    errors = []
+    blank = (counts == 1) & (fields[starts] == "")
+    for row in np.flatnonzero((counts < 3) & ~blank).tolist():
+        errors.append(ParseError(int(numbers[row]), f"Expected at least 3 fields, got {counts[row]}"))
+
+    batches = []
+    for count in np.unique(counts[counts >= 3]).tolist():
+        rows = np.flatnonzero(counts == count)
+        trade_types = fields[starts[rows] + 2]
+        for trade_type in sorted(set(trade_types.tolist())):
+            group = rows[trade_types == trade_type]
+            offsets = starts[group]
+            columns = [fields[offsets + index] for index in range(count)]
+            batch = _parse_group(trade_type, numbers[group], columns, errors)
+            if batch is not None and len(batch.line_numbers):
+                batches.append(batch)
+    errors.sort()
+    return ParsedChunk(batches, errors)
+
+
+def _iter_chunks(fh:TextIO, chunk_size:int, delimiter:str)-> Iterator[ParsedChunk]:
+    first_line = 1
+    while True:
+        lines = list(islice(fh, chunk_size))
+        if not lines:
+            return
+        yield _parse_chunk(lines, first_line, delimiter)
+        first_line += len(lines)
+
+
+def iter_typed(source:Source="trade_data.txt", chunk_size:int=CHUNK_SIZE, delimiter:str=",")-> Iterator[ParsedChunk]:
+    """
+    Parse `source` with SCHEMAS, `chunk_size` lines at a time.
+
+    Each chunk holds one TypedBatch per trade type and field count, with every column
+    converted in bulk, and the malformed lines (wrong field count, unknown trade type,
+    values that do not convert) as ParseErrors with their line numbers. Malformed lines
+    are skipped; the rest of the file is still loaded.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer")
+
+    if hasattr(source, "read"):
+        yield from _iter_chunks(source, chunk_size, delimiter)
+    else:
+        with open(source, "r") as fh:
+            yield from _iter_chunks(fh, chunk_size, delimiter)
+
+
+def load_trades(processor, source:Source="trade_data.txt", chunk_size:int=CHUNK_SIZE,
+                delimiter:str=",")-> List[ParseError]:
+    """
+    Parse `source` straight into the processor's book with TradeProcessor.add_trades
+    and return the lines that were not loaded: malformed lines, and trade ids that
+    repeat within the file or are already in the book.
+
+    Within each chunk the trades are booked one batch per trade type and field count,
+    so book rows follow the file order per trade type rather than across the file.
+    """
+    errors = []
+    for chunk in iter_typed(source, chunk_size, delimiter):
+        errors.extend(chunk.errors)
+        for batch in chunk.batches:
+            columns = dict(batch.columns)
+            trade_ids = columns.pop("trade_id").tolist()
+            seen = set()
+            keep = np.ones(len(trade_ids), dtype=bool)
+            for index, trade_id in enumerate(trade_ids):
+                if trade_id in seen or processor.get_trade(trade_id) is not None:
+                    keep[index] = False
+                    errors.append(ParseError(int(batch.line_numbers[index]), f"Trade {trade_id} already exists."))
+                seen.add(trade_id)
+            if not keep.all():
+                columns = {name: column[keep] for name, column in columns.items()}
+                trade_ids = [trade_id for trade_id, kept in zip(trade_ids, keep) if kept]
+            if trade_ids:
+                processor.add_trades(batch.trade_type, columns, trade_ids)
+    errors.sort()
+    return errors
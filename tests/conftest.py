@@ -0,0 +1,69 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from Trading.trade_book import TradeBook  # noqa: E402
+
+TIMESTAMP = datetime(2026, 1, 2, 9, 30)
+
+
+def book_trades(processor, prefix:str="T")-> None:
+    """
+    Book a few trades of every type through add_trades and move some of them along
+    the lifecycle, so that the book has adds, single and bulk status changes.
+    """
+    processor.add_trades("EQUITY", {
+        "user_id": ["alice", "bob", "alice"],
+        "symbol": ["AAPL", "MSFT", "AAPL"],
+        "direction": ["BUY", "SELL", "BUY"],
+        "quantity": [10.0, 5.0, 2.5],
+        "price": [150.0, 300.0, 155.0],
+        "market": ["NASDAQ", "NASDAQ", None],
+    }, trade_ids=[f"{prefix}-E1", f"{prefix}-E2", f"{prefix}-E3"], timestamp=TIMESTAMP)
+    processor.add_trades("BOND", {
+        "user_id": ["bob"],
+        "isin": ["US912828"],
+        "direction": ["BUY"],
+        "face_value": [1000],
+        "price": [99.5],
+        "coupon_rate": [4.25],
+        "maturity_date": ["2035-05-15"],
+        "issuer": ["US Treasury"],
+    }, trade_ids=[f"{prefix}-B1"], timestamp=TIMESTAMP)
+    processor.add_trades("DERIVATIVE", {
+        "user_id": ["alice", "carol"],
+        "underlying_symbol": ["AAPL", "TSLA"],
+        "option_type": ["call", "put"],
+        "direction": ["BUY", "SELL"],
+        "quantity": [3, 7],
+        "strike_price": [160.0, 200.0],
+        "premium": [4.5, 12.0],
+        "expiration_date": ["2030-06-20", "2030-12-18"],
+    }, trade_ids=[f"{prefix}-D1", f"{prefix}-D2"], timestamp=TIMESTAMP)
+
+    book = processor.trades
+    rows = np.array([book.row_of(f"{prefix}-{name}") for name in ("E1", "E2", "B1", "D1")])
+    book.transition_many(rows, "VALIDATED")
+    book.transition_many(rows[:3], "EXECUTED")
+    book.set_status(book.row_of(f"{prefix}-D2"), "CANCELLED")
+
+
+def assert_same_book(actual:TradeBook, expected:TradeBook)-> None:
+    assert len(actual) == len(expected)
+    assert list(actual.trade_ids) == list(expected.trade_ids)
+    for name, column in expected.columns().items():
+        assert actual.column(name).tobytes() == column.tobytes(), name
+    for interner in ("users", "symbols", "venues"):
+        assert list(getattr(actual, interner).values) == list(getattr(expected, interner).values)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "book.snapshot"), str(tmp_path / "book.wal")
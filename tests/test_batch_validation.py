@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import numpy as np
+
+from Trading.batch_validation import validate_batch
+from Trading.trade_book import TradeBook
+from Trading.trade_factory import TradeFactory
+
+from conftest import TIMESTAMP
+
+TRADES = [
+    ("EQUITY", {"symbol": "AAPL", "quantity": 10.0, "price": 150.0}),
+    ("EQUITY", {"symbol": "AAPL", "quantity": -1.0, "price": -2.0}),
+    ("BOND", {"isin": "US912828", "face_value": 1000, "price": 99.5, "coupon_rate": 4.25,
+              "maturity_date": "2035-05-15"}),
+    ("BOND", {"isin": "US912828", "face_value": 0, "price": 99.5, "coupon_rate": 15.0,
+              "maturity_date": "2020-05-15"}),
+    ("DERIVATIVE", {"underlying_symbol": "AAPL", "option_type": "CALL", "strike_price": 160.0, "premium": 4.5,
+                    "expiration_date": "2035-06-20"}),
+    ("DERIVATIVE", {"underlying_symbol": "AAPL", "option_type": "PUT", "strike_price": 0.0, "premium": -1.0,
+                    "expiration_date": "2020-06-20"}),
+    ("DERIVATIVE", {"underlying_symbol": "AAPL", "option_type": "PUT", "strike_price": 160.0}),
+]
+
+
+def booked():
+    book = TradeBook()
+    trades = []
+    for index, (trade_type, fields) in enumerate(TRADES):
+        trade = TradeFactory.create_trade(trade_type, trade_id=f"T{index}", timestamp=TIMESTAMP, **fields)
+        book.append(trade)
+        trades.append(trade)
+    return book, trades
+
+
+def test_batch_errors_match_validate_trade():
+    book, trades = booked()
+
+    report = validate_batch(book, apply=False)
+
+    for index, trade in enumerate(trades):
+        errors = trade.validate_trade()
+        assert report.errors(index) == ([] if errors is True else errors), trade.trade_id
+    assert report.valid.tolist() == [True, False, True, False, True, False, False]
+
+
+def test_statuses_are_applied_in_bulk():
+    book, _ = booked()
+
+    report = validate_batch(book)
+
+    assert [book.view(row).status for row in range(len(book))] == \
+        ["VALIDATED", "CANCELLED", "VALIDATED", "CANCELLED", "VALIDATED", "CANCELLED", "CANCELLED"]
+    assert report.rejections_by_rule()["derivative_expiration_date_missing"] == 1
+    assert report.as_dicts()[1]["errors"] == ["Quantity must be positive", "Price must be positive"]
+    # only NEW trades are picked up by default
+    assert len(validate_batch(book)) == 0
+
+
+def test_rows_are_validated_against_one_now():
+    book, _ = booked()
+
+    report = validate_batch(book, np.array([2, 4]), now=datetime(2035, 6, 1), apply=False)
+
+    assert report.invalid_trades() == {"T2": ["Maturity date must be in the future"]}
@@ -0,0 +1,70 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from Trading.bond_analytics import BondAnalytics, add_months
+from Trading.trade_factory import TradeFactory
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+MATURITY = np.array(["2031-05-15"], dtype="datetime64[D]")
+
+
+def test_par_bond_on_a_coupon_date():
+    # 5% semi-annual five-year bond at par: the yield is the coupon
+    result = BondAnalytics().analytics([5.0], MATURITY, [100.0], [1000.0], datetime(2026, 5, 15))
+
+    assert result["yield"] == pytest.approx([0.05], abs=1e-12)
+    assert result["accrued_interest"].tolist() == [0.0]
+    # Macaulay duration of a par bond: (1 + y/2) / y * (1 - (1 + y/2)^-n)
+    macaulay = 1.025 / 0.05 * (1 - 1.025 ** -10)
+    assert result["macaulay_duration"] == pytest.approx([macaulay])
+    assert result["modified_duration"] == pytest.approx([macaulay / 1.025])
+    assert result["modified_duration"] == pytest.approx([4.3760], abs=1e-4)
+
+
+def test_dv01_and_convexity_match_bumped_prices():
+    analytics = BondAnalytics()
+    settlement = datetime(2026, 8, 15)
+    schedule = analytics.schedule([4.0], MATURITY, settlement)
+    result = analytics.analytics([4.0], MATURITY, [97.0], [1000.0], settlement)
+
+    bump = 1e-4
+    yields = result["yield"]
+    dirty = analytics.dirty_prices(schedule, yields)
+    up = analytics.dirty_prices(schedule, yields + bump)
+    down = analytics.dirty_prices(schedule, yields - bump)
+    assert analytics.clean_prices(schedule, yields) == pytest.approx([97.0])
+    assert result["dv01"] == pytest.approx((down - up) / 2 * 1000.0 / 100.0, rel=1e-6)
+    assert result["convexity"] == pytest.approx((up + down - 2 * dirty) / (dirty * bump ** 2), rel=1e-4)
+
+
+def test_accrued_interest_between_coupons():
+    # half of the May-November period has run at 2026-08-15
+    result = BondAnalytics().analytics([5.0], MATURITY, [100.0], [1000.0], date(2026, 8, 15))
+
+    assert result["accrued_interest"] == pytest.approx([12.5])
+    assert add_months(date(2026, 8, 31), 6) == date(2027, 2, 28)
+    with pytest.raises(ValueError):
+        BondAnalytics(frequency=3)
+
+
+def test_matured_bonds_have_no_yield():
+    result = BondAnalytics().analytics([5.0, 5.0], np.array(["2020-01-01", "2031-05-15"], dtype="datetime64[D]"),
+                                       [100.0, 0.0], [1000.0, 1000.0], datetime(2026, 5, 15))
+
+    assert np.isnan(result["yield"]).all()
+
+
+def test_trade_analytics_match_the_book():
+    processor = TradeProcessor()
+    book_trades(processor)
+    trade = TradeFactory.create_trade("BOND", isin="US912828", face_value=1000, price=99.5, coupon_rate=4.25,
+                                      maturity_date="2035-05-15")
+
+    by_trade = processor.calculate_bond_analytics()
+
+    assert list(by_trade) == ["T-B1"]
+    assert by_trade["T-B1"] == pytest.approx(trade.analytics(), rel=1e-9)
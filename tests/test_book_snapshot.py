@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from Trading.book_snapshot import load_snapshot, save_snapshot
+from Trading.trade_book import TradeBook
+from Trading.trade_processor import TradeProcessor
+
+from conftest import assert_same_book, book_trades
+
+
+def test_round_trip_restores_book(paths):
+    snapshot, _ = paths
+    processor = TradeProcessor()
+    book_trades(processor)
+    save_snapshot(snapshot, processor.trades, metadata={"event_sequence": 42})
+
+    loaded = load_snapshot(snapshot)
+
+    assert_same_book(loaded.book, processor.trades)
+    assert loaded.metadata == {"event_sequence": 42}
+    assert loaded.book["T-B1"].isin == "US912828"
+    assert loaded.book["T-D2"].status == "CANCELLED"
+
+
+def test_round_trip_restores_derived_state(paths):
+    snapshot, _ = paths
+    processor = TradeProcessor()
+    book_trades(processor)
+    processor.save_snapshot(snapshot)
+
+    restored = TradeProcessor(snapshot=snapshot)
+
+    assert restored.risk_aggregates.exposure() == processor.risk_aggregates.exposure()
+    assert restored.calculate_net_quantity() == processor.calculate_net_quantity()
+    assert [trade.trade_id for trade in restored.trades_for_user("alice")] == ["T-E1", "T-E3", "T-D1"]
+    assert restored.index.count_with_status("EXECUTED") == 3
+
+
+def test_loaded_book_grows_without_changing_the_file(paths):
+    snapshot, _ = paths
+    processor = TradeProcessor()
+    book_trades(processor)
+    processor.save_snapshot(snapshot)
+    with open(snapshot, "rb") as fh:
+        saved = fh.read()
+
+    restored = TradeProcessor(snapshot=snapshot)
+    restored.trades.set_status(restored.trades.row_of("T-E3"), "CANCELLED")
+    book_trades(restored, prefix="U")
+
+    assert len(restored.trades) == 2 * len(processor.trades)
+    assert restored.trades["U-E1"].symbol == "AAPL"
+    with open(snapshot, "rb") as fh:
+        assert fh.read() == saved
+    assert load_snapshot(snapshot).book["T-E3"].status == "NEW"
+
+
+def test_empty_book_round_trip(paths):
+    snapshot, _ = paths
+    save_snapshot(snapshot, TradeBook())
+
+    loaded = load_snapshot(snapshot)
+
+    assert len(loaded.book) == 0
+    assert loaded.states == {}
+    loaded.book.extend("EQUITY", {"symbol": ["AAPL"], "quantity": [1.0], "price": [2.0]}, trade_ids=["E"])
+    assert np.array_equal(loaded.book.column("quantity"), [1.0])
+
+
+def test_rejects_other_files(paths):
+    snapshot, _ = paths
+    with open(snapshot, "wb") as fh:
+        fh.write(b"not a snapshot")
+
+    with pytest.raises(ValueError):
+        load_snapshot(snapshot)
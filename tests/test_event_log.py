@@ -0,0 +1,131 @@
+import os
+import time
+
+from Trading.event_log import FRAME, EventLog, read_events, replay
+from Trading.trade_book import TradeBook
+from Trading.trade_processor import TradeProcessor
+
+from conftest import assert_same_book, book_trades
+
+
+def logged_processor(wal:str)-> TradeProcessor:
+    processor = TradeProcessor(event_log=wal)
+    book_trades(processor)
+    processor.sync()
+    return processor
+
+
+def test_replay_rebuilds_book(paths):
+    _, wal = paths
+    processor = logged_processor(wal)
+
+    book = TradeBook()
+    last = replay(wal, book)
+
+    assert last == processor.event_log.sequence
+    assert_same_book(book, processor.trades)
+    processor.event_log.close()
+
+
+def test_truncated_final_frame_is_dropped(paths):
+    _, wal = paths
+    processor = logged_processor(wal)
+    processor.event_log.close()
+    events = list(read_events(wal))
+    # a crash in the middle of writing the last frame
+    with open(wal, "r+b") as fh:
+        fh.truncate(os.path.getsize(wal) - 3)
+
+    book = TradeBook()
+    assert replay(wal, book) == events[-2][0]
+
+    log = EventLog(wal)
+    assert log.sequence == events[-2][0]
+    assert os.path.getsize(wal) == events[-2][3]
+    log.attach(book)
+    book.extend("EQUITY", {"symbol": ["IBM"], "quantity": [1.0], "price": [120.0]}, trade_ids=["after-crash"])
+    log.close()
+
+    sequences = [sequence for sequence, _, _, _ in read_events(wal)]
+    assert sequences == [event[0] for event in events[:-1]] + [events[-2][0] + 1]
+    restored = TradeBook()
+    replay(wal, restored)
+    assert restored["after-crash"].symbol == "IBM"
+
+
+def test_crc_mismatch_stops_replay(paths):
+    _, wal = paths
+    processor = logged_processor(wal)
+    processor.event_log.close()
+    events = list(read_events(wal))
+    # flip a payload byte of the second event
+    with open(wal, "r+b") as fh:
+        fh.seek(events[0][3] + FRAME.size)
+        byte = fh.read(1)
+        fh.seek(-1, os.SEEK_CUR)
+        fh.write(bytes([byte[0] ^ 0xFF]))
+
+    assert [sequence for sequence, _, _, _ in read_events(wal)] == [events[0][0]]
+    book = TradeBook()
+    assert replay(wal, book) == events[0][0]
+    assert list(book.trade_ids) == ["T-E1"]
+
+
+def test_replay_after_checkpoint(paths):
+    snapshot, wal = paths
+    processor = logged_processor(wal)
+    processor.checkpoint(snapshot)
+    book_trades(processor, prefix="U")
+    processor.sync()
+
+    # restart without closing, as after a crash
+    restored = TradeProcessor(snapshot=snapshot, event_log=wal)
+
+    assert_same_book(restored.trades, processor.trades)
+    assert restored.risk_aggregates.exposure() == processor.risk_aggregates.exposure()
+    assert restored.event_log.sequence == processor.event_log.sequence
+    restored.event_log.close()
+    processor.event_log.close()
+
+
+def test_replay_skips_events_covered_by_snapshot(paths):
+    snapshot, wal = paths
+    processor = logged_processor(wal)
+    processor.save_snapshot(snapshot)
+    book_trades(processor, prefix="U")
+    processor.sync()
+
+    restored = TradeProcessor(snapshot=snapshot, event_log=wal)
+
+    assert_same_book(restored.trades, processor.trades)
+    restored.event_log.close()
+    processor.event_log.close()
+
+
+def test_non_string_values_are_logged(paths):
+    _, wal = paths
+    processor = TradeProcessor(event_log=wal)
+    processor.add_trade({"trade_type": "EQUITY", "trade_id": "N1", "user_id": 123, "symbol": "AAPL",
+                         "quantity": "1", "price": "2", "direction": "BUY"})
+    processor.event_log.close()
+
+    book = TradeBook()
+    replay(wal, book)
+    assert book["N1"].user_id == "123"
+
+
+def test_idle_group_is_committed(paths):
+    _, wal = paths
+    log = EventLog(wal, group_size=1000, commit_interval=0.01, fsync=False)
+    book = TradeBook()
+    log.attach(book)
+    book.extend("EQUITY", {"symbol": ["AAPL"], "quantity": [1.0], "price": [2.0]}, trade_ids=["E"])
+    assert log.pending == 1
+
+    deadline = time.monotonic() + 2.0
+    while log.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert log.pending == 0
+    assert len(list(read_events(wal))) == 1
+    log.close()
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from Trading.option_pricing import OptionModel, black_scholes, norm_cdf, year_fractions
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+
+def test_textbook_values():
+    # S = K = 100, one year, r = 5%, sigma = 20%
+    greeks = black_scholes([100.0, 100.0], 100.0, 1.0, 0.2, 0.05, [True, False])
+
+    assert greeks["price"] == pytest.approx([10.4506, 5.5735], abs=1e-4)
+    assert greeks["delta"] == pytest.approx([0.6368, -0.3632], abs=1e-4)
+    assert greeks["gamma"] == pytest.approx([0.018762, 0.018762], abs=1e-6)
+    assert greeks["vega"] == pytest.approx([37.524, 37.524], abs=1e-3)
+    assert greeks["theta"] == pytest.approx([-6.414, -1.658], abs=1e-3)
+
+
+def test_hull_example():
+    # Hull, Options, Futures and Other Derivatives: S = 42, K = 40, r = 10%, sigma = 20%, six months
+    greeks = black_scholes(42.0, 40.0, 0.5, 0.2, 0.1, [True, False])
+
+    assert greeks["price"] == pytest.approx([4.76, 0.81], abs=5e-3)
+
+
+def test_put_call_parity_and_finite_differences():
+    spot = np.linspace(60.0, 140.0, 9)
+    args = (100.0, 0.75, 0.3, 0.02)
+    calls = black_scholes(spot, *args, True)
+    puts = black_scholes(spot, *args, False)
+
+    assert calls["price"] - puts["price"] == pytest.approx(spot - 100.0 * np.exp(-0.02 * 0.75))
+    bump = 1e-3
+    up = black_scholes(spot + bump, *args, True)["price"]
+    down = black_scholes(spot - bump, *args, True)["price"]
+    assert calls["delta"] == pytest.approx((up - down) / (2 * bump), abs=1e-5)
+    assert norm_cdf(np.array([-1.96, 0.0, 1.96])) == pytest.approx([0.0249979, 0.5, 0.9750021], abs=1e-7)
+
+
+def test_expired_options_are_worth_their_intrinsic_value():
+    greeks = black_scholes([110.0, 90.0, 90.0], 100.0, 0.0, 0.2, 0.0, [True, True, False])
+
+    assert greeks["price"].tolist() == [10.0, 0.0, 10.0]
+    assert greeks["delta"].tolist() == [1.0, 0.0, -1.0]
+    assert not greeks["gamma"].any()
+    assert year_fractions(np.array(["2025-01-01", "2027-01-02"], dtype="datetime64[D]"),
+                          datetime(2026, 1, 2)).tolist() == [0.0, 1.0]
+
+
+def test_book_greeks_skip_cancelled_and_expired_trades():
+    processor = TradeProcessor(option_model=OptionModel({"AAPL": 0.3}, rate=0.01))
+    book_trades(processor)
+    processor.add_trades("DERIVATIVE", {"underlying_symbol": ["AAPL"], "option_type": ["call"],
+                                        "strike_price": [100.0], "expiration_date": ["2020-01-17"]},
+                         trade_ids=["T-D3"])
+
+    greeks = processor.calculate_option_greeks()
+
+    # D2 is cancelled and D3 has expired
+    assert list(greeks) == ["T-D1"]
+    trade = processor.get_trade("T-D1")
+    expected = trade.greeks(volatility=0.3, rate=0.01)
+    assert greeks["T-D1"] == pytest.approx(expected, rel=1e-6)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from Portfolio.equity_portfolio import EquityPortfolio
+from Portfolio.fixed_income_portfolio import FixedIncomePortfolio
+from Portfolio.instrument_universe import InstrumentUniverse
+from Portfolio.mixed_portfolio import MixedPortfolio
+from Portfolio.valuation import revalue_portfolios
+from Trading.price_cache import PriceCache, StaticPriceLoader
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+
+def mixed_portfolio(universe:InstrumentUniverse)-> MixedPortfolio:
+    portfolio = MixedPortfolio("P1", "alice", universe=universe)
+    portfolio.add_position("AAPL", 10, 150.0)
+    portfolio.add_position("AAPL", 2, 4.5, "DERIVATIVE")
+    portfolio.add_position("US912828", 1000, 99.0, "BOND")
+    return portfolio
+
+
+def test_positions_are_kept_apart_by_asset_class():
+    portfolio = mixed_portfolio(InstrumentUniverse())
+    portfolio.add_position("AAPL", 10, 160.0)
+    portfolio.remove_position("AAPL", 1, "DERIVATIVE")
+
+    assert portfolio.position("AAPL") == {"quantity": 20.0, "average_cost": 155.0}
+    assert portfolio.position("AAPL", "DERIVATIVE") == {"quantity": 1.0, "average_cost": 4.5}
+    assert portfolio.asset_classes == ["EQUITY", "DERIVATIVE", "BOND"]
+    with pytest.raises(ValueError):
+        EquityPortfolio("P2", universe=portfolio.universe).add_position("AAPL", 1, 1.0, "BOND")
+
+
+def test_derivatives_are_not_valued_at_the_underlying_price():
+    portfolio = mixed_portfolio(InstrumentUniverse())
+
+    # one set of prices values equities and bonds; the option stays at its premium
+    assert portfolio.revalue({"AAPL": 160.0, "US912828": 101.0}) == 10 * 160.0 + 2 * 4.5 + 1000 * 1.01
+    assert portfolio.revalue({"EQUITY": {"AAPL": 160.0}, "DERIVATIVE": {"AAPL": 6.0}}) == \
+        10 * 160.0 + 2 * 6.0 + 1000 * 0.99
+
+
+def test_price_vector_older_than_the_positions():
+    universe = InstrumentUniverse()
+    portfolio = mixed_portfolio(universe)
+    prices = universe.price_vector({"AAPL": 160.0})
+    portfolio.add_position("MSFT", 1, 300.0)
+
+    assert portfolio.revalue(prices) == 10 * 160.0 + 2 * 4.5 + 1000 * 0.99 + 300.0
+    assert revalue_portfolios([portfolio], prices, universe=universe).tolist() == [portfolio.value]
+
+
+def test_batch_valuation_matches_single_portfolios():
+    universe = InstrumentUniverse()
+    portfolios = [mixed_portfolio(universe), EquityPortfolio("P2", "bob", universe=universe),
+                  FixedIncomePortfolio("P3", "carol", universe=universe)]
+    portfolios[1].add_position("MSFT", 5, 290.0)
+    portfolios[2].add_position("US912828", 5000, 98.0)
+    loader = StaticPriceLoader({"AAPL": 170.0, "MSFT": 310.0, "US912828": 100.5})
+    prices = {"EQUITY": PriceCache(loader), "BOND": PriceCache(loader), "DERIVATIVE": {"AAPL": 7.0}}
+
+    values = revalue_portfolios(portfolios, prices, universe=universe)
+
+    assert values.tolist() == [portfolio.value for portfolio in portfolios]
+    assert values.tolist() == [portfolio.revalue(prices) for portfolio in portfolios]
+    assert values[0] == 10 * 170.0 + 2 * 7.0 + 1000 * 1.005
+
+
+def test_returns_roll_over_days_and_months():
+    portfolio = mixed_portfolio(InstrumentUniverse())
+    portfolio.revalue({"AAPL": 150.0, "US912828": 99.0}, datetime(2026, 1, 30))
+    portfolio.revalue({"AAPL": 160.0, "US912828": 99.0}, datetime(2026, 1, 31))
+    start = portfolio.value
+    portfolio.revalue({"AAPL": 170.0, "US912828": 99.0}, datetime(2026, 2, 1))
+
+    assert portfolio.daily_returns == pytest.approx(portfolio.value / start - 1)
+    assert portfolio.monthly_returns == pytest.approx(portfolio.value / start - 1)
+
+
+def test_positions_from_the_ledger_skip_shorts():
+    processor = TradeProcessor()
+    book_trades(processor)
+    portfolio = MixedPortfolio("P1", "bob", universe=InstrumentUniverse())
+
+    skipped = portfolio.add_positions(processor.ledger.positions_for_user("bob"))
+
+    # bob sold MSFT and bought a bond
+    assert skipped == 1
+    assert portfolio.instruments == ["US912828"]
+    assert portfolio.position("US912828", "BOND") == {"quantity": 1000.0, "average_cost": 99.5}
+    assert np.array_equal(portfolio.multipliers, [0.01])
@@ -0,0 +1,67 @@
+from Trading.position_ledger import PositionLedger
+from Trading.trade_processor import TradeProcessor
+
+from conftest import TIMESTAMP, book_trades
+
+
+def execute_equities(processor, directions, quantities, prices, user_id="alice", symbol="AAPL"):
+    count = len(directions)
+    start = len(processor.trades)
+    processor.add_trades("EQUITY", {"user_id": [user_id] * count, "symbol": [symbol] * count,
+                                    "direction": directions, "quantity": quantities, "price": prices},
+                         trade_ids=[f"E{start + i}" for i in range(count)], timestamp=TIMESTAMP)
+    rows = list(range(start, start + count))
+    processor.trades.transition_many(rows, "VALIDATED")
+    processor.trades.transition_many(rows, "EXECUTED")
+
+
+def test_sells_net_against_buys():
+    processor = TradeProcessor()
+
+    execute_equities(processor, ["BUY", "BUY", "SELL"], [10.0, 10.0, 5.0], [100.0, 120.0, 130.0])
+
+    assert processor.get_position("alice", "AAPL") == {
+        "net_quantity": 15.0, "average_cost": 110.0, "realized_pnl": 5 * (130.0 - 110.0)}
+    assert processor.calculate_net_quantity() == {"alice": {"AAPL": 15.0}}
+
+
+def test_selling_through_zero_opens_a_short_at_the_sale_price():
+    processor = TradeProcessor()
+    execute_equities(processor, ["BUY", "sell"], [10.0, 15.0], [100.0, 90.0])
+
+    assert processor.get_position("alice", "AAPL") == {
+        "net_quantity": -5.0, "average_cost": 90.0, "realized_pnl": 10 * (90.0 - 100.0)}
+
+    execute_equities(processor, ["BUY"], [5.0], [80.0])
+    assert processor.get_position("alice", "AAPL") == {
+        "net_quantity": 0.0, "average_cost": 0.0, "realized_pnl": -100.0 + 5 * (90.0 - 80.0)}
+
+
+def test_only_executed_trades_count():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    # E2 is bob's executed MSFT sale, E3 is still NEW and D2 was cancelled
+    assert processor.calculate_net_quantity() == {"alice": {"AAPL": 10.0}, "bob": {"MSFT": -5.0}}
+    assert processor.get_position("bob", "US912828", "BOND")["net_quantity"] == 1000.0
+    assert processor.get_position("alice", "AAPL", "DERIVATIVE")["net_quantity"] == 0.0
+    processor.transition_trade_status("T-D1", "EXECUTED")
+    assert processor.get_position("alice", "AAPL", "DERIVATIVE") == {
+        "net_quantity": 3.0, "average_cost": 4.5, "realized_pnl": 0.0}
+
+    # settling leaves positions alone, leaving the executed states reverses the trade
+    processor.settle_executed()
+    assert processor.calculate_net_quantity() == {"alice": {"AAPL": 10.0}, "bob": {"MSFT": -5.0}}
+    processor.trades.set_status(processor.trades.row_of("T-E1"), "CANCELLED")
+    assert processor.get_position("alice", "AAPL")["net_quantity"] == 0.0
+
+
+def test_ledger_rebuilt_from_the_book_matches_the_live_one():
+    processor = TradeProcessor()
+    book_trades(processor)
+    execute_equities(processor, ["SELL", "BUY"], [4.0, 1.0], [170.0, 165.0])
+
+    rebuilt = PositionLedger(processor.trades)
+
+    for user_id in ("alice", "bob", "carol"):
+        assert rebuilt.positions_for_user(user_id) == processor.ledger.positions_for_user(user_id)
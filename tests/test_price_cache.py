@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from Trading.price_cache import FilePriceLoader, PriceCache, StaticPriceLoader
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+
+class Clock:
+    def __init__(self)-> None:
+        self.now = 0.0
+
+    def __call__(self)-> float:
+        return self.now
+
+
+class CountingLoader(StaticPriceLoader):
+    def __init__(self, prices):
+        super().__init__(prices)
+        self.calls = []
+
+    def __call__(self, symbols):
+        self.calls.append(list(symbols))
+        return super().__call__(symbols)
+
+
+def test_prices_expire_after_the_ttl():
+    clock = Clock()
+    loader = CountingLoader({"AAPL": 150.0, "MSFT": 300.0})
+    cache = PriceCache(loader, ttl=10.0, clock=clock)
+
+    assert cache.get_many(["AAPL", "MSFT", "NONE"]) == {"AAPL": 150.0, "MSFT": 300.0}
+    clock.now = 9.0
+    loader.prices["AAPL"] = 155.0
+    assert cache.get("AAPL") == 150.0
+    clock.now = 10.0
+    assert cache.get("AAPL") == 155.0
+
+    # one loader call per lookup, only with the missing or expired symbols
+    assert loader.calls == [["AAPL", "MSFT", "NONE"], ["AAPL"]]
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert "MSFT" not in cache
+
+
+def test_least_recently_used_prices_are_evicted():
+    cache = PriceCache(ttl=None, max_size=2)
+    cache.update({"AAPL": 150.0, "MSFT": 300.0})
+    cache.get("AAPL")
+
+    cache.update({"TSLA": 600.0})
+
+    assert len(cache) == 2
+    assert "MSFT" not in cache
+    assert cache.price_vector(["TSLA", "MSFT", "AAPL"]).tolist() == pytest.approx([600.0, np.nan, 150.0],
+                                                                                 nan_ok=True)
+    with pytest.raises(ValueError):
+        PriceCache(max_size=0)
+
+
+def test_file_loader_rereads_a_changed_file(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("AAPL,150.0\nMSFT,300.0\n\n")
+    loader = FilePriceLoader(str(path))
+
+    assert loader(["AAPL", "TSLA"]) == {"AAPL": 150.0}
+    path.write_text("AAPL,151.0\n")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+    assert loader(["AAPL", "MSFT"]) == {"AAPL": 151.0}
+
+
+def test_risk_is_marked_to_market_from_the_cache():
+    processor = TradeProcessor()
+    book_trades(processor)
+    at_booking = processor.calculate_risk_exposure()
+
+    processor.price_cache = PriceCache(StaticPriceLoader({"AAPL": 160.0}))
+    marked = processor.calculate_risk_exposure()
+
+    # E1 and E3 are AAPL equities, MSFT has no price and keeps its traded price
+    assert marked["equity_risk_exposures"] - at_booking["equity_risk_exposures"] == \
+        pytest.approx(0.08 * (10 * (160.0 - 150.0) + 2.5 * (160.0 - 155.0)))
+    assert marked["bond_risk_exposures"] == at_booking["bond_risk_exposures"]
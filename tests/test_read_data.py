@@ -0,0 +1,113 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from read_data import get_columns, iter_batches, iter_trades, iter_typed, load_trades
+from Trading.parsing import parse_line
+from Trading.trade_processor import TradeProcessor
+
+from conftest import ROOT
+
+TRADE_FILE = "\n".join([
+    "t001,u001,EQUITY,AAPL,BUY,10.5,150.0",
+    "t002,u001,DERIVATIVE,AAPL,CALL,BUY,10,150.0",
+    "t003,u002,DERIVATIVE,TSLA,put,SELL,2,600.0,12.5,2030-06-20",
+    "t004,u002,EQUITY,TSLA,HOLD,1,600.0",
+    "t005,u003",
+    "",
+    "t006,u003,SWAP,X,BUY,1,1.0",
+    "t007,u003,DERIVATIVE,TSLA,CALL,BUY,2,600.0,12.5,not-a-date",
+    "t008,u003,BOND,US912828,BUY,1000,99.5,4.25,2035-05-15,US Treasury",
+    "t009,u003,BOND,US912828,BUY,1000,99.5",
+]) + "\n"
+
+
+def parsed():
+    chunks = list(iter_typed(io.StringIO(TRADE_FILE), chunk_size=4))
+    batches = [batch for chunk in chunks for batch in chunk.batches]
+    errors = [error for chunk in chunks for error in chunk.errors]
+    return batches, errors
+
+
+def test_rows_of_each_field_count_are_typed():
+    batches, _ = parsed()
+    by_line = {int(number): (batch, index) for batch in batches for index, number in enumerate(batch.line_numbers)}
+
+    assert sorted(by_line) == [1, 2, 3, 9]
+    batch, index = by_line[1]
+    assert batch.columns["quantity"][index] == 10.5
+    # 8 fields: premium and expiry left off, the strike is not shifted
+    batch, index = by_line[2]
+    assert "expiration_date" not in batch.columns
+    assert batch.columns["strike_price"][index] == 150.0
+    assert batch.columns["quantity"][index] == 10
+    # 10 fields, choices upper-cased
+    batch, index = by_line[3]
+    assert batch.columns["option_type"][index] == "PUT"
+    assert batch.columns["premium"][index] == 12.5
+    assert batch.columns["expiration_date"][index] == np.datetime64("2030-06-20")
+
+
+def test_malformed_rows_are_reported_with_line_numbers():
+    _, errors = parsed()
+
+    assert errors == [
+        (4, "Invalid direction: 'HOLD'"),
+        (5, "Expected at least 3 fields, got 2"),
+        (7, "Unknown trade type: SWAP"),
+        (8, "Invalid expiration_date: 'not-a-date'"),
+        (10, "BOND lines need 9 to 10 fields, got 7"),
+    ]
+
+
+def test_load_trades_reports_duplicates_and_keeps_loading():
+    processor = TradeProcessor()
+    errors = load_trades(processor, io.StringIO(TRADE_FILE + "t001,u009,EQUITY,MSFT,BUY,1,1.0\n"))
+
+    assert (11, "Trade t001 already exists.") in errors
+    assert sorted(processor.trades.trade_ids) == ["t001", "t002", "t003", "t008"]
+    assert processor.get_trade("t001").user_id == "u001"
+
+
+def test_missing_expiry_is_rejected_by_validation():
+    processor = TradeProcessor()
+    load_trades(processor, io.StringIO(TRADE_FILE))
+
+    report = processor.validate_batch()
+
+    assert report.invalid_trades() == {"t002": ["Expiration date is missing"]}
+    assert processor.get_trade("t002").status == "CANCELLED"
+    assert processor.get_trade("t003").status == "VALIDATED"
+
+
+def test_parse_line_names_fields_by_trade_type():
+    assert parse_line("t002,u001,DERIVATIVE,AAPL,CALL,BUY,10,150.0\n") == {
+        "trade_id": "t002", "user_id": "u001", "trade_type": "DERIVATIVE", "underlying_symbol": "AAPL",
+        "option_type": "CALL", "direction": "BUY", "quantity": "10", "strike_price": "150.0",
+    }
+    with pytest.raises(ValueError, match="EQUITY lines need 7 to 8 fields, got 5"):
+        parse_line("t001,u001,EQUITY,AAPL,BUY")
+
+
+def test_streamed_repo_file_uses_the_schemas():
+    processor = TradeProcessor()
+    processor.process_trades(iter_batches(os.path.join(ROOT, "Trading", "trade_data.txt"), batch_size=4))
+
+    assert len(processor.trades) == 14
+    assert processor.get_trade("t001").user_id == "u001"
+    derivative = processor.get_trade("t011")
+    assert (derivative.underlying_symbol, derivative.strike_price, derivative.status) == ("AAPL", 150.0, "CANCELLED")
+
+
+def test_streamed_lines_report_their_line_number():
+    with pytest.raises(ValueError, match="Line 3: Unknown trade type: SWAP"):
+        list(iter_trades(io.StringIO("t001,u001,EQUITY,AAPL,BUY,1,1.0\n\nt006,u003,SWAP,X\n")))
+
+
+def test_columns_override_the_schemas():
+    trades = list(iter_trades(io.StringIO("u001,t001,EQUITY,AAPL,BUY,1,1.0\n"), columns=get_columns()))
+
+    assert trades == [{"user_id": "u001", "trade_id": "t001", "trade_type": "EQUITY", "symbol": "AAPL",
+                       "direction": "BUY", "quantity": "1", "price": "1.0"}]
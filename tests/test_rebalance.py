@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from Portfolio.equity_portfolio import EquityPortfolio
+from Portfolio.instrument_universe import InstrumentUniverse
+from Portfolio.mixed_portfolio import MixedPortfolio
+from Portfolio.rebalance import RebalanceEngine
+from Trading.trade_processor import TradeProcessor
+
+from conftest import TIMESTAMP
+
+OPTION = {"trade_type": "DERIVATIVE", "option_type": "CALL", "strike_price": 160.0, "expiration_date": "2030-06-20"}
+
+
+def test_plan_reaches_the_target_weights():
+    universe = InstrumentUniverse()
+    portfolio = EquityPortfolio("P1", "alice", universe=universe)
+    portfolio.add_position("AAPL", 10, 150.0)
+    portfolio.add_rebalance({"AAPL": 0.5, "MSFT": 0.5})
+
+    plan = RebalanceEngine(universe=universe).plan([portfolio], {"AAPL": 200.0, "MSFT": 100.0})
+
+    assert plan.values.tolist() == [2000.0]
+    assert plan.trades.tolist() == [[-5.0, 10.0]]
+
+
+def test_portfolios_without_targets_need_no_prices():
+    universe = InstrumentUniverse()
+    rebalanced = EquityPortfolio("P1", "alice", universe=universe)
+    rebalanced.add_position("AAPL", 10, 150.0)
+    rebalanced.add_rebalance({"AAPL": 1.0})
+    untouched = EquityPortfolio("P2", "bob", universe=universe)
+    untouched.add_position("TSLA", 1, 600.0)
+    engine = RebalanceEngine(universe=universe)
+
+    plan = engine.plan([rebalanced, untouched], {"AAPL": 200.0})
+
+    assert plan.values[0] == 2000.0
+    assert not plan.trades.any()
+    untouched.add_rebalance({"AAPL": 1.0})
+    with pytest.raises(ValueError, match=r"Missing prices for \['EQUITY TSLA'\]"):
+        engine.plan([rebalanced, untouched], {"AAPL": 200.0})
+
+
+def test_derivatives_are_priced_with_option_prices():
+    universe = InstrumentUniverse()
+    portfolio = MixedPortfolio("P1", "alice", universe=universe)
+    portfolio.add_position("AAPL", 10, 150.0)
+    portfolio.add_rebalance({"AAPL": 0.5})
+    engine = RebalanceEngine(universe=universe)
+
+    # the share price is no price for an option on the share
+    with pytest.raises(ValueError, match=r"Missing prices for \['DERIVATIVE AAPL'\]"):
+        engine.trades([portfolio], {"AAPL": 200.0}, {"AAPL": {"trade_type": "DERIVATIVE"}})
+    with pytest.raises(ValueError, match="Missing option_type, strike_price, expiration_date for DERIVATIVE AAPL"):
+        engine.trades([portfolio], {"EQUITY": {"AAPL": 200.0}, "DERIVATIVE": {"AAPL": 5.0}},
+                      {"AAPL": {"trade_type": "DERIVATIVE"}})
+
+    trades = engine.trades([portfolio], {"EQUITY": {"AAPL": 200.0}, "DERIVATIVE": {"AAPL": 5.0}},
+                           {"AAPL": OPTION}, timestamp=TIMESTAMP)
+
+    assert [(trade["trade_type"], trade["direction"], trade["price"]) for trade in trades] == \
+        [("EQUITY", "SELL", 200.0), ("DERIVATIVE", "BUY", 5.0)]
+    option = trades[1]
+    assert (option["quantity"], option["premium"], option["strike_price"]) == (200.0, 5.0, 160.0)
+
+    processor = TradeProcessor()
+    processor.process_trades(trades)
+    assert processor.validate_batch().invalid_trades() == {}
+    assert np.isclose(processor.get_trade(option["trade_id"]).premium, 5.0)
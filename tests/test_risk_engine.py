@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from Trading.option_pricing import OptionModel
+from Trading.risk_engine import RiskEngine
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+NOW = datetime(2026, 1, 2)
+
+
+def open_views(processor):
+    return [view for view in map(processor.get_trade, processor.trades.trade_ids) if view.status != "CANCELLED"]
+
+
+def test_exposure_matches_scalar_calculate_risk():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    exposure = processor.calculate_risk_exposure()
+
+    by_type = {"EQUITY": 0.0, "BOND": 0.0, "DERIVATIVE": 0.0}
+    for view in open_views(processor):
+        by_type[view.trade_type] += view.calculate_risk()
+    assert exposure["equity_risk_exposures"] == pytest.approx(by_type["EQUITY"])
+    assert exposure["bond_risk_exposures"] == pytest.approx(by_type["BOND"])
+    # D2 (the TSLA put) is cancelled and carries no risk
+    assert exposure["derivative_risk_exposures"] == pytest.approx(0.5 * 160.0 * 3)
+    assert exposure["all_risk_exposures"] == pytest.approx(sum(by_type.values()))
+
+
+def test_risk_vector_matches_each_trade():
+    processor = TradeProcessor()
+    book_trades(processor)
+    engine = RiskEngine(processor.trades)
+
+    risk = engine.risk_vector(now=NOW)
+    rows = [1, 4]
+
+    for row in range(len(processor.trades)):
+        view = processor.trades.view(row)
+        if view.trade_type == "BOND":
+            assert risk[row] == pytest.approx(view.face_value * view.price * (2035 - NOW.year))
+        else:
+            assert risk[row] == pytest.approx(view.calculate_risk())
+    assert engine.risk_vector(now=NOW, rows=rows).tolist() == risk[rows].tolist()
+
+
+def test_option_model_risk_matches_the_black_scholes_delta_notional():
+    processor = TradeProcessor()
+    book_trades(processor)
+    engine = RiskEngine(processor.trades)
+
+    risk = engine.risk_vector(now=NOW, option_model=OptionModel(volatility=0.25, rate=0.03))
+
+    view = processor.get_trade("T-D1")
+    delta = view.greeks(volatility=0.25, rate=0.03, now=NOW)["delta"]
+    assert risk[view.row] == pytest.approx(delta * view.strike_price * view.quantity)
+
+
+def test_breakdowns_add_up_to_the_total():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    report = processor.calculate_risk_report()
+
+    assert sum(report["by_user"].values()) == pytest.approx(report["all_risk_exposures"])
+    assert sum(report["by_symbol"].values()) == pytest.approx(report["all_risk_exposures"])
+    assert "carol" not in report["by_user"]
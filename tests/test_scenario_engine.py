@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from Trading.option_pricing import OptionModel, black_scholes, year_fractions
+from Trading.risk_engine import RiskEngine
+from Trading.scenario_engine import BUCKETS, ScenarioEngine, ScenarioSet
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+NOW = datetime(2026, 1, 2)
+
+
+def booked():
+    processor = TradeProcessor()
+    book_trades(processor)
+    return processor
+
+
+def test_unshocked_scenario_matches_the_risk_engine():
+    processor = booked()
+
+    result = ScenarioEngine(processor.trades).run(ScenarioSet.grid(), now=NOW)
+
+    exposure = RiskEngine(processor.trades).exposure(now=NOW)
+    expected = [exposure["equity_risk_exposures"], exposure["bond_risk_exposures"],
+                exposure["derivative_risk_exposures"], exposure["all_risk_exposures"]]
+    assert result.base_exposure == pytest.approx(expected)
+    assert result.exposure[0] == pytest.approx(expected)
+    # bonds go through a yield and back, which is exact only to rounding
+    assert result.pnl[0] == pytest.approx([0.0] * len(BUCKETS), abs=1e-9)
+
+
+def test_price_shocks_move_equities_and_options():
+    processor = booked()
+    model = OptionModel(0.25, rate=0.02)
+    scenarios = ScenarioSet.grid(price_shocks=[-0.1, 0.1])
+
+    result = ScenarioEngine(processor.trades, model).run(scenarios, now=NOW)
+
+    # open equities: E1 long 10 AAPL @ 150, E2 short 5 MSFT @ 300, E3 long 2.5 AAPL @ 155
+    signed_notional = 10 * 150.0 - 5 * 300.0 + 2.5 * 155.0
+    assert result.pnl[:, 0] == pytest.approx([-0.1 * signed_notional, 0.1 * signed_notional])
+    # D1 is the only open option: a long call on AAPL, struck at 160 and priced at its strike
+    time_to_expiry = year_fractions(np.array(["2030-06-20"], dtype="datetime64[D]"), NOW)
+    base = black_scholes(160.0, 160.0, time_to_expiry, 0.25, 0.02, True)["price"]
+    shocked = black_scholes([144.0, 176.0], 160.0, time_to_expiry, 0.25, 0.02, True)["price"]
+    assert result.pnl[:, 2] == pytest.approx(3 * (shocked - base))
+    assert result.pnl[:, 1] == pytest.approx([0.0, 0.0], abs=1e-9)
+    assert [row["scenario"] for row in result.table("pnl")] == \
+        ["price -10.0% vol +0.00 rate +0bp", "price +10.0% vol +0.00 rate +0bp"]
+
+
+def test_rate_shocks_reprice_bonds_from_their_yield():
+    processor = booked()
+    scenarios = ScenarioSet.grid(rate_shocks=[-0.01, 0.0, 0.01])
+
+    result = ScenarioEngine(processor.trades).run(scenarios, now=NOW)
+
+    analytics = processor.bond_analytics
+    schedule = analytics.schedule([4.25], np.array(["2035-05-15"], dtype="datetime64[D]"), NOW)
+    yields = analytics.yields(schedule, [99.5])
+    prices = [analytics.clean_prices(schedule, yields + shock)[0] for shock in (-0.01, 0.0, 0.01)]
+    assert result.pnl[:, 1] == pytest.approx([1000 * (price - 99.5) / 100.0 for price in prices])
+    assert result.pnl[0, 1] > 0 > result.pnl[2, 1]
+
+
+def test_historical_value_at_risk():
+    processor = TradeProcessor()
+    processor.add_trades("EQUITY", {"user_id": ["alice"], "symbol": ["AAPL"], "quantity": [10.0], "price": [100.0]},
+                         trade_ids=["E1"])
+    history = {"AAPL": [100.0, 90.0, 99.0, 99.0, 108.9, 103.455], "MSFT": [1.0] * 6}
+
+    result = ScenarioEngine(processor.trades).run(ScenarioSet.historical(history), now=NOW)
+    var = processor.calculate_value_at_risk(history, confidence=0.8)
+
+    # daily AAPL returns are -10%, +10%, 0%, +10%, -5% on a 1000 position
+    assert result.pnl[:, -1] == pytest.approx([-100.0, 100.0, 0.0, 100.0, -50.0])
+    assert var["value_at_risk"] == pytest.approx(-np.quantile([-100.0, 100.0, 0.0, 100.0, -50.0], 0.2))
+    assert var["expected_shortfall"] == pytest.approx(100.0)
+    with pytest.raises(ValueError):
+        ScenarioSet.historical(history, horizon=6)
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from Trading.base_trade import TradeStatus
+from Trading.trade_book import TradeBook
+from Trading.trade_factory import TradeFactory
+from Trading.trade_processor import TradeProcessor
+
+from conftest import TIMESTAMP, book_trades
+
+
+class Recorder:
+    """
+    Listener that records every event, with or without the bulk hooks.
+    """
+    def __init__(self, bulk:bool)-> None:
+        self.events = []
+        if bulk:
+            self.on_append_many = lambda rows: self.events.append(("append_many", rows.tolist()))
+            self.on_status_change_many = lambda rows, old_codes, new_code: self.events.append(
+                ("status_many", rows.tolist(), old_codes.tolist(), new_code))
+
+    def on_append(self, row:int)-> None:
+        self.events.append(("append", row))
+
+    def on_status_change(self, row:int, old_code:int, new_code:int)-> None:
+        self.events.append(("status", row, old_code, new_code))
+
+
+def equity_columns(**overrides):
+    columns = {"user_id": ["alice", None], "symbol": ["AAPL", "MSFT"], "direction": ["BUY", "sell"],
+               "quantity": [10.0, 5.0], "price": [150.0, 300.0], "market": [None, "NASDAQ"]}
+    columns.update(overrides)
+    return columns
+
+
+def test_extend_matches_append():
+    book = TradeBook()
+    book.extend("EQUITY", equity_columns(), trade_ids=["E1", "E2"], timestamp=TIMESTAMP)
+    appended = TradeBook()
+    for trade_id, user_id, symbol, direction, market in (("E1", "alice", "AAPL", "BUY", None),
+                                                          ("E2", None, "MSFT", "sell", "NASDAQ")):
+        trade = TradeFactory.create_trade("EQUITY", trade_id=trade_id, timestamp=TIMESTAMP, user_id=user_id,
+                                          symbol=symbol, direction=direction, market=market,
+                                          quantity=10.0 if trade_id == "E1" else 5.0,
+                                          price=150.0 if trade_id == "E1" else 300.0)
+        appended.append(trade)
+
+    for name, column in appended.columns().items():
+        assert book.column(name).tobytes() == column.tobytes(), name
+    assert book["E2"].user_id is None
+    assert book["E1"].market is None
+    assert book.users.values == ["alice"]
+
+
+def test_extend_rejects_bad_batches_without_writing():
+    book = TradeBook()
+    book.extend("EQUITY", equity_columns(), trade_ids=["E1", "E2"])
+
+    with pytest.raises(ValueError, match="Missing EQUITY columns: price"):
+        book.extend("EQUITY", {"quantity": [1.0]}, trade_ids=["E3"])
+    with pytest.raises(ValueError, match="unique"):
+        book.extend("EQUITY", equity_columns(), trade_ids=["E3", "E1"])
+    with pytest.raises(ValueError, match="Missing price values"):
+        book.extend("EQUITY", equity_columns(price=[1.0, np.nan]), trade_ids=["E3", "E4"])
+
+    assert list(book.trade_ids) == ["E1", "E2"]
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_listeners_see_appends_and_status_changes(bulk):
+    book = TradeBook()
+    recorder = Recorder(bulk)
+    book.subscribe(recorder)
+
+    rows = book.extend("EQUITY", equity_columns(), trade_ids=["E1", "E2"])
+    book.set_status(0, "VALIDATED")
+    rejected = book.transition_many(rows, "VALIDATED")
+
+    assert rejected.tolist() == [True, False]
+    if bulk:
+        assert recorder.events == [("append_many", [0, 1]), ("status", 0, 0, 1), ("status_many", [1], [0], 1)]
+    else:
+        assert recorder.events == [("append", 0), ("append", 1), ("status", 0, 0, 1), ("status", 1, 0, 1)]
+
+
+def test_transition_many_checks_the_statuses_held_before_the_call():
+    book = TradeBook()
+    book.extend("EQUITY", equity_columns(), trade_ids=["E1", "E2"])
+    book.set_status(1, "CANCELLED")
+
+    rejected = book.transition_many(np.array([0, 1, 0, -1, 7]), "VALIDATED")
+
+    assert rejected.tolist() == [False, True, True, True, True]
+    assert [book.view(row).status for row in (0, 1)] == ["VALIDATED", "CANCELLED"]
+
+
+def test_view_transitions_are_checked():
+    processor = TradeProcessor()
+    book_trades(processor)
+    trade = processor.get_trade("T-E3")
+
+    assert trade.transition_status(trade.status) == TradeStatus.VALIDATED
+    with pytest.raises(ValueError, match="cannot move from VALIDATED to SETTLED"):
+        trade.transition_status(trade.status, "SETTLED")
+    with pytest.raises(ValueError, match="cannot move from VALIDATED to NEW"):
+        trade.status = "NEW"
+    with pytest.raises(ValueError, match="Invalid status"):
+        trade.transition_status(trade.status, "PENDING")
+    trade.status = "VALIDATED"
+    assert trade.status == "VALIDATED"
+
+    with pytest.raises(ValueError, match="cannot move on"):
+        processor.get_trade("T-D2").transition_status("CANCELLED")
+
+
+def test_cancel_trade():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    processor.cancel_trade("T-E3")
+
+    assert processor.get_trade("T-E3").status == "CANCELLED"
+    assert processor.index.count_with_status("CANCELLED") == 2
+    with pytest.raises(ValueError, match="already executed"):
+        processor.cancel_trade("T-E1")
+    with pytest.raises(ValueError, match="cannot move from CANCELLED to CANCELLED"):
+        processor.cancel_trade("T-E3")
@@ -0,0 +1,68 @@
+import pytest
+
+from Trading.trade_factory import TradeFactory
+from Trading.trade_processor import TradeProcessor
+
+from conftest import TIMESTAMP
+
+BOND_COLUMNS = {
+    "trade_id": ["B1", "B2"],
+    "user_id": ["alice", "bob"],
+    "isin": ["US912828", "DE000110"],
+    "direction": ["BUY", "SELL"],
+    "face_value": ["1000", 5000],
+    "price": ["99.5", 101.25],
+    "coupon_rate": [4.25, "2.5"],
+    "maturity_date": ["2035-05-15", "2031-02-15"],
+    "issuer": ["US Treasury", "German Bund"],
+}
+
+
+def test_bulk_trades_match_single_trades():
+    bulk = TradeFactory.create_trades("BOND", BOND_COLUMNS, timestamp=TIMESTAMP)
+    single = [
+        TradeFactory.create_trade("BOND", timestamp=TIMESTAMP, **{name: values[i] for name, values in BOND_COLUMNS.items()})
+        for i in range(2)
+    ]
+
+    for made, expected in zip(bulk, single):
+        assert made.trade_id == expected.trade_id
+        for name in ("user_id", "isin", "direction", "face_value", "price", "coupon_rate", "maturity_date", "issuer"):
+            assert getattr(made, name) == getattr(expected, name), name
+        assert made.calculate_risk() == expected.calculate_risk()
+        assert made.validate_trade() == expected.validate_trade()
+
+
+def test_missing_required_columns_are_rejected():
+    columns = {name: values for name, values in BOND_COLUMNS.items() if name != "coupon_rate"}
+    with pytest.raises(ValueError, match="Missing BOND columns: coupon_rate"):
+        TradeFactory.create_trades("BOND", columns)
+
+    with pytest.raises(ValueError, match="Missing price values"):
+        TradeFactory.create_trades("EQUITY", {"quantity": [1.0, 2.0], "price": [1.0, None]})
+
+
+def test_fractional_ints_are_rejected():
+    with pytest.raises(ValueError, match="Invalid face_value values"):
+        TradeFactory.create_trades("BOND", dict(BOND_COLUMNS, face_value=[1000, 1000.5]))
+
+
+def test_optional_derivative_fields_default_as_in_the_constructor():
+    made = TradeFactory.create_trades("DERIVATIVE", {"underlying_symbol": ["AAPL"], "option_type": ["CALL"]})[0]
+    expected = TradeFactory.create_trade("DERIVATIVE", underlying_symbol="AAPL", option_type="CALL")
+
+    assert (made.quantity, made.strike_price, made.premium) == (expected.quantity, expected.strike_price, expected.premium)
+    assert made.calculate_risk() == 0.0
+
+
+def test_failed_batch_leaves_the_book_unchanged():
+    processor = TradeProcessor()
+    processor.add_trades("EQUITY", {"symbol": ["AAPL"], "quantity": [1.0], "price": [2.0]}, trade_ids=["E1"])
+    exposure = processor.current_risk_exposure()
+
+    with pytest.raises(ValueError):
+        processor.add_trades("EQUITY", {"symbol": ["A", "B"], "quantity": [1.0, "x"], "price": [2.0, 3.0]},
+                             trade_ids=["E2", "E3"])
+
+    assert list(processor.trades.trade_ids) == ["E1"]
+    assert processor.current_risk_exposure() == exposure
@@ -0,0 +1,66 @@
+import numpy as np
+
+from Trading.trade_book import STATUSES
+from Trading.trade_index import TradeIndex
+from Trading.trade_processor import TradeProcessor
+
+from conftest import book_trades
+
+
+def assert_matches_the_book(index, book):
+    for status in STATUSES:
+        expected = np.flatnonzero(book.mask(status=status))
+        assert index.rows_with_status(status).tolist() == expected.tolist(), status
+        assert index.count_with_status(status) == len(expected)
+
+
+def test_status_index_follows_every_kind_of_status_change():
+    processor = TradeProcessor()
+    index = processor.index
+    # built before the trades move along, so every change goes through the listener
+    assert_matches_the_book(index, processor.trades)
+
+    book_trades(processor)
+    assert_matches_the_book(index, processor.trades)
+
+    processor.cancel_trade("T-E3")
+    processor.transition_trade_status("T-D1", "EXECUTED")
+    processor.transition_trades(["T-E1", "T-E2", "T-B1", "T-D2"], "SETTLED")
+    assert_matches_the_book(index, processor.trades)
+    assert processor.settle_executed() == 1
+    assert_matches_the_book(index, processor.trades)
+    assert [view.trade_id for view in processor.trades_with_status("CANCELLED")] == ["T-E3", "T-D2"]
+
+
+def test_index_built_late_matches_one_built_early():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    late = TradeIndex(processor.trades)
+    processor.cancel_trade("T-E3")
+
+    assert_matches_the_book(late, processor.trades)
+    for status in STATUSES:
+        assert late.rows_with_status(status).tolist() == processor.index.rows_with_status(status).tolist()
+
+
+def test_user_and_symbol_rows_include_later_appends():
+    processor = TradeProcessor()
+    book_trades(processor, "A")
+    index = TradeIndex(processor.trades)
+    book_trades(processor, "B")
+
+    alice = [processor.trades.trade_ids[row] for row in index.rows_for_user("alice")]
+    assert alice == ["A-E1", "A-E3", "A-D1", "B-E1", "B-E3", "B-D1"]
+    assert [view.trade_id for view in processor.trades_for_symbol("AAPL", "EXECUTED")] == ["A-E1", "B-E1"]
+    assert [view.trade_id for view in processor.trades_for_user("carol")] == ["A-D2", "B-D2"]
+
+
+def test_unknown_keys_match_nothing():
+    processor = TradeProcessor()
+    processor.add_trades("EQUITY", {"user_id": [None], "symbol": [None], "quantity": [1.0], "price": [1.0]},
+                         trade_ids=["E1"])
+
+    # rows without a user or symbol are not returned for a value the book has never seen
+    assert processor.index.rows_for_user("nobody").tolist() == []
+    assert processor.index.rows_for_symbol("NONE").tolist() == []
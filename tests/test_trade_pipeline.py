@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from read_data import iter_trades
+from Trading.base_trade import TradeStatus
+from Trading.trade_pipeline import AddStage, TransitionStage, ValidateStage
+from Trading.trade_processor import TradeProcessor
+
+from conftest import ROOT, TIMESTAMP, assert_same_book
+
+TRADE_FILE = os.path.join(ROOT, "Trading", "trade_data.txt")
+
+
+def trade_dicts():
+    return [dict(trade, timestamp=TIMESTAMP) for trade in iter_trades(TRADE_FILE)]
+
+
+def test_pipeline_matches_four_pass(capsys):
+    four_pass = TradeProcessor()
+    four_pass.process_trades(trade_dicts())
+    pipeline = TradeProcessor()
+
+    result = pipeline.process_trades(trade_dicts(), mode="pipeline", batch_size=4)
+
+    assert_same_book(pipeline.trades, four_pass.trades)
+    exposure = four_pass.calculate_risk_exposure()
+    for name, value in exposure.items():
+        assert result.risk_exposure[name] == pytest.approx(value), name
+    assert str(exposure) in capsys.readouterr().out
+    assert (result.batches, result.received) == (4, 14)
+    assert set(result.rejected) == {trade_id for trade_id in four_pass.trades.trade_ids
+                                    if four_pass.get_trade(trade_id).status == "CANCELLED"}
+
+
+def test_add_errors_do_not_stop_the_batch():
+    processor = TradeProcessor()
+    trades = trade_dicts()
+    trades.insert(1, dict(trades[0]))
+
+    result = processor.process_trades(trades, mode="pipeline", batch_size=4)
+
+    assert list(result.add_errors) == ["t001"]
+    assert len(processor.trades) == 14
+    assert result.stage_counts["add"] == 14
+
+
+def test_custom_stages():
+    processor = TradeProcessor()
+    stages = [AddStage(), ValidateStage(), TransitionStage("execute", TradeStatus.VALIDATED, TradeStatus.EXECUTED)]
+
+    result = processor.process_trades(trade_dicts(), mode="pipeline", stages=stages)
+
+    statuses = {processor.get_trade(trade_id).status for trade_id in processor.trades.trade_ids}
+    assert statuses == {"EXECUTED", "CANCELLED"}
+    assert result.risk_exposure is None
+    assert "settle" not in result.stage_counts
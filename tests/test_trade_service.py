@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+from Trading.trade_service import TradeService
+
+EQUITY_LINE = "t001,u001,EQUITY,AAPL,BUY,10,150.0"
+DERIVATIVE_LINE = "t002,u001,DERIVATIVE,AAPL,CALL,BUY,2,160.0,4.5,2030-06-20"
+
+
+def run_session(lines, service:TradeService=None):
+    """
+    Send `lines` over one connection, finish with a flush query and return the
+    service and the JSON replies.
+    """
+    async def session():
+        nonlocal service
+        service = service or TradeService(batch_timeout=0.001)
+        await service.start(port=0)
+        host, port = service.sockets[0][:2]
+        reader, writer = await asyncio.open_connection(host, port)
+        for line in lines:
+            writer.write(line if isinstance(line, bytes) else line.encode() + b"\n")
+        writer.write(b'{"query": "flush"}\n')
+        await writer.drain()
+        # read up to the reply to the final flush
+        flushes = 1 + sum(line == '{"query": "flush"}' for line in lines)
+        replies = []
+        while flushes:
+            reply = json.loads(await asyncio.wait_for(reader.readline(), 5))
+            replies.append(reply)
+            flushes -= "received" in reply
+        writer.close()
+        await service.stop()
+        return replies
+
+    replies = asyncio.run(session())
+    return service, replies
+
+
+def test_csv_lines_use_the_trade_type_schemas():
+    service, replies = run_session([EQUITY_LINE, DERIVATIVE_LINE])
+
+    assert replies[-1]["received"] == 2
+    trade = service.processor.get_trade("t001")
+    assert (trade.user_id, trade.symbol, trade.quantity) == ("u001", "AAPL", 10.0)
+    derivative = service.processor.get_trade("t002")
+    assert (derivative.strike_price, derivative.premium) == (160.0, 4.5)
+
+
+def test_queries_and_errors():
+    service, replies = run_session([
+        EQUITY_LINE,
+        json.dumps({"trade_type": "EQUITY", "trade_id": "j1", "user_id": "u002", "symbol": "MSFT",
+                    "direction": "SELL", "quantity": "5", "price": "300"}),
+        "x,y,FOO,1",
+        '{"query": "flush"}',
+        '{"query": "trade", "trade_id": "j1"}',
+        '{"query": "position", "user_id": "u001", "symbol": "AAPL"}',
+        '{"query": "nope"}',
+    ])
+
+    assert replies[0] == {"error": "Unknown trade type: FOO"}
+    assert replies[1]["processed"] == 2
+    assert replies[2] == {"trade_id": "j1", "trade_type": "EQUITY", "status": "SETTLED"}
+    assert replies[3]["net_quantity"] == 10.0
+    assert replies[4] == {"error": "Unknown query: nope"}
+
+
+def test_bad_lines_do_not_close_the_connection():
+    service, replies = run_session([b"\xff\xfe\n", "x" * 100000, EQUITY_LINE])
+
+    assert "error" in replies[0]
+    assert replies[1] == {"error": "Line too long"}
+    assert replies[2]["received"] == 1
+    assert service.processor.get_trade("t001") is not None
+
+
+def test_failing_batch_keeps_the_batcher_running():
+    service = TradeService(batch_timeout=0.001)
+
+    def fail(batch):
+        raise RuntimeError("boom")
+
+    service._process = fail
+    _, replies = run_session([EQUITY_LINE], service)
+
+    assert replies[-1]["failed"] == 1
+    assert replies[-1]["processed"] == 0
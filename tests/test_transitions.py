@@ -0,0 +1,52 @@
+import io
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from Trading.base_trade import BaseTrade, TradeStatus
+from Trading.trade_book import STATUSES, TRANSITIONS, TradeBook
+from Trading.trade_factory import TradeFactory
+from Trading.trade_processor import TradeProcessor
+
+from conftest import TIMESTAMP, book_trades
+
+
+def test_table_matches_base_trade_status():
+    for old_code, old in enumerate(STATUSES):
+        assert np.flatnonzero(TRANSITIONS[old_code]).tolist() == [STATUSES.index(new) for new in BaseTrade.STATUS[old]]
+
+
+def test_bulk_moves_match_scalar_transition_status():
+    pairs = [(old, new) for old in STATUSES for new in STATUSES]
+    book = TradeBook()
+    book.extend("EQUITY", {"quantity": [1.0] * len(pairs), "price": [1.0] * len(pairs)},
+                trade_ids=[f"E{index}" for index in range(len(pairs))])
+    for row, (old, _) in enumerate(pairs):
+        book.set_status(row, old)
+
+    rejected = np.zeros(len(pairs), dtype=bool)
+    for new in STATUSES:
+        rows = np.array([row for row, pair in enumerate(pairs) if pair[1] == new])
+        rejected[rows] = book.transition_many(rows, new)
+
+    for row, (old, new) in enumerate(pairs):
+        trade = TradeFactory.create_trade("EQUITY", timestamp=TIMESTAMP, status=old, quantity=1.0, price=1.0)
+        # the trade classes print rejected moves instead of raising
+        with redirect_stdout(io.StringIO()):
+            trade.transition_status(old, new)
+        assert book.view(row).status == trade.status, (old, new)
+        assert rejected[row] == (new not in BaseTrade.STATUS[old]), (old, new)
+
+
+def test_unknown_and_repeated_trades_are_rejected():
+    processor = TradeProcessor()
+    book_trades(processor)
+
+    rejected = processor.transition_trades(["T-E3", "T-X", "T-E3", "T-D1", "T-D2"], "CANCELLED")
+
+    assert rejected.tolist() == [False, True, True, False, True]
+    assert processor.index.count_with_status(TradeStatus.CANCELLED) == 3
+    # E1, E2 and B1 were executed
+    assert processor.settle_executed() == 3
+    assert processor.settle_executed() == 0
+    assert processor.trades.mask(status="SETTLED").sum() == 3